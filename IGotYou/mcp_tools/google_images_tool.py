@@ -5,9 +5,19 @@ Fetches relevant images from Google Custom Search API for a given place name.
 """
 
 import os
+import time
 import requests
 from typing import List, Dict, Any
 
+try:
+    # The Custom Search budget is shared with the agent's other Google calls
+    from IGotYou_Agent.rate_limit import RateLimited, limiter
+except ImportError:
+    limiter = None
+
+# Seconds a search may wait for a Custom Search rate limit token
+QUEUE_TIMEOUT = float(os.environ.get("GOOGLE_IMAGES_QUEUE_TIMEOUT", "10"))
+
 
 def fetch_google_images(place_name: str, max_results: int = 5) -> List[str]:
     """
@@ -55,6 +65,15 @@ def fetch_google_images(place_name: str, max_results: int = 5) -> List[str]:
 
         print(f"[Google Images] Searching for: '{search_query}'")
 
+        # Wait for a token (1/s, 100/day by default); give up rather than
+        # queue past QUEUE_TIMEOUT or over the daily quota
+        if limiter is not None:
+            try:
+                limiter("custom_search").acquire_blocking(deadline=time.monotonic() + QUEUE_TIMEOUT)
+            except RateLimited as e:
+                print(f"[Google Images] Skipping image search for '{place_name}': {e}")
+                return []
+
         # Make API request
         response = requests.get(url, params=params, timeout=10)
         response.raise_for_status()
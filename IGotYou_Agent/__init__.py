@@ -1,7 +1,26 @@
-from .agent import root_agent
-from google.adk.runners import InMemoryRunner
+from .agent import root_agent, hidden_gem_agent, agent_pipeline, fast_pipeline, PIPELINE_MODE
+from google.adk.runners import InMemoryRunner, Runner
 
 # Create a runner instance that can be used by the backend
 runner = InMemoryRunner(agent=root_agent)
 
-__all__ = ["root_agent", "runner"]
+# Runner for the Discovery -> Analysis -> Recommendation pipeline on its own,
+# so callers can observe each stage's events (they are hidden behind the
+# root agent's AgentTool). It shares the root runner's session service, so
+# the pipeline's events land in the same conversation the concierge reads.
+pipeline_runner = Runner(
+    app_name=runner.app_name,
+    agent=hidden_gem_agent,
+    session_service=runner.session_service,
+    artifact_service=runner.artifact_service,
+    memory_service=runner.memory_service,
+)
+
+__all__ = [
+    "root_agent",
+    "runner",
+    "pipeline_runner",
+    "agent_pipeline",
+    "fast_pipeline",
+    "PIPELINE_MODE",
+]
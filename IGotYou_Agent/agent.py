@@ -1,4 +1,5 @@
 import asyncio
+import os
 from datetime import datetime
 
 from google.adk.agents import Agent, SequentialAgent
@@ -6,25 +7,34 @@ from google.adk.models.google_llm import Gemini
 from google.genai import types
 from google.adk.runners import InMemoryRunner
 from mcp import StdioServerParameters
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 from google.adk.tools import AgentTool
 
 try:
     # 1. For Pytest
     from .config import GOOGLE_API_KEY
+    from .latency import latency_callbacks
+    from .mcp_tools.pooled_toolset import PooledMcpToolset
+    from .mcp_tools.session_pool import McpSessionPool
     from .sub_Agents import (
         analysis_agent,
+        build_recommendation_agent,
         discovery_agent,
         recommendation_agent,
     )
+    from .sub_Agents.fast_discovery_agent import FastDiscoveryAgent
 except ImportError:
     # 2. For 'python agent.py'
     from config import GOOGLE_API_KEY
+    from latency import latency_callbacks
+    from mcp_tools.pooled_toolset import PooledMcpToolset
+    from mcp_tools.session_pool import McpSessionPool
     from sub_Agents import (
         analysis_agent,
+        build_recommendation_agent,
         discovery_agent,
         recommendation_agent,
     )
+    from sub_Agents.fast_discovery_agent import FastDiscoveryAgent
 
 
 current_time_str = datetime.now().strftime("%A, %B %d, %Y")
@@ -38,14 +48,24 @@ retry_config = types.HttpRetryOptions(
     http_status_codes=[429, 500, 503, 504]  # Retry on these HTTP errors
 )
 
-# MCP Connection for Weather
+# MCP Connection for Weather: warm pooled sessions, started with the app
+# (see mcp_tools/session_pool.py), instead of a connection per toolset
 weather_params = StdioServerParameters(
     command="python",
     args=["-m", "mcp_weather_server"]
 )
+weather_forecast_pool = McpSessionPool(
+    "mcp_weather_server",
+    lambda: weather_params,
+    size=int(os.getenv("WEATHER_MCP_POOL_SIZE", "1")),
+    max_concurrent=int(os.getenv("WEATHER_MCP_SESSION_CONCURRENCY", "4")),
+    call_timeout=float(os.getenv("WEATHER_MCP_CALL_TIMEOUT", "10")),
+    health_interval=float(os.getenv("WEATHER_MCP_HEALTH_INTERVAL", "30")),
+)
 
 
-hidden_gem_agent = SequentialAgent(
+# Full agent graph: every stage is an LLM agent (kept as the fallback mode)
+agent_pipeline = SequentialAgent(
     name="IGOTYOU_Agent",
     description="Your role is to manages user interaction and delegates to specialized sub-agents",
     sub_agents=[
@@ -53,8 +73,29 @@ hidden_gem_agent = SequentialAgent(
         analysis_agent,
         recommendation_agent
     ],
+    **latency_callbacks(model=False),
 )
 
+# Fast path: search + analysis run as plain Python, only the
+# recommendation step calls Gemini
+fast_pipeline = SequentialAgent(
+    name="IGOTYOU_Fast_Agent",
+    description="Finds hidden outdoor gems: searches places, filters them, and writes the recommendations",
+    sub_agents=[
+        FastDiscoveryAgent(
+            name="Fast_Discovery_Agent",
+            description="Runs the places search and analysis tools directly, without LLM turns.",
+            **latency_callbacks(model=False),
+        ),
+        build_recommendation_agent(),
+    ],
+    **latency_callbacks(model=False),
+)
+
+# PIPELINE_MODE=fast (default) or PIPELINE_MODE=agents for the LLM graph
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "fast").lower()
+hidden_gem_agent = agent_pipeline if PIPELINE_MODE == "agents" else fast_pipeline
+
 root_agent = Agent(
     name="IGOTYOU_Concierge",
     model=Gemini(
@@ -97,8 +138,9 @@ root_agent = Agent(
     """,
     tools=[
         AgentTool(agent=hidden_gem_agent),
-        McpToolset(connection_params=weather_params)
-    ]
+        PooledMcpToolset(weather_forecast_pool)
+    ],
+    **latency_callbacks(),
 )
 
 # engine of the agent
@@ -0,0 +1,134 @@
+"""
+Business Exclusion Classifier
+
+The hidden gem filter drops businesses (restaurants, shops, hotels, ...) by
+name keyword and by Google place type. It used to test every keyword as a
+substring of every name, so "Barnes Falls" was a bar and "Inner Lake" an
+inn, and the rules were hard-coded in the analysis module.
+
+HOW IT WORKS:
+1. The rules are compiled once at import: all name keywords into ONE
+   case-insensitive regex, the place types into a frozenset. Keywords of
+   STEM_MIN_LEN letters or more match as word stems, so localized and
+   compound names are caught ("Restaurante", "Hotelul", "Coffeeshop");
+   shorter ones match whole words only (plural "s"/"es" allowed), so
+   "Barnes Falls" is not a bar and "Inner Lake" not an inn
+2. A name is a business if the regex finds a keyword in it (accents are
+   folded first, so "Café" matches "cafe"); a place is a business if its
+   types intersect the business types
+3. classify() takes a whole batch (one search page) and returns one flag
+   per candidate
+4. Rules can be replaced or extended from a JSON file named by
+   BUSINESS_RULES_PATH:
+       {"keywords": [...], "types": [...]}            replaces the defaults
+       {"add_keywords": [...], "add_types": [...]}    extends them
+
+Benchmark: `python benchmarks/bench_business_filter.py`
+"""
+
+import json
+import os
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+
+# keywords that indicate a business, not a natural place
+DEFAULT_KEYWORDS = (
+    'restaurant', 'cafe', 'coffee', 'hotel', 'hostel', 'inn',
+    'shop', 'store', 'market', 'bar', 'pub', 'club', 'nightclub',
+    'bakery', 'bistro', 'eatery', 'dining', 'diner', 'pizzeria',
+    'mall', 'boutique', 'salon', 'spa', 'gym', 'school', 'instructor', 'rental', 'center',
+)
+# keywords this long match as word stems ("hotel" -> "Hotelul")
+STEM_MIN_LEN = 5
+# google places types that are businesses
+DEFAULT_TYPES = (
+    'restaurant', 'cafe', 'bar', 'food', 'meal_takeaway',
+    'lodging', 'store', 'shopping_mall', 'department_store',
+    'bakery', 'night_club', 'casino', 'school', 'travel_agency', 'ski_school',
+)
+
+
+def _fold(text: str) -> str:
+    """Removes accents ("Café" -> "Cafe"); ASCII names skip the work."""
+    if text.isascii():
+        return text
+    return "".join(ch for ch in unicodedata.normalize("NFKD", text)
+                   if not unicodedata.combining(ch))
+
+
+class BusinessClassifier:
+    """
+    Decides which candidates are businesses.
+
+    Args:
+        keywords: Words that mark a business name
+        types: Google place types that mark a business
+        stem_min_len: Keywords this long match as word stems, shorter ones
+            as whole words
+    """
+
+    def __init__(self, keywords: Iterable[str] = DEFAULT_KEYWORDS,
+                 types: Iterable[str] = DEFAULT_TYPES, stem_min_len: int = STEM_MIN_LEN):
+        self.keywords = tuple(dict.fromkeys(_fold(k).lower() for k in keywords if k))
+        self.types = frozenset(t.lower() for t in types if t)
+
+        # Longest first, so "nightclub" wins over "club" in the alternation
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        stems = "|".join(re.escape(k) for k in ordered if len(k) >= stem_min_len)
+        words = "|".join(re.escape(k) for k in ordered if len(k) < stem_min_len)
+        parts = ([rf"\b(?:{stems})\w*"] if stems else []) + ([rf"\b(?:{words})(?:e?s)?\b"] if words else [])
+        self._name_re = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+
+    def business_keyword(self, name: str) -> Optional[str]:
+        """The keyword that marks `name` as a business, or None."""
+        if self._name_re is None or not name:
+            return None
+        match = self._name_re.search(_fold(name))
+        return match.group(0).lower() if match else None
+
+    def is_business(self, cand: dict) -> bool:
+        if not self.types.isdisjoint(cand.get('types') or ()):
+            return True
+        return self.business_keyword(cand.get('name', '')) is not None
+
+    def classify(self, cands: List[dict]) -> List[bool]:
+        """One flag per candidate: True if it is a business."""
+        types, search = self.types, self._name_re.search if self._name_re else None
+        flags = []
+        for c in cands:
+            if not types.isdisjoint(c.get('types') or ()):
+                flags.append(True)
+            elif search is not None:
+                flags.append(search(_fold(c.get('name') or '')) is not None)
+            else:
+                flags.append(False)
+        return flags
+
+    @classmethod
+    def from_file(cls, path: str) -> "BusinessClassifier":
+        """Loads rules from a JSON file (see the module docstring)."""
+        with open(path, encoding="utf-8") as f:
+            rules = json.load(f)
+        keywords = list(rules.get("keywords", DEFAULT_KEYWORDS)) + list(rules.get("add_keywords", ()))
+        types = list(rules.get("types", DEFAULT_TYPES)) + list(rules.get("add_types", ()))
+        return cls(keywords, types)
+
+
+def load_classifier() -> BusinessClassifier:
+    """The classifier for BUSINESS_RULES_PATH, or the default rules."""
+    path = os.getenv("BUSINESS_RULES_PATH")
+    if path:
+        try:
+            classifier = BusinessClassifier.from_file(path)
+            print(f"[Analysis] Loaded business rules from {path} "
+                  f"({len(classifier.keywords)} keywords, {len(classifier.types)} types)")
+            return classifier
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not load business rules from {path}: {e}; using defaults")
+    return BusinessClassifier()
+
+
+# Shared instance used by the analysis step
+business_classifier = load_classifier()
@@ -3,6 +3,11 @@ import googlemaps
 from dotenv import load_dotenv
 from pathlib import Path
 
+try:
+    from .maps_client import AsyncMapsClient
+except ImportError:
+    from maps_client import AsyncMapsClient
+
 # Load environment API keys
 # Look for .env file in the root directory (parent of IGotYou_Agent)
 root_dir = Path(__file__).parent.parent
@@ -26,7 +31,7 @@ if not GOOGLE_MAPS_API_KEY:
 # Set as environment variable for Google ADK to pick up automatically
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-# 2. Shared Google Maps Client
+# 2. Shared Google Maps Clients
 # We create one instance here to be imported by Discovery and Analysis agents.
 
 try:
@@ -34,3 +39,14 @@ try:
 except Exception as e:
     gmaps_client = None
     print(f"Error initializing Google Maps client: {e}")
+
+# Async Places client used by the tools, so Maps calls don't block the event loop
+try:
+    maps_client = AsyncMapsClient(
+        key=GOOGLE_MAPS_API_KEY,
+        timeout=float(os.getenv("MAPS_TIMEOUT", "10")),
+        max_connections=int(os.getenv("MAPS_MAX_CONNECTIONS", "20")),
+    )
+except Exception as e:
+    maps_client = None
+    print(f"Error initializing async Google Maps client: {e}")
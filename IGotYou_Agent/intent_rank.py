@@ -0,0 +1,257 @@
+"""
+Intent-Aware Candidate Ranking
+
+The hidden gem ranking only looks at review-count tiers and ratings, so
+"quiet lake for a family picnic" and "photography spots" get the same top 3
+from the same candidates. This module re-ranks the best candidates by how
+well they match what the user asked for, with a local BM25 index and no
+extra LLM call.
+
+HOW IT WORKS:
+1. The location phrase of the request ("near Brasov") is removed - the
+   area discovery searched when it is known, else every "in/near/around/at
+   <place>" phrase up to the next "for/with/to/...", comma or period
+2. The rest is tokenized; experience types (adventure, relaxation,
+   photography, cultural) and groups (solo, couple, family, friends) are
+   recognized and expanded with related words ("family" -> easy, kids,
+   picnic, ...) at half weight
+3. Each candidate becomes a small document: its name (counted twice), its
+   Places `types` and, where the Place Details cache already has them, its
+   review texts (nothing is fetched for this)
+4. A BM25 index over those documents scores every candidate against the
+   query; scores are normalized to 0..1 (`relevance`)
+5. The top candidates are re-sorted by gem score + weight * relevance, then
+   rating; a candidate that matches nothing keeps its place relative to
+   the others, and a request with no recognizable terms changes nothing
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Experience types and groups: trigger words -> expansion terms
+EXPERIENCES = {
+    "adventure": (("adventure", "adventurous", "hike", "hiking", "climb", "climbing", "thrill", "challenging"),
+                  ("trail", "hike", "peak", "summit", "canyon", "gorge", "cave", "climb", "ridge", "wild")),
+    "relaxation": (("relax", "relaxing", "relaxation", "calm", "chill", "peaceful", "quiet", "unwind"),
+                   ("quiet", "peaceful", "calm", "lake", "beach", "swim", "meadow", "shade", "bench", "spring")),
+    "photography": (("photo", "photos", "photography", "photographer", "instagram", "pictures", "shots"),
+                    ("view", "viewpoint", "panorama", "sunset", "sunrise", "scenic", "reflection", "lookout")),
+    "cultural": (("culture", "cultural", "history", "historic", "historical", "heritage"),
+                 ("historic", "ruin", "castle", "monastery", "church", "fortress", "museum", "monument")),
+}
+GROUPS = {
+    "solo": (("solo", "alone", "myself"), ("quiet", "trail", "secluded")),
+    "couple": (("couple", "partner", "romantic", "girlfriend", "boyfriend", "wife", "husband", "date"),
+               ("romantic", "sunset", "view", "secluded", "picnic")),
+    "family": (("family", "kids", "children", "child", "toddler", "parents"),
+               ("easy", "kid", "children", "family", "picnic", "playground", "short", "accessible", "safe")),
+    "friends": (("friends", "group", "buddies"), ("camp", "picnic", "swim", "bbq", "group")),
+}
+
+STOPWORDS = frozenset("""
+    a an and are at be but by for from i in into is it me my near of on or our some that the
+    this to us we with want looking find show place places spot spots somewhere go going
+    visit around can could would like please hidden gem gems best good great nice
+""".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# The place part of a request ("... near Brasov") says nothing about fit;
+# it ends where the request goes on ("... near Brasov for photography")
+_PLACE_PREP = r"\b(?:in|near|around|at)\s+"
+_WHERE = re.compile(
+    _PLACE_PREP + r"((?:(?!\b(?:for|with|to|during|on|and|or|but|that|where|when|while|so|if|"
+    r"in|near|around|at)\b)"
+    r"[^,.;:!?()])+)",
+    re.IGNORECASE,
+)
+# "at sunrise", "in the morning", "in hiking": not places
+_NOT_PLACES = frozenset("""
+    sunrise sunset dawn dusk night noon midday morning evening afternoon weekend weekday
+    spring summer autumn fall winter season january february march april may june july
+    august september october november december
+""".split())
+
+
+def _stem(word: str) -> str:
+    """Light plural stemming so "lakes" matches "lake"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [_stem(w) for w in _WORD_RE.findall(text.replace("_", " ")) if w not in STOPWORDS]
+
+
+class Intent(NamedTuple):
+    experiences: List[str]
+    groups: List[str]
+    terms: Dict[str, float]    # query term -> weight
+
+
+def _recognize(kinds: dict, words: set, terms: Dict[str, float]) -> List[str]:
+    """Names of the `kinds` triggered by `words`; adds their expansion terms."""
+    names = []
+    for name, (triggers, expansion) in kinds.items():
+        if words.intersection(triggers):
+            names.append(name)
+            for t in map(_stem, expansion):
+                terms[t] = max(terms.get(t, 0.0), 0.5)
+    return names
+
+
+def _intent_words() -> frozenset:
+    words = set(_NOT_PLACES)
+    for kinds in (EXPERIENCES, GROUPS):
+        for triggers, expansion in kinds.values():
+            words.update(triggers)
+            words.update(map(_stem, expansion))
+    return frozenset(words)
+
+
+_INTENT_WORDS = _intent_words()
+
+
+def _is_place(phrase: str) -> bool:
+    first = _WORD_RE.findall(phrase.lower())[:2]
+    # "in the morning" -> look past "the"
+    if first and first[0] == "the":
+        first = first[1:]
+    return bool(first) and first[0] not in _INTENT_WORDS and _stem(first[0]) not in _INTENT_WORDS
+
+
+def place_of(query: str) -> Optional[str]:
+    """
+    The area a search query names, if any.
+
+    Example:
+        >>> place_of("waterfalls near Brasov for photography")
+        'Brasov'
+    """
+    for match in _WHERE.finditer(query or ""):
+        if _is_place(match.group(1)):
+            return match.group(1).strip()
+    return None
+
+
+def strip_place(text: str, area: Optional[str] = None) -> str:
+    """
+    Removes the location phrase(s) from a request.
+
+    Args:
+        text: The user's request
+        area: The area discovery searched ("Brasov"), if known; only that
+            phrase is removed when the text contains it
+
+    Example:
+        >>> strip_place("waterfalls near Brasov for photography")
+        'waterfalls for photography'
+    """
+    text = text or ""
+    if area:
+        stripped, n = re.subn(_PLACE_PREP + re.escape(area.strip()) + r"\b", "", text,
+                              flags=re.IGNORECASE)
+        if n:
+            return " ".join(stripped.split())
+
+    stripped = _WHERE.sub(lambda m: "" if _is_place(m.group(1)) else m.group(0), text)
+    return " ".join(stripped.split())
+
+
+def parse_intent(text: str, area: Optional[str] = None) -> Intent:
+    """
+    Args:
+        text: The user's request
+        area: The area discovery searched, if known (see strip_place)
+
+    Example:
+        >>> parse_intent("quiet lakes near Cluj for a family picnic").groups
+        ['family']
+    """
+    text = strip_place(text, area)
+    words = set(_WORD_RE.findall(text.lower()))
+    terms: Dict[str, float] = {t: 1.0 for t in tokenize(text)}
+    experiences = _recognize(EXPERIENCES, words, terms)
+    groups = _recognize(GROUPS, words, terms)
+    return Intent(experiences, groups, terms)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a handful of tokenized documents.
+
+    Args:
+        docs: Tokenized documents
+        k1: Term frequency saturation
+        b: Document length normalization
+    """
+
+    def __init__(self, docs: List[List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.tfs = [Counter(d) for d in docs]
+        self.lengths = [len(d) for d in docs]
+        self.avgdl = (sum(self.lengths) / len(docs)) if docs else 0.0
+        df = Counter(t for tf in self.tfs for t in tf)
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, terms: Dict[str, float]) -> List[float]:
+        out = []
+        for tf, length in zip(self.tfs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avgdl) if self.avgdl else self.k1
+            s = 0.0
+            for term, weight in terms.items():
+                f = tf.get(term)
+                if f:
+                    s += weight * self.idf[term] * f * (self.k1 + 1) / (f + norm)
+            out.append(s)
+        return out
+
+
+def candidate_document(cand: dict, reviews_text: str = "") -> List[str]:
+    name = tokenize(cand.get("name", ""))
+    return name + name + tokenize(" ".join(cand.get("types") or [])) + tokenize(reviews_text)
+
+
+def rerank(ranked: List[dict], intent_text: str, reviews: Optional[Dict[str, str]] = None,
+           weight: float = 1.0, top: int = 50, area: Optional[str] = None) -> List[dict]:
+    """
+    Re-ranks the `top` best candidates by gem score + weight * relevance.
+
+    Args:
+        ranked: Candidates as ranked by CandidateScorer (with `score`)
+        intent_text: The user's request
+        reviews: place_id -> cached review text
+        weight: How many gem score tiers a perfect match is worth (0 = off)
+        top: How many of the best candidates are re-ranked
+        area: The area discovery searched, if known (see strip_place)
+
+    Returns:
+        The re-ranked list (candidates annotated with `relevance`)
+    """
+    intent = parse_intent(intent_text, area)
+    if weight <= 0 or not intent.terms or len(ranked) < 2:
+        return ranked
+
+    head, tail = ranked[:top], ranked[top:]
+    reviews = reviews or {}
+    index = BM25Index([candidate_document(c, reviews.get(c.get("place_id"), "")) for c in head])
+    scores = index.scores(intent.terms)
+    best = max(scores)
+    if best <= 0:
+        return ranked
+
+    for c, s in zip(head, scores):
+        c["relevance"] = round(s / best, 3)
+    # stable: equal combined scores keep the gem ranking's order
+    head = sorted(head, key=lambda c: (c.get("score", 0) + weight * c["relevance"],
+                                       c.get("rating", 0)), reverse=True)
+    return head + tail
@@ -0,0 +1,265 @@
+"""
+Per-Stage Latency Recording
+
+Breaks one request's wall-clock time down into the parts it was spent on:
+each agent, each Gemini call, each tool call, each external HTTP call
+(Google Maps) and the backend's own parsing.
+
+HOW IT WORKS:
+1. The backend opens a recording for a request (`with recording() as rec:`)
+2. The recorder lives in a context variable, so everything that runs
+   inside that request - ADK agent/model callbacks, tools, Maps calls -
+   finds it without passing it around. AgentTool's nested pipeline runs in
+   the same context, so its agents are timed too (their events are not
+   visible to the backend).
+3. Code that is not running inside a recording pays one ContextVar lookup
+4. The recorder returns a breakdown dict for the response and the logs
+
+Agent, Gemini and tool timings are also fed to the Prometheus histograms
+in metrics.py, whether or not a recording is active. Gemini retries happen
+inside the google-genai SDK, below the model callbacks; they are counted
+from the SDK's "Retrying ..." log record, one per retried attempt.
+
+Span kinds: "agent", "llm", "tool", "http", "backend". Spans nest (an
+agent span contains its llm and tool spans), so the per-kind totals
+overlap and don't add up to the request total.
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import re
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from .metrics import AGENT_SECONDS, GEMINI_ERRORS, GEMINI_RETRIES, LLM_SECONDS, TOOL_SECONDS
+except ImportError:
+    from metrics import AGENT_SECONDS, GEMINI_ERRORS, GEMINI_RETRIES, LLM_SECONDS, TOOL_SECONDS
+
+
+class LatencyRecorder:
+    """Collects timed spans for one request."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.spans: List[dict] = []
+        self._lock = Lock()  # tools may run in worker threads
+
+    def add(self, kind: str, name: str, start: float, end: float) -> None:
+        """Records a span from perf_counter() start/end values."""
+        with self._lock:
+            self.spans.append({
+                "kind": kind,
+                "name": name,
+                "startMs": round((start - self.started_at) * 1000, 1),
+                "ms": round((end - start) * 1000, 1),
+            })
+
+    def breakdown(self) -> dict:
+        """
+        Returns:
+            dict: {"totalMs", "byKind": {kind: ms}, "spans": [...]}, spans
+            ordered by start time
+        """
+        total_ms = round((time.perf_counter() - self.started_at) * 1000, 1)
+        by_kind: Dict[str, float] = {}
+        for span in self.spans:
+            by_kind[span["kind"]] = round(by_kind.get(span["kind"], 0) + span["ms"], 1)
+        return {
+            "totalMs": total_ms,
+            "byKind": by_kind,
+            "spans": sorted(self.spans, key=lambda s: s["startMs"]),
+        }
+
+    def log(self, prefix: str = "[Latency]") -> None:
+        """Prints one line per span plus the per-kind totals."""
+        data = self.breakdown()
+        for span in data["spans"]:
+            print(f"{prefix} {span['kind']:<8} {span['name']:<32} "
+                  f"+{span['startMs']:>8.1f}ms {span['ms']:>8.1f}ms")
+        totals = ", ".join(f"{kind}={ms:.0f}ms" for kind, ms in data["byKind"].items())
+        print(f"{prefix} total={data['totalMs']:.0f}ms ({totals})")
+
+
+_current: contextvars.ContextVar[Optional[LatencyRecorder]] = contextvars.ContextVar(
+    "latency_recorder", default=None)
+
+
+def current() -> Optional[LatencyRecorder]:
+    """The recorder of the request being handled, if any."""
+    return _current.get()
+
+
+@contextmanager
+def recording() -> Iterator[LatencyRecorder]:
+    """Records spans for everything run inside the block."""
+    recorder = LatencyRecorder()
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # An async generator closed from another context (client gone)
+            pass
+
+
+@contextmanager
+def span(kind: str, name: str) -> Iterator[None]:
+    """Times the block as one span (no-op outside a recording)."""
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(kind, name, start, time.perf_counter())
+
+
+def timed_tool(func: Callable) -> Callable:
+    """
+    Decorator for ADK function tools. functools.wraps keeps the name,
+    docstring and signature ADK builds the tool declaration from. Works
+    for both plain and async functions.
+    """
+    histogram = TOOL_SECONDS.labels(tool=func.__name__)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with histogram.time(), span("tool", func.__name__):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with histogram.time(), span("tool", func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# ----------------------------------------------------------------------
+# ADK callbacks (agent and Gemini timings)
+# ----------------------------------------------------------------------
+
+# Start times of spans opened in a before_* callback, closed in after_*
+_open: Dict[tuple, float] = {}
+_MAX_OPEN = 10000  # runs that died between callbacks never close their span
+
+
+def _begin(kind: str, callback_context) -> None:
+    if len(_open) > _MAX_OPEN:
+        _open.clear()
+    _open[(kind, callback_context.invocation_id, callback_context.agent_name)] = time.perf_counter()
+
+
+def _end(kind: str, callback_context) -> Optional[float]:
+    """Closes the span; returns its duration in seconds (None if never opened)."""
+    start = _open.pop((kind, callback_context.invocation_id, callback_context.agent_name), None)
+    if start is None:
+        return None
+    end = time.perf_counter()
+    recorder = _current.get()
+    if recorder is not None:
+        name = callback_context.agent_name if kind == "agent" else f"gemini:{callback_context.agent_name}"
+        recorder.add(kind, name, start, end)
+    return end - start
+
+
+def before_agent(callback_context) -> None:
+    _begin("agent", callback_context)
+    return None
+
+
+def after_agent(callback_context) -> None:
+    seconds = _end("agent", callback_context)
+    if seconds is not None:
+        AGENT_SECONDS.labels(agent=callback_context.agent_name).observe(seconds)
+    return None
+
+
+def before_model(callback_context, llm_request) -> None:
+    _begin("llm", callback_context)
+    _model_agent.set(callback_context.agent_name)
+    return None
+
+
+def after_model(callback_context, llm_response) -> None:
+    if getattr(llm_response, "partial", False):
+        return None
+    seconds = _end("llm", callback_context)
+    if seconds is not None:
+        LLM_SECONDS.labels(agent=callback_context.agent_name).observe(seconds)
+    error_code = getattr(llm_response, "error_code", None)
+    if error_code:
+        GEMINI_ERRORS.labels(agent=callback_context.agent_name, code=error_code).inc()
+    return None
+
+
+def on_model_error(callback_context, llm_request, error) -> None:
+    """Counts Gemini calls that raised (e.g. 429 RESOURCE_EXHAUSTED after retries)."""
+    _end("llm", callback_context)
+    code = getattr(error, "code", None) or type(error).__name__
+    GEMINI_ERRORS.labels(agent=callback_context.agent_name, code=code).inc()
+    return None
+
+
+# ----------------------------------------------------------------------
+# Gemini retries (inside the SDK)
+# ----------------------------------------------------------------------
+
+# Agent whose Gemini call is in progress in this context (set in before_model)
+_model_agent: contextvars.ContextVar[str] = contextvars.ContextVar("gemini_agent", default="unknown")
+
+# "Retrying ... as it raised ClientError: 429 RESOURCE_EXHAUSTED. ..."
+_RETRY_RE = re.compile(r"^Retrying .* as it raised (\w+): (?:(\d{3}) )?")
+
+
+class _GeminiRetryCounter(logging.Handler):
+    """Counts the SDK's before-sleep log records into GEMINI_RETRIES."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            match = _RETRY_RE.match(record.getMessage())
+        except Exception:
+            return
+        if match:
+            status = match.group(2) or match.group(1)
+            GEMINI_RETRIES.labels(agent=_model_agent.get(), status=status).inc()
+
+
+def _count_gemini_retries() -> None:
+    logger = logging.getLogger("google_genai._api_client")
+    if any(isinstance(h, _GeminiRetryCounter) for h in logger.handlers):
+        return
+    logger.addHandler(_GeminiRetryCounter(logging.INFO))
+    # The SDK logs its retries at INFO
+    if logger.getEffectiveLevel() > logging.INFO:
+        logger.setLevel(logging.INFO)
+
+
+_count_gemini_retries()
+
+
+def latency_callbacks(model: bool = True) -> Dict[str, Any]:
+    """
+    Callback keyword arguments for an ADK agent, e.g.
+    `Agent(..., **latency_callbacks())`. Use model=False for agents
+    without a model (SequentialAgent).
+    """
+    callbacks = {
+        "before_agent_callback": before_agent,
+        "after_agent_callback": after_agent,
+    }
+    if model:
+        callbacks["before_model_callback"] = before_model
+        callbacks["after_model_callback"] = after_model
+        callbacks["on_model_error_callback"] = on_model_error
+    return callbacks
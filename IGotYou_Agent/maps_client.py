@@ -0,0 +1,179 @@
+"""
+Async Google Places Client
+
+The `googlemaps.Client` used before is synchronous: every Places call
+blocked the event loop that FastAPI and ADK share, so one slow search
+stalled every other request in the process. This client does the same
+calls with httpx's async client:
+
+- Keep-alive connection pooling (one pool per event loop)
+- HTTP/2 when the `h2` package is installed, HTTP/1.1 otherwise
+- A timeout on every call (overridable per call)
+- A couple of retries on 5xx / OVER_QUERY_LIMIT / network errors
+- Every call (and retry) first takes a token from the shared rate limiter
+  of its API method (see rate_limit.py); pass `deadline` to fail fast
+  instead of queueing past it
+- The same response shape as googlemaps: `places()` / `places_nearby()`
+  return the Text / Nearby Search body ({"results": [...], "status": ...}) and `place()` the Place
+  Details body ({"result": {...}, "status": ...})
+
+Like googlemaps, statuses other than OK / ZERO_RESULTS raise MapsApiError.
+"""
+
+import asyncio
+import weakref
+from typing import Iterable, Optional
+
+import httpx
+
+try:
+    from .rate_limit import limiter
+except ImportError:
+    from rate_limit import limiter
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+PLACES_BASE_URL = "https://maps.googleapis.com/maps/api/place"
+
+# Statuses worth retrying (the request itself was fine)
+_RETRY_STATUSES = frozenset({"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"})
+
+
+class MapsApiError(Exception):
+    """A Places API call returned an error status (mirrors googlemaps.exceptions.ApiError)."""
+
+    def __init__(self, status: str, message: Optional[str] = None):
+        super().__init__(f"{status}: {message}" if message else status)
+        self.status = status
+        self.message = message
+
+
+class AsyncMapsClient:
+    """
+    Async Places API client.
+
+    Args:
+        key: Google Maps API key
+        timeout: Default seconds per call (connect + read)
+        max_connections: Connection pool size per event loop
+        max_keepalive: Idle keep-alive connections kept per event loop
+        retries: Extra attempts on retriable failures
+    """
+
+    def __init__(
+        self,
+        key: str,
+        timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        retries: int = 2,
+    ):
+        self.key = key
+        self.timeout = timeout
+        self.retries = retries
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        # httpx pools belong to the loop they were opened on
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary())
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=PLACES_BASE_URL,
+                http2=HTTP2_AVAILABLE,
+                limits=self._limits,
+                timeout=self.timeout,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def _get(self, api: str, path: str, params: dict, timeout: Optional[float],
+                   deadline: Optional[float], retry_statuses: frozenset = _RETRY_STATUSES) -> dict:
+        params = {k: v for k, v in params.items() if v is not None}
+        params["key"] = self.key
+        bucket = limiter(api)
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            await bucket.acquire(deadline)
+            try:
+                response = await self._client().get(
+                    path, params=params, timeout=timeout or self.timeout)
+            except httpx.TransportError:
+                # Timeouts and connection errors
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    body = response.json()
+                    status = body.get("status", "OK")
+                    if status in ("OK", "ZERO_RESULTS"):
+                        return body
+                    if status not in retry_statuses or last_attempt:
+                        raise MapsApiError(status, body.get("error_message"))
+                elif last_attempt:
+                    response.raise_for_status()
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def places(self, query: str, page_token: Optional[str] = None,
+                     timeout: Optional[float] = None, deadline: Optional[float] = None,
+                     **params) -> dict:
+        """
+        Text Search (same as googlemaps `Client.places(query=...)`).
+
+        Pass the previous response's `next_page_token` as `page_token` for the
+        next page (20 results each, 3 pages at most). A new token only becomes
+        valid after a short delay, so INVALID_REQUEST is retried for pages.
+        """
+        retry_statuses = (_RETRY_STATUSES | {"INVALID_REQUEST"}) if page_token else _RETRY_STATUSES
+        return await self._get("places", "/textsearch/json",
+                               {"query": query, "pagetoken": page_token, **params},
+                               timeout, deadline, retry_statuses)
+
+    async def places_nearby(self, location: str, radius: int, keyword: Optional[str] = None,
+                            page_token: Optional[str] = None,
+                            timeout: Optional[float] = None, deadline: Optional[float] = None,
+                            **params) -> dict:
+        """Nearby Search (same as googlemaps `Client.places_nearby(location=..., radius=...)`)."""
+        retry_statuses = (_RETRY_STATUSES | {"INVALID_REQUEST"}) if page_token else _RETRY_STATUSES
+        return await self._get("places_nearby", "/nearbysearch/json", {
+            "location": location,
+            "radius": radius,
+            "keyword": keyword,
+            "pagetoken": page_token,
+            **params,
+        }, timeout, deadline, retry_statuses)
+
+    async def place(
+        self,
+        place_id: str,
+        fields: Optional[Iterable[str]] = None,
+        reviews_sort: Optional[str] = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        **params,
+    ) -> dict:
+        """Place Details (same as googlemaps `Client.place(place_id, fields=...)`)."""
+        return await self._get("place", "/details/json", {
+            "place_id": place_id,
+            "fields": ",".join(fields) if fields else None,
+            "reviews_sort": reviews_sort,
+            **params,
+        }, timeout, deadline)
+
+    async def aclose(self) -> None:
+        """Closes the pool of the current event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
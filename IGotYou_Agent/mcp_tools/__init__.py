@@ -9,10 +9,19 @@ with external services in a standardized way.
 """
 
 # Export the weather tool for use by other agents
-from .weather_tool import get_weather_sync, get_weather_for_location
+from .weather_tool import (
+    get_weather_sync,
+    get_weather_for_location,
+    get_weather_batch,
+    weather_cache,
+    weather_pool,
+)
 
 __all__ = [
     "get_weather_sync",
     "get_weather_for_location",
+    "get_weather_batch",
+    "weather_cache",
+    "weather_pool",
 ]
 
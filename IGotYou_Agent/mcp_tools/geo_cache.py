@@ -0,0 +1,167 @@
+"""
+Geo-Bucketed Weather Cache
+
+The weather cache used to be an unbounded dict keyed on coordinates rounded
+to 4 decimals (~11 m): gems a few hundred meters apart never shared an
+entry, the dict grew forever, and an MCP failure returned "Weather
+unavailable" even when a slightly older forecast was sitting in the cache.
+
+HOW IT WORKS:
+1. Coordinates are mapped to a geo bucket: a geohash cell (precision 5 =
+   ~5 x 5 km by default) or, in "city" mode, the gem's city when it is
+   known; everything in one bucket shares one entry
+2. Entries are FRESH for `ttl_seconds`; after that they are STALE for
+   `stale_seconds` more - served at once while a background refresh runs
+   (stale-while-revalidate)
+3. Entries older than that are a miss, but are still kept (up to
+   `stale_if_error_seconds`) to be served if the refresh fails
+   (stale-if-error)
+4. The cache is an LRU bounded by entry count; hits, stale hits, misses and
+   stale-if-error answers are counted (stats() and the
+   igotyou_weather_cache_requests_total metric)
+"""
+
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lng: float, precision: int = 5) -> str:
+    """
+    Standard geohash of a point.
+
+    Example:
+        >>> geohash(45.6427, 25.5887)
+        'u845w'
+    """
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, value, bits, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, x = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if x >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value, bits = 0, 0
+    return "".join(chars)
+
+
+def city_key(city: str) -> str:
+    text = unicodedata.normalize("NFKD", city.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+class WeatherCache:
+    """
+    LRU + TTL weather cache keyed on geo buckets.
+
+    Args:
+        ttl_seconds: How long an entry is fresh
+        stale_seconds: How long after that it is served while refreshing
+        stale_if_error_seconds: How old an entry may be to be served when
+            the weather server fails
+        max_entries: Maximum buckets kept
+        bucket: "geohash:<precision>" or "city" (falls back to the geohash
+            when a location has no city)
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, stale_seconds: float = 3 * 3600,
+                 stale_if_error_seconds: float = 24 * 3600, max_entries: int = 2048,
+                 bucket: str = "geohash:5"):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.stale_if_error_seconds = stale_if_error_seconds
+        self.max_entries = max_entries
+
+        mode, _, precision = bucket.partition(":")
+        self.by_city = mode == "city"
+        self.precision = int(precision) if precision else 5
+
+        # bucket -> (weather, fetched_at)
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stale_if_error = 0
+        self.evictions = 0
+
+    def bucket(self, lat: float, lng: float, city: Optional[str] = None) -> str:
+        """The cache key for a location."""
+        if self.by_city and city and city_key(city):
+            return f"city:{city_key(city)}"
+        return f"gh:{geohash(lat, lng, self.precision)}"
+
+    def get(self, key: str) -> Tuple[Optional[dict], str]:
+        """
+        Returns:
+            (weather, state): state is "fresh", "stale" (serve and refresh)
+            or "miss" (weather is None)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                age = now - entry[1]
+                if age < self.ttl_seconds:
+                    self.hits += 1
+                    return entry[0], "fresh"
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self.stale_hits += 1
+                    return entry[0], "stale"
+            self.misses += 1
+            return None, "miss"
+
+    def get_if_error(self, key: str) -> Optional[dict]:
+        """An entry of any age up to stale_if_error_seconds (the server failed)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] >= self.stale_if_error_seconds:
+                return None
+            self.stale_if_error += 1
+            return entry[0]
+
+    def put(self, key: str, weather: dict) -> None:
+        with self._lock:
+            self._entries[key] = (weather, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "bucket": "city" if self.by_city else f"geohash:{self.precision}",
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "staleIfError": self.stale_if_error,
+            "hitRate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,63 @@
+"""
+ADK Toolset Backed by a Pooled MCP Session
+
+McpToolset opens its own connection to the MCP server. This toolset exposes
+the same tools to an agent, but calls them through a McpSessionPool (see
+session_pool.py), so the agent shares the pool's warm sessions and its
+tool list instead of cold-starting the server.
+"""
+
+from typing import List, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from .session_pool import McpSessionPool
+
+
+class PooledMcpTool(BaseTool):
+    """One MCP tool, called through the pool."""
+
+    def __init__(self, pool: McpSessionPool, mcp_tool):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self._pool = pool
+        self._input_schema = mcp_tool.inputSchema
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters_json_schema=self._input_schema,
+        )
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        result = await self._pool.call_tool(self.name, args)
+        # Same response shape as ADK's McpTool
+        return result.model_dump(exclude_none=True, mode="json")
+
+
+class PooledMcpToolset(BaseToolset):
+    """
+    The tools of a pooled MCP server.
+
+    Args:
+        pool: The session pool (its lifecycle belongs to the app, not the toolset)
+    """
+
+    def __init__(self, pool: McpSessionPool):
+        super().__init__()
+        self._pool = pool
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        try:
+            tools = await self._pool.list_tools()
+        except Exception as e:
+            print(f"[MCP] {self._pool.name} tools unavailable: {e}")
+            return []
+        return [PooledMcpTool(self._pool, t) for t in tools]
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,336 @@
+"""
+Pooled MCP Client Sessions
+
+Every weather lookup used to start the MCP server as a new subprocess, run
+the initialize handshake and list_tools, make ONE call and tear it all down
+again - seconds of overhead for a single RPC. The concierge's weather
+toolset paid the same cold start. This module keeps warm sessions instead.
+
+HOW IT WORKS:
+1. A pool owns `size` sessions to one MCP server; each session is a
+   background task that starts the server, initializes it and then stays
+   connected (the tool list is fetched once and cached)
+2. Calls go to the ready session with the fewest calls in flight, at most
+   `max_concurrent` per session; a call waits (up to its timeout) while no
+   session is ready
+3. Every `health_interval` seconds each session is pinged; a failed ping,
+   a crashed server or a broken connection restarts that session with
+   exponential backoff, while the other sessions keep serving
+4. Pools start at app startup (start_all) and stop at shutdown (stop_all);
+   they also start lazily on first use. Each pool runs its sessions on its
+   own event loop thread, so callers on any loop or thread (the sync
+   weather wrapper, ADK tools) share the same sessions
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from ..metrics import MCP_CALL_SECONDS, MCP_SESSION_RESTARTS
+except ImportError:
+    from metrics import MCP_CALL_SECONDS, MCP_SESSION_RESTARTS
+
+
+_pools: List["McpSessionPool"] = []
+
+
+class _PooledSession:
+    """One warm connection to the server (see McpSessionPool)."""
+
+    def __init__(self, index: int, max_concurrent: int):
+        self.index = index
+        self.session = None          # mcp.ClientSession while connected
+        self.in_flight = 0
+        self.calls = 0
+        self.restarts = 0
+        self.last_error: Optional[str] = None
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.broken = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class McpSessionPool:
+    """
+    Warm, health-checked sessions to one stdio MCP server.
+
+    Args:
+        name: Pool name (logs, metrics, stats)
+        server_params: Returns the mcp.StdioServerParameters to start the
+            server with (called at each (re)start, so env changes apply)
+        size: Sessions (server processes) kept open
+        max_concurrent: Calls in flight per session
+        call_timeout: Default seconds a call may take, including the wait
+            for a ready session
+        health_interval: Seconds between pings
+        start_timeout: Seconds the initialize handshake may take
+        enabled: Returns False if the pool should not start (e.g. missing
+            API key)
+    """
+
+    def __init__(self, name: str, server_params: Callable[[], Any], size: int = 1,
+                 max_concurrent: int = 4, call_timeout: float = 10.0,
+                 health_interval: float = 30.0, start_timeout: float = 30.0,
+                 enabled: Callable[[], bool] = lambda: True):
+        self.name = name
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.max_concurrent = max(1, max_concurrent)
+        self.call_timeout = call_timeout
+        self.health_interval = health_interval
+        self.start_timeout = start_timeout
+        self.enabled = enabled
+
+        self.tools: Optional[list] = None     # cached list_tools() result
+        self._sessions: List[_PooledSession] = []
+        # The sessions run on the pool's own loop thread, so no caller's
+        # loop (or a caller blocking its loop) can stall them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ready: Optional[asyncio.Event] = None
+        self._closing = False
+        _pools.append(self)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _submit(self, coro) -> concurrent.futures.Future:
+        """Runs a coroutine on the pool's loop, starting the pool first."""
+        with self._lock:
+            if not self.started:
+                if not self.enabled():
+                    coro.close()
+                    raise RuntimeError(f"{self.name} MCP pool is disabled")
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name=f"mcp-{self.name}", daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _start(self) -> None:
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._sessions = [_PooledSession(i, self.max_concurrent) for i in range(self.size)]
+        for s in self._sessions:
+            s.task = asyncio.ensure_future(self._run(s))
+        print(f"[MCP] Starting {self.size} session(s) for {self.name}")
+
+    async def start(self, wait: float = 0.0) -> None:
+        """
+        Starts the sessions (no-op if running or disabled).
+
+        Args:
+            wait: Seconds to wait for the first session to be ready
+        """
+        if not self.enabled():
+            return
+        ready = await asyncio.wrap_future(self._submit(self._wait_ready(wait)))
+        if wait > 0 and not ready:
+            print(f"[MCP] {self.name} not ready after {wait:.0f}s, continuing")
+
+    async def _wait_ready(self, wait: float) -> bool:
+        if wait > 0:
+            try:
+                await asyncio.wait_for(self._ready.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        return self._ready.is_set()
+
+    async def stop(self) -> None:
+        with self._lock:
+            if not self.started:
+                return
+            loop, thread = self._loop, self._thread
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._stop(), loop))
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+        if not thread.is_alive():
+            loop.close()
+        with self._lock:
+            self._thread = self._loop = None
+
+    async def _stop(self) -> None:
+        self._closing = True
+        for s in self._sessions:
+            s.broken.set()
+        tasks = [s.task for s in self._sessions if s.task]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=5)
+            for task in pending:
+                task.cancel()
+        self._sessions = []
+
+    async def _run(self, s: _PooledSession) -> None:
+        """Keeps one session connected, restarting it when it breaks."""
+        try:
+            from mcp import ClientSession, stdio_client
+        except ImportError as e:
+            s.last_error = repr(e)
+            print(f"[MCP] {self.name}: MCP library not installed ({e})")
+            return
+
+        backoff = 1.0
+        while not self._closing:
+            try:
+                async with stdio_client(self.server_params()) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        await asyncio.wait_for(session.initialize(), self.start_timeout)
+                        if self.tools is None:
+                            self.tools = (await session.list_tools()).tools
+                            print(f"[MCP] {self.name} tools: {[t.name for t in self.tools]}")
+                        s.session, backoff = session, 1.0
+                        s.broken.clear()
+                        self._ready.set()
+                        await self._watch(s)
+            except Exception as e:
+                s.last_error = repr(e)
+                print(f"[MCP] {self.name} session {s.index} failed: {e}")
+            finally:
+                s.session = None
+                if not any(other.session for other in self._sessions):
+                    self._ready.clear()
+
+            if self._closing:
+                break
+            s.restarts += 1
+            MCP_SESSION_RESTARTS.labels(pool=self.name).inc()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _watch(self, s: _PooledSession) -> None:
+        """Returns once the session is broken, fails a ping, or the pool stops."""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(s.broken.wait(), self.health_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(s.session.send_ping(), self.call_timeout)
+            except Exception as e:
+                s.last_error = f"ping failed: {e!r}"
+                return
+
+    # ------------------------------------------------------------------
+    # Calls
+    # ------------------------------------------------------------------
+
+    async def _pick(self, deadline: float) -> _PooledSession:
+        while True:
+            ready = [s for s in self._sessions if s.session is not None]
+            if ready:
+                return min(ready, key=lambda s: s.in_flight)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no {self.name} MCP session ready")
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _call(self, name: str, arguments: Dict[str, Any], timeout: float):
+        from mcp.shared.exceptions import McpError
+
+        deadline = time.monotonic() + timeout
+        s = await self._pick(deadline)
+        start = time.perf_counter()
+        status = "ok"
+        async with s.semaphore:
+            session = s.session
+            if session is None:
+                raise ConnectionError(f"{self.name} MCP session restarting")
+            s.in_flight += 1
+            s.calls += 1
+            try:
+                return await asyncio.wait_for(
+                    session.call_tool(name=name, arguments=arguments),
+                    max(0.1, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                status = "timeout"
+                raise
+            except McpError:
+                # the tool failed, the connection is fine
+                status = "error"
+                raise
+            except Exception:
+                status = "error"
+                s.broken.set()
+                raise
+            finally:
+                s.in_flight -= 1
+                MCP_CALL_SECONDS.labels(pool=self.name, tool=name, status=status).observe(
+                    time.perf_counter() - start)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any],
+                        timeout: Optional[float] = None):
+        """
+        Calls an MCP tool on a pooled session (from any event loop).
+
+        Returns:
+            The mcp CallToolResult
+
+        Raises:
+            TimeoutError: no session became ready / the call took too long
+            RuntimeError: the pool is disabled
+        """
+        timeout = timeout or self.call_timeout
+        return await asyncio.wrap_future(self._submit(self._call(name, arguments, timeout)))
+
+    def call_tool_blocking(self, name: str, arguments: Dict[str, Any],
+                           timeout: Optional[float] = None):
+        """call_tool for synchronous callers (never blocks the pool's loop)."""
+        timeout = timeout or self.call_timeout
+        return self._submit(self._call(name, arguments, timeout)).result(timeout + 1)
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """
+        Runs a coroutine on the pool's loop thread, which outlives the
+        caller's loop (e.g. a background refresh started from a
+        short-lived asyncio.run() loop).
+
+        Raises:
+            RuntimeError: the pool is disabled
+        """
+        return self._submit(coro)
+
+    async def list_tools(self, timeout: Optional[float] = None) -> list:
+        """The server's tools (cached from the first session that started)."""
+        if self.tools is None:
+            await self.start(wait=timeout or self.start_timeout)
+        return list(self.tools or [])
+
+    def stats(self) -> dict:
+        sessions = list(self._sessions)
+        return {
+            "started": self.started,
+            "size": self.size,
+            "ready": sum(1 for s in sessions if s.session is not None),
+            "inFlight": sum(s.in_flight for s in sessions),
+            "calls": sum(s.calls for s in sessions),
+            "restarts": sum(s.restarts for s in sessions),
+            "lastErrors": [s.last_error for s in sessions if s.last_error],
+            "tools": [t.name for t in self.tools or []],
+        }
+
+
+async def start_all(wait: float = 0.0) -> None:
+    """Starts every pool (app startup)."""
+    await asyncio.gather(*(pool.start(wait) for pool in _pools))
+
+
+async def stop_all() -> None:
+    """Stops every pool (app shutdown)."""
+    await asyncio.gather(*(pool.stop() for pool in _pools))
+
+
+def stats() -> dict:
+    return {pool.name: pool.stats() for pool in _pools}
@@ -6,8 +6,10 @@ to the mcp-weather server (https://github.com/adhikasp/mcp-weather).
 
 HOW IT WORKS:
 1. We use the MCP Python SDK to connect to the weather server
-2. The server runs as a subprocess and communicates via stdio
-3. We call the weather tool with latitude/longitude coordinates
+2. The server runs as a subprocess and communicates via stdio; it is kept
+   warm in a session pool (see session_pool.py), started with the app
+3. We call the weather tool with latitude/longitude coordinates - one RPC
+   on an already initialized session
 4. The server returns current weather and forecast data
 
 FALLBACK BEHAVIOR:
@@ -17,7 +19,17 @@ FALLBACK BEHAVIOR:
 
 import asyncio
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
+
+try:
+    from ..metrics import WEATHER_CACHE
+    from ..single_flight import AsyncSingleFlight, SingleFlight
+except ImportError:
+    from metrics import WEATHER_CACHE
+    from single_flight import AsyncSingleFlight, SingleFlight
+
+from .geo_cache import WeatherCache
+from .session_pool import McpSessionPool
 
 
 # ============================================================================
@@ -30,23 +42,61 @@ ACCUWEATHER_API_KEY = os.getenv("ACCUWEATHER_API_KEY", "")
 
 
 # ============================================================================
-# WEATHER DATA CACHE (Simple in-memory cache to reduce API calls)
+# WEATHER DATA CACHE (geo-bucketed LRU with stale-while-revalidate)
+# ============================================================================
+
+# Locations in the same ~5 km geohash cell (or city) share one entry;
+# see geo_cache.py for the fresh / stale / stale-if-error windows
+weather_cache = WeatherCache(
+    ttl_seconds=float(os.getenv("WEATHER_CACHE_TTL", "3600")),
+    stale_seconds=float(os.getenv("WEATHER_CACHE_STALE_TTL", str(3 * 3600))),
+    stale_if_error_seconds=float(os.getenv("WEATHER_CACHE_STALE_IF_ERROR_TTL", str(24 * 3600))),
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "2048")),
+    bucket=os.getenv("WEATHER_CACHE_BUCKET", "geohash:5"),
+)
+
 # ============================================================================
+# MCP SESSION POOL (warm weather server processes, shared by every caller)
+# ============================================================================
+
+def _weather_server_params():
+    """How to start the mcp-weather server (imported lazily: mcp is optional)."""
+    from mcp import StdioServerParameters
+    return StdioServerParameters(
+        command="uvx",  # Use uvx to run the server (similar to npx for Python)
+        args=["mcp-weather"],  # The package name to run
+        env={
+            # Pass the API key to the server process
+            "ACCUWEATHER_API_KEY": ACCUWEATHER_API_KEY,
+            # Preserve PATH so uvx can find Python
+            "PATH": os.environ.get("PATH", ""),
+        }
+    )
+
 
-# Dictionary to store cached weather data
-# Key: "lat,lng" string, Value: (weather_data, timestamp)
-_weather_cache: dict = {}
+weather_pool = McpSessionPool(
+    "mcp-weather",
+    _weather_server_params,
+    size=int(os.getenv("WEATHER_MCP_POOL_SIZE", "1")),
+    max_concurrent=int(os.getenv("WEATHER_MCP_SESSION_CONCURRENCY", "4")),
+    call_timeout=float(os.getenv("WEATHER_MCP_CALL_TIMEOUT", "10")),
+    health_interval=float(os.getenv("WEATHER_MCP_HEALTH_INTERVAL", "30")),
+    # Without a key the server can't answer; callers get the fallback
+    enabled=lambda: bool(ACCUWEATHER_API_KEY),
+)
 
-# Cache duration in seconds (1 hour = 3600 seconds)
-# Weather doesn't change frequently, so caching reduces API costs
-CACHE_TTL_SECONDS = 3600
+# In-flight deduplication: concurrent requests for the same cache bucket
+# wait for one MCP call
+_weather_flight_async = AsyncSingleFlight("Weather")
+_weather_flight_sync = SingleFlight("Weather")
 
 
 # ============================================================================
 # MCP WEATHER FUNCTIONS
 # ============================================================================
 
-async def get_weather_for_location(latitude: float, longitude: float) -> dict:
+async def get_weather_for_location(latitude: float, longitude: float,
+                                   city: Optional[str] = None) -> dict:
     """
     Fetches weather data for given coordinates using MCP weather server.
     
@@ -56,6 +106,7 @@ async def get_weather_for_location(latitude: float, longitude: float) -> dict:
     Args:
         latitude: The latitude coordinate (e.g., 37.7749 for San Francisco)
         longitude: The longitude coordinate (e.g., -122.4194 for San Francisco)
+        city: The location's city, if known (cache bucket in "city" mode)
     
     Returns:
         dict: Weather data with the following structure:
@@ -71,84 +122,154 @@ async def get_weather_for_location(latitude: float, longitude: float) -> dict:
         >>> print(weather["temperature"])  # 68.5
         >>> print(weather["conditions"])   # "Partly cloudy"
     """
-    import time
-    
     # ========================================================================
     # CHECK CACHE FIRST (to reduce API calls and save money)
     # ========================================================================
     
-    # Create a cache key from coordinates (rounded to 4 decimal places)
-    cache_key = f"{latitude:.4f},{longitude:.4f}"
-    current_time = time.time()
-    
-    # Check if we have cached data that's still valid
-    if cache_key in _weather_cache:
-        cached_data, cached_timestamp = _weather_cache[cache_key]
-        # If cache is still fresh (less than CACHE_TTL_SECONDS old)
-        if current_time - cached_timestamp < CACHE_TTL_SECONDS:
-            print(f"✅ Using cached weather for coordinates: {cache_key}")
-            return cached_data
+    # Nearby locations share a cache bucket (geohash cell or city)
+    cache_key = weather_cache.bucket(latitude, longitude, city)
+    cached_data, state = weather_cache.get(cache_key)
+
+    if state == "fresh":
+        print(f"✅ Using cached weather for {cache_key}")
+        WEATHER_CACHE.labels(result="hit").inc()
+        return cached_data
+
+    if state == "stale":
+        # Serve it now, refresh it in the background (stale-while-revalidate)
+        print(f"♻️ Using stale weather for {cache_key}, refreshing in background")
+        WEATHER_CACHE.labels(result="stale").inc()
+        _refresh_in_background(latitude, longitude, cache_key)
+        return cached_data
+
+    WEATHER_CACHE.labels(result="miss").inc()
     
+    # ========================================================================
+    # FETCH (concurrent requests for the same bucket share one fetch)
+    # ========================================================================
+
+    return await _fetch_coalesced(latitude, longitude, cache_key)
+
+
+def _refresh_in_background(latitude: float, longitude: float, cache_key: str) -> None:
+    """
+    Refreshes a stale entry on the weather pool's loop thread, so the
+    refresh survives callers running on a throwaway loop (get_weather_sync).
+    """
+    try:
+        weather_pool.submit(_fetch_coalesced(latitude, longitude, cache_key))
+    except RuntimeError as e:
+        # pool disabled (no API key): nothing to refresh from
+        print(f"   Skipping weather refresh: {e}")
+
+
+def _on_pool(coro) -> asyncio.Future:
+    """
+    Runs a weather lookup on the weather pool's loop thread, so a fetch
+    that outlives a batch deadline keeps running there (and is stopped
+    with the pool) rather than being left behind on the request's loop.
+    """
+    if not weather_pool.enabled():
+        # no API key: answered from the cache or the fallback right away
+        return asyncio.ensure_future(coro)
+    return asyncio.wrap_future(weather_pool.submit(coro))
+
+
+async def _fetch_coalesced(latitude: float, longitude: float, cache_key: str) -> dict:
+    weather_data, _ = await _weather_flight_async.do(
+        cache_key, lambda: _fetch_weather(latitude, longitude, cache_key))
+    return weather_data
+
+
+async def get_weather_batch(locations: List[Tuple[float, float, Optional[str]]],
+                            deadline: float = 8.0) -> List[Optional[dict]]:
+    """
+    Fetches weather for many locations concurrently.
+
+    HOW IT WORKS:
+    1. Locations are grouped by cache bucket (geohash cell or city); each
+       bucket is looked up / fetched once, for all its locations
+    2. All buckets are fetched at the same time, under ONE overall deadline
+    3. Buckets still pending at the deadline get their stale-if-error cache
+       entry if there is one, otherwise None; their fetches keep running on
+       the weather pool's loop and fill the cache for the next request
+
+    Args:
+        locations: (latitude, longitude, city or None) per location
+        deadline: Seconds to wait for all of them
+
+    Returns:
+        One weather dict per location, in order (None = timed out)
+    """
+    buckets = {}   # cache key -> indexes into locations
+    for i, (lat, lng, city) in enumerate(locations):
+        buckets.setdefault(weather_cache.bucket(lat, lng, city), []).append(i)
+
+    tasks = {}
+    for cache_key, indexes in buckets.items():
+        lat, lng, city = locations[indexes[0]]
+        tasks[cache_key] = _on_pool(get_weather_for_location(lat, lng, city))
+
+    done = set()
+    if tasks:
+        done, _ = await asyncio.wait(tasks.values(), timeout=deadline)
+
+    results: List[Optional[dict]] = [None] * len(locations)
+    for cache_key, task in tasks.items():
+        if task in done and task.exception() is None:
+            weather = task.result()
+        else:
+            weather = weather_cache.get_if_error(cache_key)
+        for i in buckets[cache_key]:
+            results[i] = weather
+    return results
+
+
+async def _fetch_weather(latitude: float, longitude: float, cache_key: str) -> dict:
+    """
+    Fetches weather from the MCP server and caches it (no cache lookup).
+
+    Args:
+        latitude: The latitude coordinate
+        longitude: The longitude coordinate
+        cache_key: The weather cache bucket for these coordinates
+
+    Returns:
+        dict: Weather data (same format as get_weather_for_location)
+    """
     # ========================================================================
     # TRY TO CONNECT TO MCP WEATHER SERVER
     # ========================================================================
     
     try:
-        # Import MCP libraries - these connect us to the weather server
-        from mcp import ClientSession, StdioServerParameters, stdio_client
-        
         # Check if we have the API key configured
         if not ACCUWEATHER_API_KEY:
             print("⚠️ ACCUWEATHER_API_KEY not set - returning fallback weather")
             return _get_fallback_weather()
-        
-        # Configure the MCP server connection parameters
-        # This tells Python how to start and connect to the weather server
-        server_params = StdioServerParameters(
-            command="uvx",  # Use uvx to run the server (similar to npx for Python)
-            args=["mcp-weather"],  # The package name to run
-            env={
-                # Pass the API key to the server process
-                "ACCUWEATHER_API_KEY": ACCUWEATHER_API_KEY,
-                # Preserve PATH so uvx can find Python
-                "PATH": os.environ.get("PATH", ""),
+
+        print(f"🌤️ Fetching weather for coordinates: {latitude}, {longitude}")
+
+        # One call on a warm pooled session (no server start or handshake)
+        # Note: The actual tool name might vary - check mcp-weather docs
+        result = await weather_pool.call_tool(
+            "get_weather",  # Tool name from mcp-weather
+            {
+                "latitude": latitude,
+                "longitude": longitude
             }
         )
-        
-        print(f"🌤️ Fetching weather for coordinates: {latitude}, {longitude}")
-        
-        # Connect to the MCP server via stdio (standard input/output)
-        # The 'async with' ensures proper cleanup when we're done
-        async with stdio_client(server_params) as (read_stream, write_stream):
-            # Create a session to communicate with the server
-            async with ClientSession(read_stream, write_stream) as session:
-                # Initialize the connection (required handshake)
-                await session.initialize()
-                
-                # List available tools to find the weather tool name
-                tools_result = await session.list_tools()
-                print(f"📋 Available MCP tools: {[t.name for t in tools_result.tools]}")
-                
-                # Call the weather tool with our coordinates
-                # Note: The actual tool name might vary - check mcp-weather docs
-                result = await session.call_tool(
-                    name="get_weather",  # Tool name from mcp-weather
-                    arguments={
-                        "latitude": latitude,
-                        "longitude": longitude
-                    }
-                )
-                
-                # Parse the result from the MCP server
-                # The result.content contains the weather data
-                weather_data = _parse_mcp_result(result.content)
-                
-                # Cache the result for future requests
-                _weather_cache[cache_key] = (weather_data, current_time)
-                
-                print(f"✅ Weather fetched successfully: {weather_data['conditions']}")
-                return weather_data
-                
+
+        # Parse the result from the MCP server
+        # The result.content contains the weather data
+        # (raises if it can't be parsed, so the fallback is never cached)
+        weather_data = _parse_mcp_result(result.content)
+
+        # Cache the result for future requests
+        weather_cache.put(cache_key, weather_data)
+
+        print(f"✅ Weather fetched successfully: {weather_data['conditions']}")
+        return weather_data
+
     except ImportError as e:
         # MCP library not installed
         print(f"⚠️ MCP library not installed: {e}")
@@ -158,6 +279,14 @@ async def get_weather_for_location(latitude: float, longitude: float) -> dict:
     except Exception as e:
         # Any other error (server not running, network issues, etc.)
         print(f"❌ Error fetching weather from MCP server: {e}")
+
+        # An older forecast beats no forecast (stale-if-error)
+        stale = weather_cache.get_if_error(cache_key)
+        if stale is not None:
+            print("   Returning stale cached weather...")
+            WEATHER_CACHE.labels(result="stale_if_error").inc()
+            return stale
+
         print("   Returning fallback weather data...")
         return _get_fallback_weather()
 
@@ -174,6 +303,9 @@ def _parse_mcp_result(content) -> dict:
     
     Returns:
         dict: Normalized weather data
+
+    Raises:
+        ValueError: The content isn't weather data we can read
     """
     try:
         # The content might be a list with one item, or a dict directly
@@ -202,8 +334,7 @@ def _parse_mcp_result(content) -> dict:
         }
         
     except Exception as e:
-        print(f"⚠️ Error parsing MCP result: {e}")
-        return _get_fallback_weather()
+        raise ValueError(f"Error parsing MCP result: {e}") from e
 
 
 def _get_fallback_weather() -> dict:
@@ -228,7 +359,7 @@ def _get_fallback_weather() -> dict:
 # SYNCHRONOUS WRAPPER (Required for Google ADK tools)
 # ============================================================================
 
-def get_weather_sync(latitude: float, longitude: float) -> dict:
+def get_weather_sync(latitude: float, longitude: float, city: Optional[str] = None) -> dict:
     """
     Synchronous wrapper for get_weather_for_location.
     
@@ -238,6 +369,7 @@ def get_weather_sync(latitude: float, longitude: float) -> dict:
     Args:
         latitude: The latitude coordinate
         longitude: The longitude coordinate
+        city: The location's city, if known (cache bucket in "city" mode)
     
     Returns:
         dict: Weather data (same format as get_weather_for_location)
@@ -246,6 +378,14 @@ def get_weather_sync(latitude: float, longitude: float) -> dict:
         def my_weather_tool(lat: float, lng: float) -> dict:
             return get_weather_sync(lat, lng)
     """
+    cache_key = weather_cache.bucket(latitude, longitude, city)
+    weather_data, _ = _weather_flight_sync.do(
+        cache_key, _run_weather_sync, latitude, longitude, city)
+    return weather_data
+
+
+def _run_weather_sync(latitude: float, longitude: float, city: Optional[str] = None) -> dict:
+    """Runs get_weather_for_location to completion from synchronous code."""
     try:
         # Try to get the current event loop
         loop = asyncio.get_event_loop()
@@ -257,18 +397,18 @@ def get_weather_sync(latitude: float, longitude: float) -> dict:
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 future = executor.submit(
                     asyncio.run,
-                    get_weather_for_location(latitude, longitude)
+                    get_weather_for_location(latitude, longitude, city)
                 )
                 return future.result(timeout=30)  # 30 second timeout
         else:
             # Loop exists but isn't running - use it directly
             return loop.run_until_complete(
-                get_weather_for_location(latitude, longitude)
+                get_weather_for_location(latitude, longitude, city)
             )
             
     except RuntimeError:
         # No event loop exists - create one
-        return asyncio.run(get_weather_for_location(latitude, longitude))
+        return asyncio.run(get_weather_for_location(latitude, longitude, city))
 
 
 # ============================================================================
@@ -0,0 +1,399 @@
+"""
+In-Process Metrics (Prometheus text format)
+
+Counters, gauges and histograms that the backend serves at `/metrics` for
+Prometheus to scrape. Everything lives in this process; there is no
+client library to install and nothing is pushed anywhere.
+
+HOW IT WORKS:
+1. Metrics are declared once, at the bottom of this module
+2. Code records into them: `MAPS_REQUESTS.labels(method="place", status="OK").inc()`
+3. `render()` writes every metric in the Prometheus text exposition format
+
+All metrics are thread-safe (tools may run in worker threads).
+"""
+
+import bisect
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Seconds; covers a ~50ms Maps call up to a multi-minute agent pipeline
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Base class: one metric family with optional labels."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def labels(self, **labels) -> "_Child":
+        """Returns the child for one set of label values."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return _Child(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    def _key(self) -> Tuple[str, ...]:
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels; use .labels(...)")
+        return ()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Child:
+    """A metric bound to one set of label values."""
+
+    def __init__(self, metric: _Metric, key: Tuple[str, ...]):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount: float = 1) -> None:
+        self._metric._inc(self._key, amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._metric._inc(self._key, -amount)
+
+    def set(self, value: float) -> None:
+        self._metric._set(self._key, value)
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        self._inc(self._key(), amount)
+
+    def _inc(self, key, amount) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(Counter):
+    """A value that goes up and down, or is read from a function at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], float]] = None
+
+    def dec(self, amount: float = 1) -> None:
+        self._inc(self._key(), -amount)
+
+    def set(self, value: float) -> None:
+        self._set(self._key(), value)
+
+    def _set(self, key, value) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Reads the value from `function()` on every scrape (unlabelled gauges)."""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. durations in seconds)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float) -> None:
+        self._observe(self._key(), value)
+
+    def _observe(self, key, value) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Holds every metric and renders them for a scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type Prometheus expects for the text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render() -> str:
+    """The whole registry in Prometheus text format."""
+    return REGISTRY.render()
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "igotyou_http_request_duration_seconds",
+    "Backend request latency by endpoint (streaming endpoints: until headers are sent).",
+    ["method", "endpoint", "status"],
+)
+
+AGENT_SECONDS = Histogram(
+    "igotyou_agent_duration_seconds",
+    "Time spent in each agent, including its Gemini and tool calls.",
+    ["agent"],
+)
+
+LLM_SECONDS = Histogram(
+    "igotyou_gemini_request_duration_seconds",
+    "Gemini call latency per agent.",
+    ["agent"],
+)
+
+GEMINI_ERRORS = Counter(
+    "igotyou_gemini_errors_total",
+    "Gemini calls that failed after the SDK's own retries, by agent and error code (429 = quota).",
+    ["agent", "code"],
+)
+
+GEMINI_RETRIES = Counter(
+    "igotyou_gemini_retries_total",
+    "Gemini attempts the SDK retried, by agent and status (429 = quota, or the transport error).",
+    ["agent", "status"],
+)
+
+TOOL_SECONDS = Histogram(
+    "igotyou_tool_duration_seconds",
+    "Function tool latency.",
+    ["tool"],
+)
+
+MAPS_REQUESTS = Counter(
+    "igotyou_gmaps_requests_total",
+    "Google Maps API calls by method and response status.",
+    ["method", "status"],
+)
+
+MAPS_SECONDS = Histogram(
+    "igotyou_gmaps_request_duration_seconds",
+    "Google Maps API call latency by method.",
+    ["method"],
+)
+
+RATE_LIMIT_QUOTA_REMAINING = Gauge(
+    "igotyou_google_api_quota_remaining",
+    "Calls left in today's quota per Google API method (+Inf = no quota).",
+    ["api"],
+)
+
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "igotyou_google_api_rate_limit_wait_seconds",
+    "Time calls waited for a rate limit token.",
+    ["api"],
+)
+
+RATE_LIMIT_REJECTED = Counter(
+    "igotyou_google_api_rate_limited_total",
+    "Calls refused by the rate limiter by reason (deadline/quota).",
+    ["api", "reason"],
+)
+
+REVIEW_TOKENS = Counter(
+    "igotyou_review_tokens_total",
+    "Estimated review tokens per stage: raw = fetched, sent = after compression for the recommendation prompt.",
+    ["stage"],
+)
+
+PLACES_SEARCH_CACHE = Counter(
+    "igotyou_places_search_cache_requests_total",
+    "Places text search cache lookups by result (hit/negative_hit/miss).",
+    ["result"],
+)
+
+REGION_BOUNDS_CACHE = Counter(
+    "igotyou_region_bounds_cache_requests_total",
+    "Region viewport cache lookups by result (hit/negative_hit/miss).",
+    ["result"],
+)
+
+WEATHER_CACHE = Counter(
+    "igotyou_weather_cache_requests_total",
+    "Weather cache lookups by result (hit/stale/miss/stale_if_error).",
+    ["result"],
+)
+
+MCP_CALL_SECONDS = Histogram(
+    "igotyou_mcp_call_duration_seconds",
+    "MCP tool call latency on pooled sessions, by pool, tool and status (ok/error/timeout).",
+    ["pool", "tool", "status"],
+)
+
+MCP_SESSION_RESTARTS = Counter(
+    "igotyou_mcp_session_restarts_total",
+    "Pooled MCP sessions restarted after a crash, failed health check or failed start.",
+    ["pool"],
+)
+
+PIPELINES_IN_FLIGHT = Gauge(
+    "igotyou_pipelines_in_flight",
+    "Agent runs currently in progress.",
+)
+
+SESSIONS = Gauge(
+    "igotyou_sessions",
+    "Live client sessions.",
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "igotyou_admission_active",
+    "Agent runs holding an admission slot.",
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "igotyou_admission_queue_depth",
+    "Agent runs waiting for an admission slot.",
+)
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "igotyou_admission_wait_seconds",
+    "Time spent waiting for an admission slot.",
+)
+
+ADMISSION_REJECTED = Counter(
+    "igotyou_admission_rejected_total",
+    "Requests shed by admission control (queue_full = 429, queue_timeout = 503).",
+    ["reason"],
+)
+
+
+async def maps_call_async(method: str, fn: Callable, *args, **kwargs):
+    """
+    Calls an AsyncMapsClient method and records its latency and status.
+
+    Example:
+        >>> response = await maps_call_async("places", maps_client.places, query="lakes near Brasov")
+    """
+    start = time.perf_counter()
+    try:
+        response = await fn(*args, **kwargs)
+    except Exception as e:
+        # MapsApiError(status) for non-OK statuses the client doesn't return
+        status = getattr(e, "status", None) or type(e).__name__
+        MAPS_REQUESTS.labels(method=method, status=status).inc()
+        raise
+    finally:
+        MAPS_SECONDS.labels(method=method).observe(time.perf_counter() - start)
+    status = response.get("status", "OK") if isinstance(response, dict) else "OK"
+    MAPS_REQUESTS.labels(method=method, status=status).inc()
+    return response
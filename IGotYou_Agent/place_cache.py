@@ -0,0 +1,314 @@
+"""
+Place Details Cache
+
+Popular places come back in many different searches, and the analysis step
+used to fetch their Place Details (reviews, photos, geometry, url) every
+time. This module keeps them on local disk (SQLite) with an in-memory LRU
+in front, so they survive backend restarts.
+
+HOW IT WORKS:
+1. Every field of a place is stored separately with the time it was fetched
+2. Each field has its own TTL: reviews go stale in a day, geometry (lat/lng)
+   lasts 30 days, the most the Places terms allow (see FIELD_TTLS)
+3. `lookup()` returns the fresh fields and the list of fields that still
+   need fetching, so a refresh only asks the API for the stale ones
+4. Recently used places live in memory; the disk store is bounded by place
+   count and evicts the least recently used places
+5. Stale fields are kept, so they can still be served if the API fails
+6. Hit/miss/refresh/eviction counters are kept for monitoring
+7. The async path (`lookup_async()` and friends) answers memory hits on the
+   event loop and runs every SQLite read and write in a worker thread; the
+   last-used time of a memory hit is written with the next disk access
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DAY = 24 * 3600
+
+# Seconds each Place Details field stays fresh (request field names)
+FIELD_TTLS: Dict[str, float] = {
+    "reviews": 1 * DAY,
+    "photo": 7 * DAY,
+    "name": 30 * DAY,
+    "url": 30 * DAY,
+    "formatted_address": 30 * DAY,
+    # lat/lng may not be cached for longer than 30 days (Places policy)
+    "geometry": 30 * DAY,
+}
+DEFAULT_TTL = 7 * DAY
+
+# Request field name -> key in the Place Details result (when they differ)
+RESULT_KEYS = {"photo": "photos"}
+
+DEFAULT_PATH = Path(__file__).parent.parent / ".cache" / "place_details.sqlite3"
+
+
+def result_key(field: str) -> str:
+    return RESULT_KEYS.get(field, field)
+
+
+class PlaceDetailsCache:
+    """
+    Per-field Place Details cache: memory LRU + SQLite.
+
+    Args:
+        path: SQLite file ("" or ":memory:" keeps everything in memory)
+        max_places: Maximum places kept on disk
+        memory_entries: Places kept in the in-memory LRU
+        field_ttls: Overrides for FIELD_TTLS
+    """
+
+    def __init__(self, path: str = str(DEFAULT_PATH), max_places: int = 5000,
+                 memory_entries: int = 256, field_ttls: Optional[Dict[str, float]] = None):
+        self.path = path or ":memory:"
+        self.max_places = max_places
+        self.memory_entries = memory_entries
+        self.field_ttls = {**FIELD_TTLS, **(field_ttls or {})}
+
+        # place_id -> {field: (value, fetched_at)}
+        self._memory: "OrderedDict[str, Dict[str, tuple]]" = OrderedDict()
+        # place_id -> last used, for memory hits not yet written to disk
+        self._touched: Dict[str, float] = {}
+        self._lock = Lock()
+
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS place_fields (
+                place_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (place_id, field)
+            );
+            CREATE TABLE IF NOT EXISTS places (
+                place_id TEXT PRIMARY KEY,
+                last_used REAL NOT NULL
+            );
+        """)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.partial = 0
+        self.stale_served = 0
+        self.evictions = 0
+
+    def _ttl(self, field: str) -> float:
+        return self.field_ttls.get(field, DEFAULT_TTL)
+
+    def _load(self, place_id: str) -> Tuple[Dict[str, tuple], str]:
+        """Returns the cached fields of a place and where they came from."""
+        entry = self._memory.get(place_id)
+        if entry is not None:
+            self._memory.move_to_end(place_id)
+            return entry, "memory"
+
+        rows = self._db.execute(
+            "SELECT field, value, fetched_at FROM place_fields WHERE place_id = ?",
+            (place_id,)).fetchall()
+        if not rows:
+            return {}, "none"
+        entry = {field: (json.loads(value), fetched_at) for field, value, fetched_at in rows}
+        self._remember(place_id, entry)
+        return entry, "disk"
+
+    def _remember(self, place_id: str, entry: Dict[str, tuple]) -> None:
+        self._memory[place_id] = entry
+        self._memory.move_to_end(place_id)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, place_id: str, fields: Iterable[str]) -> Tuple[dict, List[str]]:
+        """
+        Args:
+            place_id: Google place_id
+            fields: Requested Place Details fields (request names, e.g. "photo")
+
+        Returns:
+            (result, missing): `result` holds the fresh cached fields keyed like
+            a Place Details result; `missing` lists the fields to fetch
+        """
+        fields = list(fields)
+        now = time.time()
+        with self._lock:
+            entry, source = self._load(place_id)
+            if entry:
+                self._touched[place_id] = now
+                with self._db:
+                    self._flush_touched()
+        return self._split(entry, source, fields, now)
+
+    async def lookup_async(self, place_id: str, fields: Iterable[str]) -> Tuple[dict, List[str]]:
+        """lookup() for the event loop: memory hits are answered in place, disk reads run in a thread."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(place_id)
+            if entry is not None:
+                self._memory.move_to_end(place_id)
+                self._touched[place_id] = now
+        if entry is None:
+            return await asyncio.to_thread(self.lookup, place_id, fields)
+        return self._split(entry, "memory", list(fields), now)
+
+    def _split(self, entry: Dict[str, tuple], source: str, fields: List[str],
+               now: float) -> Tuple[dict, List[str]]:
+        """Fresh fields of `entry` and the fields to fetch; counts the lookup."""
+        result, missing = {}, []
+        for field in fields:
+            cached = entry.get(field)
+            if cached is not None and now - cached[1] < self._ttl(field):
+                if cached[0] is not None:
+                    result[result_key(field)] = cached[0]
+            else:
+                missing.append(field)
+
+        if not missing:
+            if source == "memory":
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+        elif len(missing) < len(fields):
+            self.partial += 1
+        else:
+            self.misses += 1
+        return result, missing
+
+    def _flush_touched(self) -> None:
+        """Writes the pending last-used times (caller holds the lock, in a transaction)."""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        self._db.executemany("UPDATE places SET last_used = ? WHERE place_id = ?",
+                             [(t, place_id) for place_id, t in touched.items()])
+
+    def stale(self, place_id: str, fields: Iterable[str]) -> dict:
+        """Returns cached fields regardless of age (for when the API fails)."""
+        with self._lock:
+            entry, _ = self._load(place_id)
+        result = {result_key(f): entry[f][0] for f in fields
+                  if f in entry and entry[f][0] is not None}
+        if result:
+            self.stale_served += 1
+        return result
+
+    async def stale_async(self, place_id: str, fields: Iterable[str]) -> dict:
+        """stale() in a worker thread."""
+        return await asyncio.to_thread(self.stale, place_id, list(fields))
+
+    def cached_reviews(self, place_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Review texts already cached for these places, regardless of age, in
+        one query and without counting as lookups (for ranking, not display).
+        """
+        place_ids = list(dict.fromkeys(place_ids))
+        texts = {}
+        with self._lock:
+            on_disk = []
+            for place_id in place_ids:
+                entry = self._memory.get(place_id)
+                if entry is None:
+                    on_disk.append(place_id)
+                elif entry.get("reviews") and entry["reviews"][0]:
+                    texts[place_id] = entry["reviews"][0]
+            for start in range(0, len(on_disk), 500):
+                chunk = on_disk[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT place_id, value FROM place_fields WHERE field = 'reviews' "
+                    f"AND place_id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                for place_id, value in rows:
+                    reviews = json.loads(value)
+                    if reviews:
+                        texts[place_id] = reviews
+        return {place_id: " ".join(r.get("text") or "" for r in reviews)
+                for place_id, reviews in texts.items()}
+
+    async def cached_reviews_async(self, place_ids: Iterable[str]) -> Dict[str, str]:
+        """cached_reviews() in a worker thread."""
+        return await asyncio.to_thread(self.cached_reviews, list(place_ids))
+
+    def store(self, place_id: str, fields: Iterable[str], result: dict) -> None:
+        """
+        Saves freshly fetched fields. Requested fields missing from `result`
+        are stored as empty, so places without reviews aren't refetched.
+        """
+        now = time.time()
+        fresh = {f: (result.get(result_key(f)), now) for f in fields}
+        with self._lock:
+            entry = dict(self._load(place_id)[0])
+            entry.update(fresh)
+            self._remember(place_id, entry)
+
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO place_fields VALUES (?, ?, ?, ?)",
+                    [(place_id, f, json.dumps(v), t) for f, (v, t) in fresh.items()])
+                self._db.execute("INSERT OR REPLACE INTO places VALUES (?, ?)", (place_id, now))
+                self._touched.pop(place_id, None)
+                self._flush_touched()
+                self._evict()
+
+    async def store_async(self, place_id: str, fields: Iterable[str], result: dict) -> None:
+        """store() in a worker thread."""
+        await asyncio.to_thread(self.store, place_id, list(fields), result)
+
+    def _evict(self) -> None:
+        count = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        excess = count - self.max_places
+        if excess <= 0:
+            return
+        oldest = [row[0] for row in self._db.execute(
+            "SELECT place_id FROM places ORDER BY last_used LIMIT ?", (excess,))]
+        marks = ",".join("?" * len(oldest))
+        self._db.execute(f"DELETE FROM place_fields WHERE place_id IN ({marks})", oldest)
+        self._db.execute(f"DELETE FROM places WHERE place_id IN ({marks})", oldest)
+        for place_id in oldest:
+            self._memory.pop(place_id, None)
+        self.evictions += len(oldest)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._memory.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM place_fields")
+            self._db.execute("DELETE FROM places")
+
+    def stats(self) -> dict:
+        with self._lock:
+            places = self._db.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        lookups = self.memory_hits + self.disk_hits + self.partial + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "places": places,
+            "memoryEntries": len(self._memory),
+            "memoryHits": self.memory_hits,
+            "diskHits": self.disk_hits,
+            "partialHits": self.partial,
+            "misses": self.misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "staleServed": self.stale_served,
+            "evictions": self.evictions,
+            "maxPlaces": self.max_places,
+            "path": self.path,
+            "fieldTtls": self.field_ttls,
+        }
+
+
+# Shared instance used by the analysis step
+place_details_cache = PlaceDetailsCache(
+    path=os.getenv("PLACE_CACHE_PATH", str(DEFAULT_PATH)),
+    max_places=int(os.getenv("PLACE_CACHE_MAX_PLACES", "5000")),
+    memory_entries=int(os.getenv("PLACE_CACHE_MEMORY_ENTRIES", "256")),
+    field_ttls={"reviews": float(os.getenv("PLACE_CACHE_REVIEWS_TTL", str(FIELD_TTLS["reviews"])))},
+)
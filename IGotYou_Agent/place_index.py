@@ -0,0 +1,216 @@
+"""
+In-Process Spatial Index of Known Places
+
+Every candidate the Places API returns has coordinates, but they used to be
+thrown away after each request. This index keeps every place seen so far
+and answers radius / bounding-box queries from memory.
+
+HOW IT WORKS:
+1. Places are bucketed into fixed-size lat/lng grid cells (~5 km); a query
+   only looks at the cells overlapping its bounding box, then filters by
+   exact (haversine) distance
+2. Each place remembers the search keywords that found it, so a query can
+   ask for "lakes" near a point
+3. Areas that were fully searched for a keyword are marked as covered
+   (per region grid cell, with a TTL); region discovery answers covered
+   tiles from the index and only calls Places for the uncovered ones, and
+   a "<keyword> near <area>" text search whose whole area is covered is
+   answered from the index without calling Places
+4. The index is bounded by place count (oldest places are dropped first);
+   dropping a place un-covers the cells it was in, so a covered cell never
+   answers with places missing
+5. Boxes crossing the antimeridian (west > east) are queried as two boxes
+"""
+
+import math
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .region_grid import Bounds, Tile, circle_bounds, grid_cells
+except ImportError:
+    from region_grid import Bounds, Tile, circle_bounds, grid_cells
+
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class PlaceIndex:
+    """
+    Grid-bucketed spatial index of candidates (see state_keys.Candidate).
+
+    Args:
+        cell_degrees: Bucket size in degrees (0.05 = ~5 km)
+        max_places: Maximum places kept
+        coverage_ttl_seconds: How long a searched tile counts as covered
+    """
+
+    def __init__(self, cell_degrees: float = 0.05, max_places: int = 200000,
+                 coverage_ttl_seconds: float = 6 * 3600):
+        self.cell_degrees = cell_degrees
+        self.max_places = max_places
+        self.coverage_ttl_seconds = coverage_ttl_seconds
+
+        # place_id -> (lat, lng, candidate, keywords), oldest first
+        self._places: "OrderedDict[str, Tuple[float, float, dict, Set[str]]]" = OrderedDict()
+        # (row, col) -> place_ids in that cell
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        # keyword -> grid cell size -> (row, col) -> expires_at
+        self._covered: Dict[str, Dict[float, Dict[Tuple[int, int], float]]] = {}
+        self._lock = Lock()
+
+        self.queries = 0
+        self.covered_hits = 0
+        self.evictions = 0
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def add(self, cands: Iterable[dict], keyword: Optional[str] = None) -> int:
+        """
+        Adds (or refreshes) candidates that have a place_id and `loc`.
+
+        Returns:
+            Number of candidates indexed
+        """
+        added = 0
+        with self._lock:
+            for c in cands:
+                place_id, loc = c.get("place_id"), c.get("loc")
+                if not place_id or not loc:
+                    continue
+                lat, lng = loc["lat"], loc["lng"]
+
+                old = self._places.pop(place_id, None)
+                keywords = old[3] if old else set()
+                if old and self._cell(old[0], old[1]) != self._cell(lat, lng):
+                    self._cells[self._cell(old[0], old[1])].discard(place_id)
+                if keyword:
+                    keywords.add(keyword)
+
+                # Provenance fields belong to the search that produced them
+                entry = {k: v for k, v in c.items() if k not in ("score", "queries", "tiles")}
+                self._places[place_id] = (lat, lng, entry, keywords)
+                self._cells.setdefault(self._cell(lat, lng), set()).add(place_id)
+                added += 1
+
+            while len(self._places) > self.max_places:
+                place_id, (lat, lng, _, keywords) = self._places.popitem(last=False)
+                self._cells[self._cell(lat, lng)].discard(place_id)
+                self._uncover(lat, lng, keywords)
+                self.evictions += 1
+        return added
+
+    def _uncover(self, lat: float, lng: float, keywords: Set[str]) -> None:
+        """Drops the coverage of every cell containing an evicted place (lock held)."""
+        for keyword in keywords:
+            for step, cells in self._covered.get(keyword, {}).items():
+                cells.pop((math.floor(lat / step), math.floor(lng / step)), None)
+
+    def _query(self, bounds: Bounds, keyword: Optional[str]) -> List[Tuple[float, float, dict]]:
+        south, west, north, east = bounds
+        # across the antimeridian: the part up to 180 and the part from -180
+        boxes = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+        found = []
+        with self._lock:
+            self.queries += 1
+            for w, e in boxes:
+                (r0, c0), (r1, c1) = self._cell(south, w), self._cell(north, e)
+                for row in range(r0, r1 + 1):
+                    for col in range(c0, c1 + 1):
+                        for place_id in self._cells.get((row, col), ()):
+                            lat, lng, cand, keywords = self._places[place_id]
+                            if keyword is not None and keyword not in keywords:
+                                continue
+                            if south <= lat <= north and w <= lng <= e:
+                                found.append((lat, lng, cand))
+        return found
+
+    def within_bounds(self, bounds: Bounds, keyword: Optional[str] = None) -> List[dict]:
+        """Places inside a (south, west, north, east) box (copies)."""
+        return [dict(c) for _, _, c in self._query(bounds, keyword)]
+
+    def within_radius(self, lat: float, lng: float, radius_m: float,
+                      keyword: Optional[str] = None) -> List[dict]:
+        """Places within `radius_m` of a point, nearest first (copies)."""
+        hits = []
+        # the box's longitudes are wrapped, so it may cross the antimeridian
+        for p_lat, p_lng, cand in self._query(circle_bounds(lat, lng, radius_m), keyword):
+            distance = haversine_m(lat, lng, p_lat, p_lng)
+            if distance <= radius_m:
+                hits.append((distance, cand))
+        hits.sort(key=lambda h: h[0])
+        return [dict(c) for _, c in hits]
+
+    def _covered_cells(self) -> int:
+        return sum(len(cells) for steps in self._covered.values() for cells in steps.values())
+
+    def cover(self, keyword: str, tile: Tile) -> None:
+        """Marks a region grid tile as fully searched for `keyword`."""
+        now = time.time()
+        with self._lock:
+            if self._covered_cells() > 100000:
+                for steps in self._covered.values():
+                    for step, cells in steps.items():
+                        steps[step] = {c: t for c, t in cells.items() if t > now}
+            cells = self._covered.setdefault(keyword, {}).setdefault(tile.step, {})
+            cells[(tile.row, tile.col)] = now + self.coverage_ttl_seconds
+
+    def is_covered(self, keyword: str, tile: Tile) -> bool:
+        expires_at = self._covered.get(keyword, {}).get(tile.step, {}).get((tile.row, tile.col))
+        if expires_at is None or time.time() >= expires_at:
+            return False
+        self.covered_hits += 1
+        return True
+
+    def has_coverage(self, keyword: str) -> bool:
+        """Whether any area was searched for `keyword` (cheap pre-check)."""
+        return any(self._covered.get(keyword, {}).values())
+
+    def covers(self, keyword: str, bounds: Bounds) -> bool:
+        """
+        Whether all of `bounds` was searched for `keyword`, i.e. every grid
+        cell overlapping it is covered at some cell size.
+        """
+        now = time.time()
+        with self._lock:
+            for step, cells in self._covered.get(keyword, {}).items():
+                rows, cols = grid_cells(bounds, step)
+                if len(rows) * len(cols) > len(cells):
+                    continue
+                if all(cells.get((i, j), 0) > now for i in rows for j in cols):
+                    self.covered_hits += 1
+                    return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "places": len(self._places),
+            "cells": sum(1 for ids in self._cells.values() if ids),
+            "coveredTiles": self._covered_cells(),
+            "coveredHits": self.covered_hits,
+            "queries": self.queries,
+            "evictions": self.evictions,
+            "maxPlaces": self.max_places,
+        }
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+
+# Shared instance fed by every search
+place_index = PlaceIndex(
+    max_places=int(os.getenv("PLACE_INDEX_MAX_PLACES", "200000")),
+    coverage_ttl_seconds=float(os.getenv("PLACE_INDEX_COVERAGE_TTL", str(6 * 3600))),
+)
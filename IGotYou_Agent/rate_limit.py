@@ -0,0 +1,182 @@
+"""
+Rate Limiting for Google API Calls
+
+Discovery, Analysis, the region grid and the image search tool
+(IGotYou/mcp_tools/google_images_tool.py) all call Google APIs, and nothing
+kept them to a shared budget: a burst of searches ran straight into
+OVER_QUERY_LIMIT, and the retries made it worse. Every Google call now
+takes a token from the bucket for its API method first.
+
+HOW IT WORKS:
+1. One token bucket per API method ("places", "place", "places_nearby",
+   "custom_search"), with its own QPS, burst and daily quota; place photos
+   are loaded by the browser, so they have no bucket here
+2. Callers reserve the next free slot in arrival order (FIFO), so requests
+   are served fairly and nobody starves under load
+3. A caller whose reserved slot lies beyond its deadline fails at once with
+   RateLimited instead of sleeping towards a timeout; so does a caller once
+   the daily quota is used up
+4. Remaining daily quota, wait times and rejections are exported as metrics
+
+Limits are read from the environment, e.g. MAPS_QPS_PLACE=20,
+MAPS_BURST_PLACE=10, MAPS_DAILY_QUOTA_PLACE=50000 (0 = unlimited).
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Dict, Optional
+
+try:
+    from .metrics import RATE_LIMIT_QUOTA_REMAINING, RATE_LIMIT_REJECTED, RATE_LIMIT_WAIT_SECONDS
+except ImportError:
+    from metrics import RATE_LIMIT_QUOTA_REMAINING, RATE_LIMIT_REJECTED, RATE_LIMIT_WAIT_SECONDS
+
+
+# (qps, burst, daily quota) per API method; 0 quota = unlimited
+DEFAULT_LIMITS = {
+    "places": (10.0, 10, 0),
+    "places_nearby": (10.0, 10, 0),
+    "place": (20.0, 10, 0),
+    "custom_search": (1.0, 1, 100),
+}
+
+
+class RateLimited(Exception):
+    """Raised when a call would have to wait past its deadline, or the quota is used up."""
+
+    def __init__(self, api: str, reason: str, retry_after: float):
+        super().__init__(f"{api} rate limited ({reason}), retry in {retry_after:.1f}s")
+        self.api = api
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status = "RATE_LIMITED"
+
+
+def _day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class TokenBucket:
+    """
+    Token bucket with FIFO reservations and a daily quota.
+
+    Implemented as a virtual schedule (GCRA): `_tat` is the time the bucket
+    would be full again, so reserving a token is a constant-time update and
+    callers are served in the order they reserved.
+
+    Args:
+        api: API method name (for metrics and errors)
+        qps: Sustained calls per second
+        burst: Calls allowed at once after an idle period
+        daily_quota: Calls per UTC day (0 = unlimited)
+    """
+
+    def __init__(self, api: str, qps: float, burst: int = 1, daily_quota: int = 0):
+        self.api = api
+        self.qps = qps
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+
+        self._interval = 1.0 / qps
+        self._tat = 0.0
+        self._lock = Lock()
+        self._day = _day()
+        self.used_today = 0
+        self.rejected = {"deadline": 0, "quota": 0}
+
+        RATE_LIMIT_QUOTA_REMAINING.labels(api=api).set(self.quota_remaining())
+
+    def quota_remaining(self) -> float:
+        if not self.daily_quota:
+            return float("inf")
+        return max(0, self.daily_quota - self.used_today)
+
+    def _reject(self, reason: str, retry_after: float) -> RateLimited:
+        self.rejected[reason] += 1
+        RATE_LIMIT_REJECTED.labels(api=self.api, reason=reason).inc()
+        return RateLimited(self.api, reason, retry_after)
+
+    def reserve(self, deadline: Optional[float] = None) -> float:
+        """
+        Reserves the next token.
+
+        Args:
+            deadline: time.monotonic() by which the call must have started
+
+        Returns:
+            Seconds to wait before making the call
+
+        Raises:
+            RateLimited: the wait would pass `deadline`, or the daily quota is used up
+        """
+        with self._lock:
+            today = _day()
+            if today != self._day:
+                self._day, self.used_today = today, 0
+            if self.daily_quota and self.used_today >= self.daily_quota:
+                raise self._reject("quota", 3600.0)
+
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            start = max(now, tat - (self.burst - 1) * self._interval)
+            wait = start - now
+            if deadline is not None and start > deadline:
+                raise self._reject("deadline", wait)
+
+            self._tat = tat + self._interval
+            self.used_today += 1
+            RATE_LIMIT_QUOTA_REMAINING.labels(api=self.api).set(self.quota_remaining())
+        RATE_LIMIT_WAIT_SECONDS.labels(api=self.api).observe(wait)
+        return wait
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        """Waits for a token (see reserve)."""
+        wait = self.reserve(deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, deadline: Optional[float] = None) -> None:
+        """Blocking version for synchronous callers (the image search tool)."""
+        wait = self.reserve(deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        return {
+            "qps": self.qps,
+            "burst": self.burst,
+            "dailyQuota": self.daily_quota,
+            "usedToday": self.used_today,
+            "queuedSeconds": round(max(0.0, self._tat - time.monotonic()), 3),
+            "rejected": dict(self.rejected),
+        }
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = Lock()
+
+
+def limiter(api: str) -> TokenBucket:
+    """The shared bucket for an API method, created from the environment on first use."""
+    bucket = _buckets.get(api)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(api)
+            if bucket is None:
+                qps, burst, quota = DEFAULT_LIMITS.get(api, (10.0, 10, 0))
+                name = api.upper()
+                bucket = TokenBucket(
+                    api,
+                    qps=float(os.getenv(f"MAPS_QPS_{name}", qps)),
+                    burst=int(os.getenv(f"MAPS_BURST_{name}", burst)),
+                    daily_quota=int(os.getenv(f"MAPS_DAILY_QUOTA_{name}", quota)),
+                )
+                _buckets[api] = bucket
+    return bucket
+
+
+def stats() -> dict:
+    return {api: bucket.stats() for api, bucket in sorted(_buckets.items())}
@@ -0,0 +1,162 @@
+"""
+Region Grid Tiling for Nearby Search
+
+A single text search for a large region ("hidden lakes in Bavaria") only
+returns the handful of places Google considers most prominent. Region-wide
+discovery instead covers the region with a grid of small circles and runs a
+Nearby Search in each one.
+
+HOW IT WORKS:
+1. The region (a Places viewport or a center + radius) becomes a bounding box
+2. The box is covered by cells of a GLOBAL grid (cell edges at multiples of
+   the cell size in degrees), so two overlapping searches produce the same
+   cells for the shared area and can reuse each other's cached tiles
+3. If that needs more than `max_tiles` cells, the cell size grows in steps
+   of sqrt(2) (so cell sizes, and therefore tile keys, still repeat), but
+   never past the size whose cells still fit in a 50 km circle (the Nearby
+   Search maximum), so there are no gaps between the circles; an area too
+   large for `max_tiles` such cells gets more cells (see nearest_tiles)
+4. Each cell is searched with a circle through its corners (the cell's
+   half-diagonal as radius, measured along its edge nearest the equator)
+5. A box crossing the antimeridian (west > east, e.g. the viewport of the
+   United States or Fiji) is covered as two boxes split at +/-180
+"""
+
+import math
+from typing import List, NamedTuple, Tuple
+
+
+KM_PER_DEGREE = 111.32
+MAX_RADIUS_M = 50000  # Nearby Search limit
+
+# (south, west, north, east) in degrees; west > east crosses the antimeridian
+Bounds = Tuple[float, float, float, float]
+
+
+class Tile(NamedTuple):
+    key: str          # stable id of the grid cell (cell size + indices)
+    lat: float        # cell center
+    lng: float
+    radius_m: int     # covers the whole cell
+    step: float       # cell size in degrees
+    row: int          # cell indices on the global grid of that size
+    col: int
+
+
+def viewport_bounds(viewport: dict) -> Bounds:
+    """Bounds of a Places `geometry.viewport` ({"northeast": ..., "southwest": ...})."""
+    ne, sw = viewport["northeast"], viewport["southwest"]
+    return sw["lat"], sw["lng"], ne["lat"], ne["lng"]
+
+
+def circle_bounds(lat: float, lng: float, radius_m: float) -> Bounds:
+    """Bounds of a circle around a center point."""
+    dlat = radius_m / 1000 / KM_PER_DEGREE
+    dlng = dlat / max(math.cos(math.radians(lat)), 0.01)
+    if dlng >= 180:
+        return lat - dlat, -180.0, lat + dlat, 180.0
+    return lat - dlat, _wrap_lng(lng - dlng), lat + dlat, _wrap_lng(lng + dlng)
+
+
+def _wrap_lng(lng: float) -> float:
+    """Longitude in [-180, 180)."""
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+def _lng_span(west: float, east: float) -> float:
+    """Width of a box in degrees of longitude (handles the antimeridian)."""
+    return east - west if west <= east else east - west + 360.0
+
+
+def bounds_size_km(bounds: Bounds) -> float:
+    """Length of the box's longer side in km."""
+    south, west, north, east = bounds
+    mid_lat = math.radians((south + north) / 2)
+    return max(north - south, _lng_span(west, east) * math.cos(mid_lat)) * KM_PER_DEGREE
+
+
+def tiles_for_bounds(bounds: Bounds, tile_km: float = 10.0, max_tiles: int = 48) -> List[Tile]:
+    """
+    Covers `bounds` with grid cells of about `tile_km` (grown until there
+    are at most `max_tiles` cells, or until they would no longer fit in one
+    Nearby Search circle).
+
+    Example:
+        >>> len(tiles_for_bounds((47.3, 8.9, 50.6, 13.9)))   # Bavaria, ~80 km cells
+        48
+    """
+    base = tile_km / KM_PER_DEGREE
+    # cells too large for one search circle: halve them (keeps the grid aligned)
+    while _max_radius_m(bounds, base) > MAX_RADIUS_M:
+        base /= 2
+
+    level = 0
+    step = base
+    rows, cols = grid_cells(bounds, step)
+    while len(rows) * len(cols) > max_tiles:
+        bigger = base * math.sqrt(2) ** (level + 1)
+        if _max_radius_m(bounds, bigger) > MAX_RADIUS_M:
+            break
+        level += 1
+        step = bigger
+        rows, cols = grid_cells(bounds, step)
+
+    tiles = []
+    for i in rows:
+        lat = (i + 0.5) * step
+        radius_m = _cell_radius_m(i, step)
+        for j in cols:
+            tiles.append(Tile(f"{step:.5f}:{i}:{j}", lat, _wrap_lng((j + 0.5) * step), radius_m,
+                              step, i, j))
+    return tiles
+
+
+def nearest_tiles(tiles: List[Tile], bounds: Bounds, n: int) -> List[Tile]:
+    """The `n` tiles whose centers are nearest the center of `bounds`."""
+    if len(tiles) <= n:
+        return tiles
+    south, west, north, east = bounds
+    lat = (south + north) / 2
+    lng = _wrap_lng(west + _lng_span(west, east) / 2)
+    cos_lat = math.cos(math.radians(lat))
+
+    def distance(tile: Tile) -> float:
+        dlng = _wrap_lng(tile.lng - lng) * cos_lat
+        return math.hypot(tile.lat - lat, dlng)
+
+    return sorted(tiles, key=distance)[:n]
+
+
+def _cell_radius_m(row: int, step: float) -> int:
+    """Radius of the circle around the center of a cell in `row` through its corners."""
+    south, north = row * step, (row + 1) * step
+    # the cell is widest along its edge nearest the equator
+    edge = 0.0 if south <= 0 <= north else min(abs(south), abs(north))
+    height_km = step * KM_PER_DEGREE
+    width_km = height_km * math.cos(math.radians(edge))
+    return math.ceil(math.hypot(height_km, width_km) / 2 * 1000)
+
+
+def _max_radius_m(bounds: Bounds, step: float) -> int:
+    """Largest cell radius of the `step`-degree grid over `bounds`."""
+    south, _, north, _ = bounds
+    rows = range(math.floor(south / step), math.floor(north / step) + 1)
+    # the row nearest the equator has the widest cells
+    if rows.start >= 0:
+        row = rows.start
+    elif rows.stop <= 0:
+        row = rows.stop - 1
+    else:
+        row = 0
+    return _cell_radius_m(row, step)
+
+
+def grid_cells(bounds: Bounds, step: float) -> Tuple[range, List[int]]:
+    """Row and column indices of the `step`-degree grid cells overlapping `bounds`."""
+    south, west, north, east = bounds
+    # across the antimeridian: the part up to 180 and the part from -180
+    spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    rows = range(math.floor(south / step), math.floor(north / step) + 1)
+    cols = sorted({j for w, e in spans
+                   for j in range(math.floor(w / step), math.floor(e / step) + 1)})
+    return rows, cols
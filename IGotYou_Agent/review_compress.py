@@ -0,0 +1,181 @@
+"""
+Review Compression for the Recommendation Prompt
+
+The analysis step used to put the full text of every review of every gem
+into `reviews_content`, and the Recommendation Agent sends the whole
+analysis result to Gemini. Most of that text is repetition ("Amazing
+place!!", the same review twice) that the model can't use for "why it's
+special / best time / insider tip". This module cuts each gem's reviews
+down to a token budget before they reach state.
+
+HOW IT WORKS:
+1. Reviews are split into sentences; near-identical reviews (word-set
+   Jaccard similarity >= 0.8) and repeated sentences are dropped
+2. Boilerplate sentences ("Highly recommend!", "5 stars", "Translated by
+   Google", very short exclamations) are dropped
+3. Every sentence is scored with a local lexical scorer: one point per
+   aspect it talks about (what makes the place special, when to go,
+   practical tips), plus a bonus for concrete details (numbers, times)
+4. The best sentence for each aspect is kept first, then the rest by
+   score, until the per-gem budget is used; the kept sentences are
+   returned in their original order, one quoted review per line
+
+Tokens are estimated at ~4 characters per token (no tokenizer needed).
+"""
+
+import math
+import re
+from typing import List, NamedTuple, Set
+
+
+CHARS_PER_TOKEN = 4
+
+# Aspect lexicons for the lexical scorer (matched as word prefixes)
+ASPECTS = {
+    "special": (
+        "view", "hidden", "quiet", "peace", "secluded", "untouched", "unique", "stunning",
+        "breathtaking", "waterfall", "lake", "crystal", "clear", "wild", "panoram",
+        "sunset", "sunrise", "crowd", "tourist", "local", "gem", "secret", "nature",
+        "forest", "cave", "canyon", "cliff", "beach", "river", "meadow", "reflection",
+    ),
+    "time": (
+        "morning", "evening", "afternoon", "night", "early", "late", "weekday", "weekend",
+        "spring", "summer", "autumn", "winter", "season", "month", "after rain",
+        "dry", "snow", "january", "february", "march", "april", "june", "july",
+        "august", "september", "october", "november", "december", "hour", "sunrise",
+        "sunset", "busy", "crowded", "empty",
+    ),
+    "tip": (
+        "park", "bring", "wear", "shoe", "boot", "trail", "path", "hike", "walk", "climb",
+        "road", "entrance", "fee", "free", "ticket", "avoid", "water", "bug", "mosquito",
+        "map", "signal", "toilet", "swim", "steep", "slippery", "mud", "4x4", "gravel",
+        "minute", "km", "mile", "drive", "bus", "sign", "gps", "cash", "picnic", "camp",
+    ),
+}
+
+_ASPECT_RES = {
+    aspect: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")", re.IGNORECASE)
+    for aspect, words in ASPECTS.items()
+}
+
+_BOILERPLATE_RE = re.compile(
+    r"^\W*(?:"
+    r"\(?(?:translated by google|original)\)?"
+    r"|(?:highly |would |definitely |totally )?recommend(?:ed)?(?: it)?"
+    r"|(?:a )?must (?:see|visit|go)"
+    r"|(?:\d|five|four) stars?"
+    r"|(?:so |very |really )?(?:beautiful|amazing|awesome|great|nice|lovely|wonderful|gorgeous)"
+    r"(?: place| spot| view| location)?"
+    r"|(?:loved|love) (?:it|this place)"
+    r"|(?:10/10|5/5|wow|perfect|worth it)"
+    r")\W*$",
+    re.IGNORECASE,
+)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"\w+")
+_DETAIL_RE = re.compile(r"\d|\b(?:am|pm)\b", re.IGNORECASE)
+
+
+class CompressedReviews(NamedTuple):
+    text: str           # the new reviews_content
+    raw_tokens: int     # estimated tokens of the uncompressed reviews_content
+    tokens: int         # estimated tokens of `text`
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _is_boilerplate(sentence: str) -> bool:
+    return bool(_BOILERPLATE_RE.match(sentence)) or len(_WORD_RE.findall(sentence)) < 4
+
+
+def _score(sentence: str) -> tuple:
+    """(aspects mentioned, relevance score)"""
+    aspects = {a for a, pattern in _ASPECT_RES.items() if pattern.search(sentence)}
+    score = len(aspects) + (0.5 if _DETAIL_RE.search(sentence) else 0)
+    # prefer informative sentences, but not walls of text
+    words = len(_WORD_RE.findall(sentence))
+    score += min(words, 25) / 50 - max(0, words - 40) / 40
+    return aspects, score
+
+
+def _truncate(sentence: str, max_chars: int) -> str:
+    if len(sentence) <= max_chars:
+        return sentence
+    cut = sentence[:max(0, max_chars - 1)].rsplit(" ", 1)[0]
+    return cut + "…"
+
+
+def compress_reviews(reviews: List[str], budget_tokens: int = 250) -> CompressedReviews:
+    """
+    Builds a gem's reviews_content within `budget_tokens`.
+
+    Args:
+        reviews: Review texts, most relevant first (as Place Details returns them)
+        budget_tokens: Token budget for the result (0 = no compression)
+
+    Returns:
+        CompressedReviews with the text and the before/after token estimates
+    """
+    raw_text = "\n".join(f"\"{r}\"" for r in reviews)
+    raw_tokens = estimate_tokens(raw_text)
+    if budget_tokens <= 0 or raw_tokens <= budget_tokens:
+        return CompressedReviews(raw_text, raw_tokens, raw_tokens)
+
+    # 1. dedupe near-identical reviews, split the rest into sentences
+    kept_reviews: List[Set[str]] = []
+    sentences = []    # (review index, text), in original order
+    seen: Set[str] = set()
+    for i, review in enumerate(r for r in reviews if r):
+        words = _words(review)
+        if any(_jaccard(words, other) >= 0.8 for other in kept_reviews):
+            continue
+        kept_reviews.append(words)
+        for sentence in _SENTENCE_RE.split(review.strip()):
+            sentence = sentence.strip()
+            key = " ".join(_WORD_RE.findall(sentence.lower()))
+            # 2. drop repeats and boilerplate
+            if not sentence or key in seen or _is_boilerplate(sentence):
+                continue
+            seen.add(key)
+            sentences.append((i, sentence))
+
+    # 3. score; 4. best sentence per aspect first, then by score
+    scored = [(*_score(s), n) for n, (_, s) in enumerate(sentences)]
+    order = []
+    for aspect in ASPECTS:
+        best = max((x for x in scored if aspect in x[0]), key=lambda x: x[1], default=None)
+        if best is not None and best[2] not in order:
+            order.append(best[2])
+    order += [n for _, _, n in sorted(scored, key=lambda x: -x[1]) if n not in order]
+
+    # minus the quotes and newline around each review line
+    budget_chars = budget_tokens * CHARS_PER_TOKEN - 3 * len(kept_reviews)
+    chosen, used = [], 0
+    for n in order:
+        cost = len(sentences[n][1]) + 1
+        if used + cost > budget_chars:
+            if not chosen:
+                # a single sentence over budget is cut at a word boundary
+                chosen.append((n, _truncate(sentences[n][1], budget_chars - 3)))
+            continue
+        chosen.append((n, sentences[n][1]))
+        used += cost
+
+    # back in original order, one quoted line per review
+    by_review = {}
+    for n, text in sorted(chosen):
+        by_review.setdefault(sentences[n][0], []).append(text)
+    text = "\n".join(f"\"{' '.join(parts)}\"" for parts in by_review.values())
+    return CompressedReviews(text, raw_tokens, estimate_tokens(text))
@@ -0,0 +1,114 @@
+"""
+Vectorized Hidden Gem Scoring
+
+CandidateScorer.ranked() (sub_Agents/analysis_agent.py) scores candidates
+in Python loops, which is fine for one page of 20 but slow once pagination,
+fan-out or region tiling return hundreds or thousands of candidates. This
+module does the same scoring on NumPy arrays in one pass.
+
+HOW IT WORKS:
+1. Ratings and review counts of the (non-business) candidates are loaded
+   into arrays
+2. The tiers are computed with boolean masks, exactly like the loop:
+   score 2 (10 <= reviews <= mean/2), 1 (<= mean), 0 (<= 2*mean and
+   rating >= 4.5), all with rating >= 3.5; if nothing qualifies, every
+   candidate rated >= 4.0 gets -1
+3. One lexsort orders by score, then rating (both descending), then
+   arrival order, which reproduces the stable Python sort exactly
+4. Optional, off by default (they change the ranking; set with
+   ANALYSIS_SCORING_THRESHOLDS / ANALYSIS_SCORING_RATING):
+   - thresholds="percentile": tier limits are the 25th / 50th / 75th
+     percentile of the review counts instead of mean/2, mean, 2*mean
+   - rating="bayesian": sort by the Bayesian average rating
+     (v*R + m*C) / (v + m), so a 5.0 from 3 reviews doesn't beat a 4.8
+     from 200
+
+Benchmark: `python benchmarks/bench_scoring.py`
+"""
+
+from typing import List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available() -> bool:
+    return np is not None
+
+
+def rank_candidates(
+    natural: List[dict],
+    total_reviews: float,
+    count: int,
+    top_k: Optional[int] = None,
+    thresholds: str = "mean",
+    rating: str = "raw",
+    prior_reviews: float = 25.0,
+) -> List[dict]:
+    """
+    Ranks non-business candidates like CandidateScorer.ranked().
+
+    Args:
+        natural: Non-business candidates in arrival order (annotated in
+            place with `score`, like the loop version)
+        total_reviews: Review count of ALL candidates (businesses included)
+        count: Number of ALL candidates
+        top_k: Return only the best k
+        thresholds: "mean" (today's ranking) or "percentile"
+        rating: "raw" (today's ranking) or "bayesian"
+        prior_reviews: Weight m of the Bayesian prior
+
+    Returns:
+        Hidden gem candidates, best first
+    """
+    n = len(natural)
+    if n == 0:
+        return []
+
+    ratings = np.fromiter((p.get('rating', 0) for p in natural), dtype=np.float64, count=n)
+    reviews = np.fromiter((p.get('reviews', 0) for p in natural), dtype=np.float64, count=n)
+
+    if thresholds == "percentile":
+        strict, moderate, loose = np.percentile(reviews, [25, 50, 75])
+    else:
+        # same float arithmetic as the loop version
+        mean_value = total_reviews / count if count else 0
+        strict, moderate, loose = mean_value / 2, mean_value, mean_value * 2
+
+    decent = ratings >= 3.5
+    enough = reviews >= 10
+    tier2 = decent & enough & (reviews <= strict)
+    tier1 = decent & enough & (reviews <= moderate) & ~tier2
+    tier0 = decent & (reviews <= loose) & (ratings >= 4.5) & ~tier2 & ~tier1
+
+    scores = np.full(n, -2, dtype=np.int8)   # -2 = not a gem
+    scores[tier0] = 0
+    scores[tier1] = 1
+    scores[tier2] = 2
+    if not (scores >= 0).any():
+        # fallback: top rated non-businesses
+        scores[ratings >= 4.0] = -1
+
+    selected = np.flatnonzero(scores > -2)
+    if selected.size == 0:
+        return []
+
+    if rating == "bayesian":
+        prior = ratings[reviews > 0].mean() if (reviews > 0).any() else 0.0
+        sort_rating = (reviews * ratings + prior_reviews * prior) / (reviews + prior_reviews)
+    else:
+        sort_rating = ratings
+
+    # lexsort: last key is primary; ascending index keeps arrival order on ties
+    order = selected[np.lexsort((selected, -sort_rating[selected], -scores[selected]))]
+    if top_k is not None:
+        order = order[:top_k]
+
+    # Back to dicts; indexing NumPy scalars one by one would undo the speedup
+    order = order.tolist()
+    ranked = [natural[i] for i in order]
+    for p, score in zip(ranked, scores[order].tolist()):
+        p['score'] = score
+    return ranked
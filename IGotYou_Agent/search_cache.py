@@ -0,0 +1,148 @@
+"""
+Places Text Search Cache
+
+Discovery used to call the Places text search for every search, even for a
+query it had just run, and a ZERO_RESULTS answer was not remembered at all.
+This module caches text search results in memory per query.
+
+HOW IT WORKS:
+1. Keys are the normalized query text (lowercase, accents and punctuation
+   removed, whitespace collapsed) plus the location bias, rounded to ~1 km
+2. Results with places are kept for `ttl_seconds`
+3. Empty results (ZERO_RESULTS) are cached too, for the shorter
+   `negative_ttl_seconds`, so repeated dead-end queries don't hit the API
+4. Errors are never cached
+5. The cache is bounded by entry count (LRU eviction); lookups are counted
+   in the igotyou_places_search_cache_requests_total metric
+
+Region viewports (the bounding box of "Bavaria" for region-wide discovery)
+are kept in their own instance, `region_bounds_cache`, so geocoding lookups
+don't show up in the text search cache's hit rate.
+"""
+
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Optional
+
+try:
+    from .metrics import PLACES_SEARCH_CACHE, REGION_BOUNDS_CACHE
+except ImportError:
+    from metrics import PLACES_SEARCH_CACHE, REGION_BOUNDS_CACHE
+
+
+def search_key(query: str, location: Optional[dict] = None, radius: Optional[int] = None) -> str:
+    """
+    Builds the cache key for a text search.
+
+    Example:
+        >>> search_key("Lacul  Sfânta Ana!")
+        'lacul sfanta ana'
+        >>> search_key("lakes", {"lat": 45.6427, "lng": 25.5887}, 5000)
+        'lakes@45.64,25.59/5000'
+    """
+    text = unicodedata.normalize("NFKD", query.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = " ".join(re.sub(r"[^\w\s]", " ", text).split())
+    if location:
+        text += f"@{location['lat']:.2f},{location['lng']:.2f}"
+        if radius:
+            text += f"/{radius}"
+    return text
+
+
+class SearchCache:
+    """
+    In-memory LRU cache for text search results with negative caching.
+
+    Args:
+        ttl_seconds: How long a non-empty result stays valid
+        negative_ttl_seconds: How long an empty result stays valid
+        max_entries: Maximum number of cached queries
+        metric: Counter the lookups are recorded in (by result)
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, negative_ttl_seconds: float = 15 * 60,
+                 max_entries: int = 1024, metric=PLACES_SEARCH_CACHE):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._metric = metric
+
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[1]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                self._metric.labels(result="miss").inc()
+                return None
+
+            self._entries.move_to_end(key)
+            value = entry[0]
+            if value:
+                self.hits += 1
+                self._metric.labels(result="hit").inc()
+            else:
+                self.negative_hits += 1
+                self._metric.labels(result="negative_hit").inc()
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        ttl = self.ttl_seconds if value else self.negative_ttl_seconds
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negativeHits": self.negative_hits,
+            "misses": self.misses,
+            "hitRate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "ttlSeconds": self.ttl_seconds,
+            "negativeTtlSeconds": self.negative_ttl_seconds,
+            "maxEntries": self.max_entries,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Shared instance used by the discovery step
+places_search_cache = SearchCache(
+    ttl_seconds=float(os.getenv("PLACES_SEARCH_CACHE_TTL", str(6 * 3600))),
+    negative_ttl_seconds=float(os.getenv("PLACES_SEARCH_CACHE_NEGATIVE_TTL", str(15 * 60))),
+    max_entries=int(os.getenv("PLACES_SEARCH_CACHE_MAX_ENTRIES", "1024")),
+)
+
+# Bounding boxes of named areas for region-wide discovery
+region_bounds_cache = SearchCache(
+    ttl_seconds=float(os.getenv("REGION_BOUNDS_CACHE_TTL", str(24 * 3600))),
+    negative_ttl_seconds=float(os.getenv("PLACES_SEARCH_CACHE_NEGATIVE_TTL", str(15 * 60))),
+    max_entries=int(os.getenv("REGION_BOUNDS_CACHE_MAX_ENTRIES", "256")),
+    metric=REGION_BOUNDS_CACHE,
+)
@@ -0,0 +1,141 @@
+"""
+Single-Flight Request Coalescing
+
+When several callers ask for the same thing at the same time (e.g. many
+users searching "hidden beach in Bali" right after a marketing push), only
+the first caller does the work; the others wait for it and share its
+result. Nothing is cached afterwards - once the call finishes the key is
+free again (caching is the job of the caches in front of this).
+
+HOW IT WORKS:
+1. The first caller for a key becomes the LEADER and runs the function
+2. Callers arriving while it runs become FOLLOWERS and wait on the leader
+3. The leader's result (or exception) is handed to every follower
+4. The key is removed as soon as the leader finishes
+
+Two flavours:
+- SingleFlight: for blocking functions (Maps client calls, sync tools),
+  safe across threads
+- AsyncSingleFlight: for coroutines on one event loop (backend endpoints)
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """One in-flight call shared by a leader and its followers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls of blocking functions by key.
+
+    Example:
+        >>> flight = SingleFlight("places")
+        >>> value, shared = flight.do("bali beach", gmaps_client.places, query="bali beach")
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Runs `fn(*args, **kwargs)` unless a call with the same key is
+        already running, in which case its result is awaited and reused.
+
+        Returns:
+            (value, shared): shared is True if the value came from another
+            caller's run. Exceptions raised by the leader are re-raised in
+            every follower.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            print(f"[{self.name}] Joining in-flight call for {key!r}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, False
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "inFlight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls by key.
+
+    The work runs in its own task, so a leader that is cancelled (e.g. its
+    client disconnected) does not cancel the followers waiting on it.
+
+    Example:
+        >>> flight = AsyncSingleFlight("discover")
+        >>> gems, shared = await flight.do(query_key, lambda: run_discovery(client_id, query))
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Awaits `factory()` unless a call with the same key is already
+        running on this event loop, in which case that call is awaited.
+
+        Args:
+            key: Coalescing key (e.g. the normalized search query)
+            factory: Zero-argument callable returning the coroutine to run
+
+        Returns:
+            (value, shared): shared is True if the value came from another
+            caller's run
+        """
+        # Tasks belong to one loop; never share them across loops
+        loop_key = (id(asyncio.get_running_loop()), key)
+        self.calls += 1
+
+        task = self._tasks.get(loop_key)
+        shared = task is not None
+        if shared:
+            self.shared += 1
+            print(f"[{self.name}] Joining in-flight call for {key!r}")
+        else:
+            task = asyncio.ensure_future(factory())
+            self._tasks[loop_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(loop_key, None))
+
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "inFlight": len(self._tasks)}
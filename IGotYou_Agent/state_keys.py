@@ -0,0 +1,100 @@
+"""
+Session State Keys for the Hidden Gem Pipeline
+
+The pipeline stages hand their data to each other through ADK session
+state instead of through LLM text. A tool writes its full result under one
+of these keys and returns only a short summary to the model; the next
+stage reads the full result from state. The model never has to repeat
+(re-tokenize) candidate lists or review text, which was the largest source
+of output tokens and of corrupted JSON.
+
+HOW IT WORKS:
+1. search_places_tool  -> state[CANDIDATES] = list[Candidate]
+                          state[SEARCH_AREA] = the area it searched
+                          state[ANALYSIS] = None (see discovery_state)
+2. analysis_tool       -> reads state[CANDIDATES] (and SEARCH_AREA)
+                          state[ANALYSIS] = AnalysisResult
+3. Recommendation_Agent -> its instruction includes state[ANALYSIS]
+"""
+
+from typing import Dict, List, Optional, TypedDict
+
+
+# Plain (session-scoped) keys: "temp:" keys are dropped from the event
+# state_delta, so they would not reach the next stage of the fast path
+CANDIDATES = "igotyou_candidates"
+ANALYSIS = "igotyou_analysis"
+SEARCH_AREA = "igotyou_search_area"   # "Brasov" from "waterfalls in Brasov", or None
+
+
+class Candidate(TypedDict, total=False):
+    """One raw Places text search result."""
+    name: str
+    place_id: str
+    rating: float
+    reviews: int
+    loc: Dict[str, float]
+    types: List[str]
+    queries: List[str]     # fan-out query variants that found it
+    tiles: List[str]       # region grid cells that found it
+    score: int
+    relevance: float       # match with the user's request, 0..1 (intent_rank.py)
+
+
+class AnalyzedGem(TypedDict):
+    """One hidden gem with its Place Details, ready for the recommendation."""
+    name: str
+    rating: float
+    review_count: int
+    reviews_content: str
+    map_url: str
+    address: str
+    photo_url: str
+    coordinates: Dict[str, float]
+
+
+class ReviewTokens(TypedDict):
+    """Estimated review tokens before/after compression (review_compress.py)."""
+    raw: int
+    sent: int
+    saved: int
+
+
+class AnalysisResult(TypedDict, total=False):
+    status: str            # "success" | "zero_gems" | "error"
+    gems: List[AnalyzedGem]
+    message: str
+    reviewTokens: ReviewTokens
+
+
+def discovery_state(cands: List[Candidate], area: Optional[str]) -> dict:
+    """
+    The state a new search writes. Session state outlives a pipeline run,
+    so the previous search's ANALYSIS is cleared here; otherwise a failed
+    or skipped analysis step would leave the recommendation step reading
+    the gems of an earlier, unrelated search.
+    """
+    return {CANDIDATES: cands, SEARCH_AREA: area, ANALYSIS: None}
+
+
+def summarize_candidates(cands: List[Candidate]) -> dict:
+    """The short, LLM-visible version of a candidate list."""
+    valid = [c for c in cands if isinstance(c, dict) and c.get("place_id")]
+    return {
+        "status": "success" if valid else "zero_results",
+        "count": len(valid),
+        "names": [c.get("name") for c in valid[:10]],
+        "stateKey": CANDIDATES,
+    }
+
+
+def summarize_analysis(result: AnalysisResult) -> dict:
+    """The short, LLM-visible version of an analysis result."""
+    gems = result.get("gems") or []
+    return {
+        "status": result.get("status", "unknown"),
+        "count": len(gems),
+        "names": [g.get("name") for g in gems],
+        "message": result.get("message", ""),
+        "stateKey": ANALYSIS,
+    }
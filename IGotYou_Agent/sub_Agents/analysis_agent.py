@@ -1,161 +1,368 @@
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from google.adk.tools import ToolContext
 from google.genai import types
-import googlemaps
+import asyncio
 import os
+import time
+from typing import Optional
 
 try:
-    from config import gmaps_client
+    from ..config import maps_client
 except ImportError:
-    print("WARNING: Could not import 'gmaps_client' from config.")
-    gmaps_client = None
+    try:
+        from config import maps_client
+    except ImportError:
+        print("WARNING: Could not import 'maps_client' from config.")
+        maps_client = None
+
+try:
+    from .. import intent_rank, scoring
+    from ..business_filter import business_classifier
+    from ..latency import latency_callbacks, span, timed_tool
+    from ..metrics import REVIEW_TOKENS, maps_call_async
+    from ..place_cache import place_details_cache
+    from ..review_compress import compress_reviews
+    from ..single_flight import AsyncSingleFlight
+    from ..state_keys import ANALYSIS, CANDIDATES, SEARCH_AREA, summarize_analysis
+except ImportError:
+    import intent_rank
+    import scoring
+    from business_filter import business_classifier
+    from latency import latency_callbacks, span, timed_tool
+    from metrics import REVIEW_TOKENS, maps_call_async
+    from place_cache import place_details_cache
+    from review_compress import compress_reviews
+    from single_flight import AsyncSingleFlight
+    from state_keys import ANALYSIS, CANDIDATES, SEARCH_AREA, summarize_analysis
+
+
+# Concurrent analyses of the same place share one Place Details call
+_details_flight = AsyncSingleFlight("Analysis")
+
+
+# Place Details fan-out: at most DETAILS_CONCURRENCY calls in flight, each
+# given DETAILS_TIMEOUT seconds before the next-ranked candidate replaces it
+DETAILS_CONCURRENCY = int(os.getenv("ANALYSIS_DETAILS_CONCURRENCY", "3"))
+DETAILS_TIMEOUT = float(os.getenv("ANALYSIS_DETAILS_TIMEOUT", "5"))
+
+DETAILS_FIELDS = ['name', 'reviews', 'url', 'formatted_address', 'photo', 'geometry']
+
+# Estimated tokens of review text per gem sent to the Recommendation Agent
+# (see review_compress.py); 0 sends the reviews uncompressed
+REVIEW_TOKEN_BUDGET = int(os.getenv("ANALYSIS_REVIEW_TOKEN_BUDGET", "250"))
 
 
-def analysis_tool(cands: list[dict]) -> str:
+async def _place_details(place_id: str, name: str) -> dict:
+    """
+    Place Details result for DETAILS_FIELDS, served from the place cache
+    where fresh; only stale or missing fields are requested from the API.
+    """
+    res, missing = await place_details_cache.lookup_async(place_id, DETAILS_FIELDS)
+    if not missing:
+        return res
+
+    try:
+        with span("http", f"gmaps.place:{name}"):
+            details, _ = await _details_flight.do(
+                (place_id, tuple(missing)),
+                lambda: maps_call_async(
+                    "place", maps_client.place,
+                    place_id=place_id,
+                    fields=missing,
+                    reviews_sort="most_relevant",
+                    # fail fast rather than queue for a token past our timeout
+                    deadline=time.monotonic() + DETAILS_TIMEOUT
+                )
+            )
+    except Exception:
+        # Serve stale fields rather than nothing
+        stale = await place_details_cache.stale_async(place_id, missing)
+        if not stale:
+            raise
+        print(f"  [Analysis] Details fetch failed for {name}, using cached fields")
+        return {**stale, **res}
+
+    fetched = details.get('result', {})
+    await place_details_cache.store_async(place_id, missing, fetched)
+    return {**res, **fetched}
+
+
+async def _gem_details(gem: dict) -> dict:
+    """Fetches Place Details for one ranked candidate and builds its AnalyzedGem."""
+    if 'place_id' not in gem:
+        raise ValueError("missing place_id")
+
+    res = await _place_details(gem['place_id'], gem.get('name'))
+
+    raw_reviews = res.get('reviews', [])
+    # Only the sentences useful for the recommendation, within the budget
+    reviews = compress_reviews([r.get('text') or '' for r in raw_reviews], REVIEW_TOKEN_BUDGET)
+
+    # Extract photo URL
+    photo_url = ""
+    photos = res.get('photos', [])
+    if photos:
+        photo_reference = photos[0].get('photo_reference')
+        if photo_reference:
+            api_key = os.environ.get("GOOGLE_MAPS_API")
+            if api_key:
+                print(f"  [DEBUG] Found API Key: {api_key[:5]}...")
+                photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photo_reference={photo_reference}&key={api_key}"
+                print(f"  [DEBUG] Generated Photo URL: {photo_url}")
+            else:
+                print("  [DEBUG] GOOGLE_MAPS_API key missing in environment variables")
+
+    return {
+        "name": res.get('name'),
+        "rating": gem['rating'],
+        "review_count": gem['reviews'],
+        # Text for AI to analyze
+        "reviews_content": reviews.text,
+        "map_url": res.get('url'),
+        "address": res.get('formatted_address'),
+        "photo_url": photo_url,
+        "coordinates": res.get('geometry', {}).get('location', {'lat': 0, 'lng': 0}),
+        # (raw, sent) review tokens; popped by analyze_scored
+        "_review_tokens": (reviews.raw_tokens, reviews.tokens),
+    }
+
+
+async def fetch_ranked_details(ranked: list[dict], want: int = 3) -> list[dict]:
+    """
+    Fetches details for the `want` best candidates concurrently.
+
+    HOW IT WORKS:
+    1. Starts up to DETAILS_CONCURRENCY Place Details calls, best-ranked first
+    2. A call that fails or takes longer than DETAILS_TIMEOUT is dropped and
+       the next-ranked candidate is started in its place
+    3. Stops once `want` gems have details or the candidates run out
+
+    Returns:
+        The gems in ranking order (not completion order)
+    """
+    gems = {}      # rank -> AnalyzedGem
+    pending = {}   # task -> rank
+    next_rank = 0
+
+    def launch():
+        nonlocal next_rank
+        while (len(pending) < DETAILS_CONCURRENCY
+               and len(gems) + len(pending) < want
+               and next_rank < len(ranked)):
+            gem = ranked[next_rank]
+            task = asyncio.ensure_future(asyncio.wait_for(_gem_details(gem), DETAILS_TIMEOUT))
+            pending[task] = next_rank
+            next_rank += 1
+
+    launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                rank = pending.pop(task)
+                name = ranked[rank].get('name')
+                try:
+                    gems[rank] = task.result()
+                except asyncio.TimeoutError:
+                    print(f"  [Analysis] Dropping {name} - details took over {DETAILS_TIMEOUT}s")
+                except Exception as e:
+                    print(f"Error fetching ,{name} {e}")
+            launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return [gems[rank] for rank in sorted(gems)]
+
+
+# Re-ranking of the best INTENT_RERANK_TOP candidates by how well they match
+# the request (see intent_rank.py); INTENT_WEIGHT = gem score tiers a perfect
+# match is worth, 0 disables it
+INTENT_WEIGHT = float(os.getenv("INTENT_WEIGHT", "1.0"))
+INTENT_RERANK_TOP = int(os.getenv("INTENT_RERANK_TOP", "50"))
+
+# Candidate count from which ranking switches to the vectorized engine
+# (see scoring.py); a single page is faster in plain Python
+VECTOR_SCORING_MIN = int(os.getenv("ANALYSIS_VECTOR_SCORING_MIN", "500"))
+
+# Opt-in ranking modes of the vectorized engine (they change the ranking):
+# review tiers from percentiles instead of the mean, and sorting by the
+# Bayesian average rating instead of the raw one
+SCORING_THRESHOLDS = os.getenv("ANALYSIS_SCORING_THRESHOLDS", "mean").lower()
+SCORING_RATING = os.getenv("ANALYSIS_SCORING_RATING", "raw").lower()
+SCORING_PRIOR_REVIEWS = float(os.getenv("ANALYSIS_SCORING_PRIOR_REVIEWS", "25"))
+
+if SCORING_THRESHOLDS not in ("mean", "percentile"):
+    print(f"WARNING: Unknown ANALYSIS_SCORING_THRESHOLDS '{SCORING_THRESHOLDS}', using 'mean'")
+    SCORING_THRESHOLDS = "mean"
+if SCORING_RATING not in ("raw", "bayesian"):
+    print(f"WARNING: Unknown ANALYSIS_SCORING_RATING '{SCORING_RATING}', using 'raw'")
+    SCORING_RATING = "raw"
+
+# Only scoring.py implements the opt-in modes
+_CUSTOM_SCORING = SCORING_THRESHOLDS != "mean" or SCORING_RATING != "raw"
+if _CUSTOM_SCORING and not scoring.available():
+    print("WARNING: ANALYSIS_SCORING_* modes need numpy; using the default ranking")
+    _CUSTOM_SCORING = False
+
+
+class CandidateScorer:
+    """
+    The hidden gem filter, fed one page of candidates at a time.
+
+    Business filtering runs as each page arrives (add); the scoring needs
+    the mean review count of ALL candidates, so it runs once at the end
+    (ranked). Ties keep arrival order, so the ranking doesn't depend on
+    how the candidates were split into pages.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_reviews = 0
+        self.natural = []   # non-business candidates, in arrival order
+
+    def add(self, cands: list[dict]) -> None:
+        # skip businesses, by name keyword or place type (see business_filter.py)
+        for p, is_business in zip(cands, business_classifier.classify(cands)):
+            self.count += 1
+            self.total_reviews += p.get('reviews', 0)
+
+            if is_business:
+                print(f"  [Analysis] Skipping business: {p.get('name')} (Type: {p.get('types', [])})")
+                continue
+            self.natural.append(p)
+
+    def ranked(self) -> list[dict]:
+        """Hidden gem candidates, best first (empty if none qualify)."""
+        if _CUSTOM_SCORING:
+            # Opt-in modes apply at every size, so rankings stay comparable
+            return scoring.rank_candidates(
+                self.natural, self.total_reviews, self.count,
+                thresholds=SCORING_THRESHOLDS, rating=SCORING_RATING,
+                prior_reviews=SCORING_PRIOR_REVIEWS)
+        if scoring.available() and len(self.natural) >= VECTOR_SCORING_MIN:
+            # Same ranking, one NumPy pass instead of per-candidate loops
+            return scoring.rank_candidates(self.natural, self.total_reviews, self.count)
+
+        mean_value = self.total_reviews / self.count if self.count else 0
+        mean_value_over_two = mean_value / 2
+
+        potential_hidden_gems = []
+        for p in self.natural:
+            rev = p.get('reviews', 0)
+            rate = p.get('rating', 0)
+            print(f"  [Analysis] Checking candidate: {p.get('name')} | Rating: {rate} | Reviews: {rev}")
+
+            # Relaxed criteria: Just check if it's not a business and has decent rating
+            if rate >= 3.5:
+                # Strict hidden gem check
+                if 10 <= rev <= mean_value_over_two:
+                    p['score'] = 2 # High priority
+                    potential_hidden_gems.append(p)
+                # Moderate hidden gem check (allow up to mean)
+                elif 10 <= rev <= mean_value:
+                    p['score'] = 1 # Medium priority
+                    potential_hidden_gems.append(p)
+                # Fallback (allow up to 2x mean if it's really good)
+                elif rev <= mean_value * 2 and rate >= 4.5:
+                    p['score'] = 0 # Low priority
+                    potential_hidden_gems.append(p)
+
+        if not potential_hidden_gems:
+            # If still empty, just take the top rated non-businesses
+            print("  [Analysis] No strict hidden gems found, falling back to top rated non-businesses.")
+            for p in self.natural:
+                if p.get('rating', 0) >= 4.0:
+                    p['score'] = -1
+                    potential_hidden_gems.append(p)
+
+        # Sort by score (desc) then rating (desc); the sort is stable
+        potential_hidden_gems.sort(key=lambda x: (x.get('score', 0), x['rating']), reverse=True)
+        return potential_hidden_gems
+
+
+@timed_tool
+async def analyze_candidates(cands: list[dict], intent: str = "",
+                             area: Optional[str] = None) -> dict:
     """
     Takes a list of candidates.
     1. Filters OUT businesses (restaurants, cafes, shops).
     2. Applies hidden gem criteria (low reviews, decent rating).
-    3. Sorts by rating.
-    4. Fetches details for top 3.
+    3. Sorts by rating, then re-ranks the best by match with `intent`
+       (the user's request, minus `area`, the place discovery searched).
+    4. Fetches details for the top 3 concurrently (see fetch_ranked_details).
+    Returns the full result (see state_keys.AnalysisResult).
     """
-    if not gmaps_client:
-        return [{"error": "APIKey missing"}]
-
-    print(f"📊 Analysis for : '{len(cands)}' candidates...")
     # Debug: Print first candidate to check structure
     if cands:
         print(f"  [Analysis] First candidate sample: {cands[0]}")
 
-    # keywords that indicate a business, not a natural place
-    BUSINESS_KEYWORDS = [
-        'restaurant', 'cafe', 'coffee', 'hotel', 'hostel', 'inn',
-        'shop', 'store', 'market', 'bar', 'pub', 'club', 'nightclub',
-        'bakery', 'bistro', 'eatery', 'dining', 'diner', 'pizzeria',
-        'mall', 'boutique', 'salon', 'spa', 'gym', "school", "instructor", "rental", "center"
-    ]
-    # google places types that are businesses
-    BUSINESS_TYPES = [
-        'restaurant', 'cafe', 'bar', 'food', 'meal_takeaway',
-        'lodging', 'store', 'shopping_mall', 'department_store',
-        'bakery', 'night_club', 'casino', 'school', 'travel_agency', 'Ski_school'
-    ]
-
-    count_reviews = 0
-    for c in cands:
-        count_reviews += c.get('reviews', 0)
-
-    mean_value = count_reviews / len(cands) if cands else 0
-    mean_value_over_two = mean_value / 2
-
-    potential_hidden_gems = []
-    for p in cands:
-        rev = p.get('reviews', 0)
-        rate = p.get('rating', 0)
-        name_lower = p.get('name', '').lower()
-        place_types = p.get('types', [])
-
-        # skip if name contains business keywords
-        is_business_name = any(kw in name_lower for kw in BUSINESS_KEYWORDS)
-        # skip if place type is a business
-        is_business_type = any(bt in place_types for bt in BUSINESS_TYPES)
-
-        if is_business_name or is_business_type:
-            print(f"  [Analysis] Skipping business: {p.get('name')} (Type: {place_types})")
-            continue
-        
-        print(f"  [Analysis] Checking candidate: {p.get('name')} | Rating: {rate} | Reviews: {rev}")
-
-        # Relaxed criteria: Just check if it's not a business and has decent rating
-        if rate >= 3.5:
-            # Strict hidden gem check
-            if 10 <= rev <= mean_value_over_two:
-                p['score'] = 2 # High priority
-                potential_hidden_gems.append(p)
-            # Moderate hidden gem check (allow up to mean)
-            elif 10 <= rev <= mean_value:
-                p['score'] = 1 # Medium priority
-                potential_hidden_gems.append(p)
-            # Fallback (allow up to 2x mean if it's really good)
-            elif rev <= mean_value * 2 and rate >= 4.5:
-                p['score'] = 0 # Low priority
-                potential_hidden_gems.append(p)
+    scorer = CandidateScorer()
+    scorer.add(cands)
+    return await analyze_scored(scorer, intent, area)
 
-    if not potential_hidden_gems:
-        # If still empty, just take the top rated non-businesses
-        print("  [Analysis] No strict hidden gems found, falling back to top rated non-businesses.")
-        for p in cands:
-             rev = p.get('reviews', 0)
-             rate = p.get('rating', 0)
-             name_lower = p.get('name', '').lower()
-             place_types = p.get('types', [])
-             is_business_name = any(kw in name_lower for kw in BUSINESS_KEYWORDS)
-             is_business_type = any(bt in place_types for bt in BUSINESS_TYPES)
-             
-             if not is_business_name and not is_business_type and rate >= 4.0:
-                 p['score'] = -1
-                 potential_hidden_gems.append(p)
 
+async def analyze_scored(scorer: CandidateScorer, intent: str = "",
+                         area: Optional[str] = None) -> dict:
+    """
+    Ranks the candidates fed to `scorer`, re-ranks the best by match with
+    `intent` (minus the searched `area`) and fetches details for the top 3.
+    """
+    if not maps_client:
+        return {"status": "error", "message": "APIKey missing", "gems": []}
+
+    print(f"📊 Analysis for : '{scorer.count}' candidates...")
+    potential_hidden_gems = scorer.ranked()
     if not potential_hidden_gems:
         return {
             "status": "zero_gems",
             "message": "No natural places met the hidden gem criteria."
         }
-    
-    # Sort by score (desc) then rating (desc)
-    potential_hidden_gems.sort(key=lambda x: (x.get('score', 0), x['rating']), reverse=True)
-    top_3_gems = potential_hidden_gems[:3]
-
-    result = []
-    for gem in top_3_gems:
-        try:
-            if 'place_id' not in gem:
-                print(f"  [Analysis] Skipping {gem.get('name')} - Missing place_id")
-                continue
-                
-            details = gmaps_client.place(
-                place_id=gem['place_id'],
-                fields=['name', 'reviews', 'url', 'formatted_address', 'photo', 'geometry'],
-                reviews_sort="most_relevant"
-            )
-            res = details.get('result', {})
-
-            raw_reviews = res.get('reviews', [])
-            reviews_text = []
-            for r in raw_reviews:
-                reviews_text.append(f"\"{r.get('text')}\"")
-
-            # Extract photo URL
-            photo_url = ""
-            photos = res.get('photos', [])
-            if photos:
-                photo_reference = photos[0].get('photo_reference')
-                if photo_reference:
-                    api_key = os.environ.get("GOOGLE_MAPS_API")
-                    if api_key:
-                        print(f"  [DEBUG] Found API Key: {api_key[:5]}...")
-                        photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photo_reference={photo_reference}&key={api_key}"
-                        print(f"  [DEBUG] Generated Photo URL: {photo_url}")
-                    else:
-                        print("  [DEBUG] GOOGLE_MAPS_API key missing in environment variables")
-
-            result.append({
-                "name": res.get('name'),
-                "rating": gem['rating'],
-                "review_count": gem['reviews'],
-                # Text for AI to analyze
-                "reviews_content": "\n".join(reviews_text),
-                "map_url": res.get('url'),
-                "address": res.get('formatted_address'),
-                "photo_url": photo_url,
-                "coordinates": res.get('geometry', {}).get('location', {'lat': 0, 'lng': 0})
-            })
-        except Exception as e:
-            print(f"Error fetching ,{gem['name']} {e}")
-    
+
+    if intent and INTENT_WEIGHT > 0:
+        head = potential_hidden_gems[:INTENT_RERANK_TOP]
+        reviews = await place_details_cache.cached_reviews_async(p['place_id'] for p in head if 'place_id' in p)
+        potential_hidden_gems = intent_rank.rerank(
+            potential_hidden_gems, intent, reviews, weight=INTENT_WEIGHT, top=INTENT_RERANK_TOP,
+            area=area)
+
+    result = await fetch_ranked_details(potential_hidden_gems, want=3)
+
+    raw_tokens = sent_tokens = 0
+    for gem in result:
+        raw, sent = gem.pop('_review_tokens')
+        raw_tokens += raw
+        sent_tokens += sent
+    REVIEW_TOKENS.labels(stage="raw").inc(raw_tokens)
+    REVIEW_TOKENS.labels(stage="sent").inc(sent_tokens)
+    print(f"[Analysis] Review text: ~{raw_tokens} -> ~{sent_tokens} tokens "
+          f"(saved ~{raw_tokens - sent_tokens})")
+
     print(f"[Analysis] Finished processing. Returning {len(result)} gems to Recommendation Agent.")
-    import json
-    return json.dumps({"status": "success", "gems": result})
+    return {
+        "status": "success",
+        "gems": result,
+        "reviewTokens": {"raw": raw_tokens, "sent": sent_tokens, "saved": raw_tokens - sent_tokens},
+    }
+
+
+async def analysis_tool(tool_context: ToolContext) -> dict:
+    """
+    Filters the candidates found by the discovery step (read from session
+    state) down to the top hidden gems and fetches their details. The full
+    result is saved to session state for the recommendation step; only a
+    short summary is returned.
+    """
+    cands = tool_context.state.get(CANDIDATES) or []
+    # The request this pipeline run was given, for intent-aware ranking
+    intent = ""
+    user_content = tool_context.user_content
+    if user_content and user_content.parts:
+        intent = " ".join(p.text for p in user_content.parts if p.text)
+    result = await analyze_candidates(cands, intent, tool_context.state.get(SEARCH_AREA))
+    tool_context.state[ANALYSIS] = result
+    return summarize_analysis(result)
 
 
 # 2. Agent Configuration
@@ -179,18 +386,17 @@ analysis_agent = Agent(
     instruction="""
     You are the **Analysis Agent**. 
     
-    You will receive a raw list of candidates (JSON string).
+    The candidates found by the Discovery Agent are already saved for you.
     
     YOUR JOB:
-    1. Pass the ENTIRE list to `analysis_tool`. 
+    1. Call `analysis_tool` once (it takes no arguments).
     
-    2. Receive the structured data back from the tool.
+    2. It saves the hidden gems for the Recommendation Agent and returns a short summary.
     
-    3. **CRITICAL OUTPUT RULE:** 
-       - You MUST output the JSON object returned by the tool EXACTLY as is.
-       - Do NOT add any text.
-       - Do NOT summarize.
-       - Output ONLY the JSON string starting with `{`.
+    3. **OUTPUT RULE:** 
+       - Reply with ONE short line, e.g. "Selected 3 hidden gems."
+       - Do NOT repeat the gems or any JSON.
     """,
     tools=[analysis_tool],
+    **latency_callbacks(),
 )
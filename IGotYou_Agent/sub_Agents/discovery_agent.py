@@ -1,50 +1,477 @@
+import asyncio
+import os
+import re
+import time
+from typing import AsyncIterator, Optional
+
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
+from google.adk.tools import ToolContext
 from google.genai import types
 
 
+# Relative first, so the client (and its rate limiters and metrics) is the
+# same module instance the backend sees
+try:
+    from ..config import maps_client
+except ImportError:
+    try:
+        from config import maps_client
+    except ImportError:
+        print("WARNING: Could not import 'maps_client' from config.")
+        maps_client = None
+
 try:
-    from config import gmaps_client
+    from ..intent_rank import place_of
+    from ..latency import latency_callbacks, span, timed_tool
+    from ..metrics import maps_call_async
+    from ..place_index import place_index
+    from ..region_grid import Bounds, Tile, bounds_size_km, nearest_tiles, tiles_for_bounds, viewport_bounds
+    from ..search_cache import places_search_cache, region_bounds_cache, search_key
+    from ..single_flight import AsyncSingleFlight
+    from ..state_keys import discovery_state, summarize_candidates
 except ImportError:
-    print("WARNING: Could not import 'gmaps_client' from config.")
-    gmaps_client = None
+    from intent_rank import place_of
+    from latency import latency_callbacks, span, timed_tool
+    from metrics import maps_call_async
+    from place_index import place_index
+    from region_grid import Bounds, Tile, bounds_size_km, nearest_tiles, tiles_for_bounds, viewport_bounds
+    from search_cache import places_search_cache, region_bounds_cache, search_key
+    from single_flight import AsyncSingleFlight
+    from state_keys import discovery_state, summarize_candidates
 
 
-# 1. search Tool
-def search_places_tool(query: str) -> list[dict]:
+# Concurrent identical searches share one Places text search
+_places_flight = AsyncSingleFlight("Discovery")
+
+
+# Candidates to fetch per search: 20 = first page only; up to 60 (3 pages)
+SEARCH_MAX_RESULTS = min(int(os.getenv("SEARCH_MAX_RESULTS", "20")), 60)
+# A next_page_token only becomes valid a couple of seconds after it is issued
+PAGE_TOKEN_DELAY = 2.0
+# Seconds a search (a text search page, a region lookup, a whole region
+# grid) may queue for a rate limit token before it fails with RateLimited
+SEARCH_QUEUE_TIMEOUT = float(os.getenv("SEARCH_QUEUE_TIMEOUT", "10"))
+
+
+def _to_candidate(p: dict) -> dict:
+    return {
+        "name": p.get('name'),
+        "place_id": p.get('place_id'),
+        "rating": p.get('rating', 0),
+        "reviews": p.get('user_ratings_total', 0),
+        "loc": p.get('geometry', {}).get('location'),
+        # needed for business filtering
+        "types": p.get('types', [])
+    }
+
+
+async def search_place_pages(query: str, location: Optional[dict] = None,
+                             radius: Optional[int] = None,
+                             max_results: int = SEARCH_MAX_RESULTS) -> AsyncIterator[list[dict]]:
     """
-    Searches for outdoor NATURAL places (parks, viewpoints, trails, etc).
-    Biases query toward nature spots, not businesses.
+    Yields the text search candidates one page (up to 20) at a time, so
+    the caller can start filtering page one while later pages load.
+
+    HOW IT WORKS:
+    1. A cached result is yielded as a single page; so is the place index
+       result when the index covers the query's whole area (see
+       _indexed_area)
+    2. Otherwise page one is fetched; while there is a next_page_token and
+       fewer than `max_results` candidates, the next page is fetched after
+       the token delay
+    3. The complete list (including an empty one) is cached; a failed page
+       ends the search with the pages so far and nothing is cached
     """
-    if not gmaps_client:
-        return [{"error": "APIKey missing"}]
+    if not maps_client:
+        yield [{"error": "APIKey missing"}]
+        return
 
     # bias the query toward natural outdoor places
     enhanced_query = f"{query}"
     print(f"🔎 Discovery Agent searching for: '{enhanced_query}'...")
 
-    try:
-        response = gmaps_client.places(query=enhanced_query)
-        cands = []
-        if response.get("status") == "OK" and "results" in response:
-            for p in response['results']:
-                cands.append({
-                    "name": p.get('name'),
-                    "place_id": p.get('place_id'),
-                    "rating": p.get('rating', 0),
-                    "reviews": p.get('user_ratings_total', 0),
-                    "loc": p.get('geometry', {}).get('location'),
-                    # needed for business filtering
-                    "types": p.get('types', [])
-                })
-        elif response.get("status") != "OK":
+    cache_key = search_key(enhanced_query, location, radius)
+    if max_results > 20:
+        cache_key += f"#{max_results}"
+    cached = places_search_cache.get(cache_key)
+    if cached is not None:
+        print(f"Search cache hit for '{cache_key}' ({len(cached)} candidates)")
+        # Copies: the analysis step annotates candidates in place
+        yield [dict(c) for c in cached]
+        return
+
+    if location is None:
+        indexed = await _indexed_area(query)
+        if indexed:
+            print(f"Place index answered '{query}' ({len(indexed)} candidates)")
+            yield indexed[:max_results]
+            return
+
+    bias = {}
+    if location:
+        bias = {"location": f"{location['lat']},{location['lng']}", "radius": radius}
+
+    cands = []
+    page_token = None
+    page = 1
+    while True:
+        try:
+            with span("http", f"gmaps.places:page{page}"):
+                response, _ = await _places_flight.do(
+                    (cache_key, page_token),
+                    lambda: maps_call_async("places", maps_client.places, query=enhanced_query,
+                                            page_token=page_token,
+                                            deadline=time.monotonic() + SEARCH_QUEUE_TIMEOUT,
+                                            **bias))
+        except Exception as e:
+            if not cands:
+                yield [{"err": f"search failed {e}"}]
+            else:
+                print(f"⚠️ Page {page} failed ({e}), keeping {len(cands)} candidates")
+            return
+
+        if response.get("status") != "OK":
             print("⚠️ API returned ZERO_RESULTS / no result found.")
-            return []
-        print(f"Found {len(cands)} candidates")
-        return cands
+        page_cands = [_to_candidate(p) for p in response.get('results', [])][:max_results - len(cands)]
+        cands.extend(page_cands)
+        place_index.add(page_cands)
+        if page_cands:
+            yield page_cands
+
+        page_token = response.get("next_page_token")
+        if not page_token or len(cands) >= max_results:
+            break
+        page += 1
+        await asyncio.sleep(PAGE_TOKEN_DELAY)
+
+    print(f"Found {len(cands)} candidates")
+    places_search_cache.put(cache_key, [dict(c) for c in cands])
+
+
+async def _indexed_area(query: str) -> Optional[list[dict]]:
+    """
+    Candidates for "<what> in/near <area>" from the place index, if region
+    searches for <what> already covered the whole area; None otherwise.
+    The area is only resolved (one cached lookup) when the index has any
+    coverage for <what>, so uncovered queries cost nothing extra.
+    """
+    match = _WHERE.search(query)
+    if not match:
+        return None
+    keyword = search_key(query[:match.start()].strip())
+    if not keyword or not place_index.has_coverage(keyword):
+        return None
+    try:
+        bounds = await region_bounds(match.group(1))
+    except Exception as e:
+        print(f"⚠️ Area lookup for the place index failed: {e}")
+        return None
+    if bounds is None or not place_index.covers(keyword, bounds):
+        return None
+    return place_index.within_bounds(bounds, keyword=keyword)
+
+
+# 1. search Tool
+@timed_tool
+async def search_places(query: str, location: Optional[dict] = None,
+                        radius: Optional[int] = None,
+                        max_results: int = SEARCH_MAX_RESULTS) -> list[dict]:
+    """
+    Searches for outdoor NATURAL places (parks, viewpoints, trails, etc).
+    Biases query toward nature spots, not businesses.
+    Returns the full candidate list (see state_keys.Candidate).
+
+    Results (including empty ones) are cached per normalized query and
+    location bias, see search_cache.py.
+    """
+    cands = []
+    async for page in search_place_pages(query, location, radius, max_results):
+        cands.extend(page)
+    return cands
+
+
+# Extra nature-focused variants searched alongside the user's query
+SEARCH_FANOUT = int(os.getenv("SEARCH_FANOUT", "3"))
+FANOUT_MAX_CANDIDATES = int(os.getenv("FANOUT_MAX_CANDIDATES", "60"))
+FANOUT_KINDS = ["viewpoint", "hiking trail", "lake", "waterfall", "nature park"]
+
+# "... in Sibiu" / "... near Brasov": the part every variant keeps
+_WHERE = re.compile(r"\b(?:in|near|around|at)\s+(.+)$", re.IGNORECASE)
+
+
+def query_variants(query: str, fanout: int = SEARCH_FANOUT) -> list[str]:
+    """
+    The query plus up to `fanout` variants for other kinds of natural
+    places in the same area. Queries without a location ("in X",
+    "near X") are not varied.
+
+    Example:
+        >>> query_variants("ski resort in Sibiu", 2)
+        ['ski resort in Sibiu', 'viewpoint in Sibiu', 'hiking trail in Sibiu']
+    """
+    match = _WHERE.search(query)
+    if not match or fanout <= 0:
+        return [query]
+    subject = query[:match.start()].lower()
+    kinds = [k for k in FANOUT_KINDS if k not in subject][:fanout]
+    return [query] + [f"{kind} {match.group(0)}" for kind in kinds]
+
+
+def merge_candidates(results: dict, max_candidates: int = FANOUT_MAX_CANDIDATES,
+                     source_key: str = "queries") -> list[dict]:
+    """
+    Merges per-query candidate lists into one, deduplicated by place_id.
 
+    Each candidate gets `queries` (or `source_key`), the variants that found
+    it. Places found by more variants come first, then first-seen order (the
+    user's own query is listed first); the list is capped at `max_candidates`.
+
+    Args:
+        results: query -> candidate list, in query order
+    """
+    merged = {}
+    for query, cands in results.items():
+        for c in cands:
+            place_id = c.get("place_id")
+            if not place_id:
+                continue  # error entries
+            if place_id not in merged:
+                merged[place_id] = {**c, source_key: []}
+            merged[place_id][source_key].append(query)
+
+    ranked = sorted(merged.values(), key=lambda c: -len(c[source_key]))
+    return ranked[:max_candidates]
+
+
+async def search_places_fanout(query: str) -> list[dict]:
+    """
+    Searches the query and its variants concurrently and merges the
+    results (see query_variants / merge_candidates). The user's own query
+    gets all its pages, the variants one page each.
+    """
+    variants = query_variants(query)
+    if len(variants) == 1:
+        return await search_places(query)
+
+    print(f"🔀 Fan-out search: {variants}")
+    lists = await asyncio.gather(
+        search_places(variants[0]),
+        *(search_places(v, max_results=20) for v in variants[1:]))
+    cands = merge_candidates(dict(zip(variants, lists)))
+    if not cands:
+        # nothing found anywhere: pass the user's query result (maybe an error) on
+        return lists[0]
+    print(f"Fan-out merged {sum(len(l) for l in lists)} results into {len(cands)} candidates")
+    return cands
+
+
+async def search_fanout_pages(query: str) -> AsyncIterator[list[dict]]:
+    """
+    Streaming search_places_fanout: yields each variant's pages as they
+    arrive, minus places already yielded, so the caller can filter the
+    first page while the other searches are still loading.
+
+    Candidates get `queries` like merge_candidates; a place found again by
+    a later variant has that variant appended to the dict already yielded.
+    Pages come in arrival order (not "found by most variants first"), and
+    FANOUT_MAX_CANDIDATES caps the first places to arrive.
+    """
+    variants = query_variants(query)
+    if len(variants) == 1:
+        async for page in search_place_pages(query):
+            yield page
+        return
+
+    print(f"🔀 Fan-out search (streaming): {variants}")
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump(variant: str, max_results: int) -> None:
+        try:
+            async for page in search_place_pages(variant, max_results=max_results):
+                await queue.put((variant, page))
+        except Exception as e:
+            print(f"⚠️ Fan-out search '{variant}' failed: {e}")
+        finally:
+            await queue.put((variant, None))
+
+    # The user's own query gets all its pages, the variants one page each
+    tasks = [asyncio.ensure_future(pump(v, SEARCH_MAX_RESULTS if i == 0 else 20))
+             for i, v in enumerate(variants)]
+    seen = {}            # place_id -> candidate already yielded
+    user_error = None    # the user's query result if it was an error
+    running = len(tasks)
+    try:
+        while running:
+            variant, page = await queue.get()
+            if page is None:
+                running -= 1
+                continue
+            new = []
+            for c in page:
+                place_id = c.get("place_id")
+                if not place_id:
+                    if variant == variants[0]:
+                        user_error = page  # error entries
+                    continue
+                if place_id in seen:
+                    seen[place_id]["queries"].append(variant)
+                elif len(seen) < FANOUT_MAX_CANDIDATES:
+                    seen[place_id] = {**c, "queries": [variant]}
+                    new.append(seen[place_id])
+            if new:
+                yield new
+        if not seen and user_error:
+            # nothing found anywhere: pass the user's query result on
+            yield user_error
+        else:
+            print(f"Fan-out streamed {len(seen)} candidates")
+    finally:
+        # the caller stopped early: don't leave searches running
+        for task in tasks:
+            task.cancel()
+
+
+# Region-wide mode: grid of Nearby Searches (see region_grid.py)
+REGION_TILE_KM = float(os.getenv("REGION_TILE_KM", "10"))
+REGION_MAX_TILES = int(os.getenv("REGION_MAX_TILES", "48"))
+REGION_MAX_CANDIDATES = int(os.getenv("REGION_MAX_CANDIDATES", "200"))
+REGION_CONCURRENCY = int(os.getenv("REGION_CONCURRENCY", "6"))
+# Fast pipeline: use the grid when the named area is at least this wide (0 = never)
+REGION_AUTO_KM = float(os.getenv("REGION_AUTO_KM", "0"))
+
+async def region_bounds(region: str) -> Optional[Bounds]:
+    """Bounding box of a named area (from its text search viewport), cached."""
+    key = search_key(region)
+    cached = region_bounds_cache.get(key)
+    if cached is not None:
+        return tuple(cached[0]) if cached else None
+
+    with span("http", "gmaps.places:region"):
+        response = await maps_call_async("places", maps_client.places, query=region,
+                                         deadline=time.monotonic() + SEARCH_QUEUE_TIMEOUT)
+    results = response.get("results") or []
+    viewport = results[0].get("geometry", {}).get("viewport") if results else None
+    bounds = viewport_bounds(viewport) if viewport else None
+    region_bounds_cache.put(key, [list(bounds)] if bounds else [])
+    return bounds
+
+
+async def _search_tile(keyword: str, tile: Tile, limit: asyncio.Semaphore,
+                       deadline: Optional[float] = None) -> list[dict]:
+    """
+    Nearby Search for one grid cell. Cells already searched for the keyword
+    are answered from the place index (which also returns matching places
+    that neighbouring cells found inside this cell's circle). A cell that
+    can't get a rate limit token by `deadline` fails (and is skipped).
+    """
+    keyword_key = search_key(keyword)
+    if place_index.is_covered(keyword_key, tile):
+        return place_index.within_radius(tile.lat, tile.lng, tile.radius_m, keyword=keyword_key)
+
+    async with limit:
+        with span("http", f"gmaps.places_nearby:{tile.key}"):
+            response = await maps_call_async(
+                "places_nearby", maps_client.places_nearby,
+                location=f"{tile.lat},{tile.lng}", radius=tile.radius_m, keyword=keyword,
+                deadline=deadline)
+    cands = [_to_candidate(p) for p in response.get('results', [])]
+    place_index.add(cands, keyword=keyword_key)
+    place_index.cover(keyword_key, tile)
+    return cands
+
+
+async def search_region(keyword: str, bounds: Bounds) -> list[dict]:
+    """
+    Region-wide discovery: Nearby Search for `keyword` in every grid cell
+    of `bounds`, concurrently (at most REGION_CONCURRENCY at once, paced by
+    the places_nearby rate limiter). Results are deduplicated by place_id; each candidate lists
+    the `tiles` that found it. Failed cells are skipped.
+    """
+    tiles = tiles_for_bounds(bounds, REGION_TILE_KM, REGION_MAX_TILES)
+    if not tiles:
+        print(f"⚠️ Region search for '{keyword}': no tiles for bounds {bounds}")
+        return []
+    if len(tiles) > REGION_MAX_TILES:
+        # cells can't grow past one search circle: search the middle of the area
+        print(f"⚠️ Region search for '{keyword}': area needs {len(tiles)} tiles, "
+              f"searching the {REGION_MAX_TILES} nearest its center")
+        tiles = nearest_tiles(tiles, bounds, REGION_MAX_TILES)
+    print(f"🗺️ Region search for '{keyword}': {len(tiles)} tiles of ~{tiles[0].radius_m / 1000:.0f} km radius")
+
+    limit = asyncio.Semaphore(REGION_CONCURRENCY)
+    # one deadline for the whole grid: cells still queued then are skipped
+    deadline = time.monotonic() + SEARCH_QUEUE_TIMEOUT
+    lists = await asyncio.gather(*(_search_tile(keyword, t, limit, deadline) for t in tiles),
+                                 return_exceptions=True)
+    results = {}
+    for tile, res in zip(tiles, lists):
+        if isinstance(res, Exception):
+            print(f"⚠️ Tile {tile.key} failed: {res}")
+            continue
+        results[tile.key] = res
+
+    cands = merge_candidates(results, REGION_MAX_CANDIDATES, source_key="tiles")
+    print(f"Region search merged {sum(len(r) for r in results.values())} results into {len(cands)} candidates")
+    return cands
+
+
+async def search_region_query(query: str, min_km: float = 0) -> Optional[list[dict]]:
+    """
+    Runs `search_region` for "<what> in <area>" queries. Returns None (use
+    a normal search) if the query names no area, the area can't be found
+    or it is narrower than `min_km`.
+    """
+    match = _WHERE.search(query)
+    if not match or not maps_client:
+        return None
+    try:
+        bounds = await region_bounds(match.group(1))
     except Exception as e:
-        return [{"err": f"search failed {e}"}]
+        print(f"⚠️ Region lookup failed: {e}")
+        return None
+    if bounds is None or bounds_size_km(bounds) < min_km:
+        return None
+    return await search_region(query[:match.start()].strip() or query, bounds)
+
+
+async def discovery_pages(query: str) -> AsyncIterator[list[dict]]:
+    """
+    Candidates for the fast pipeline: the region grid result for large
+    areas (REGION_AUTO_KM), otherwise the pages of the query and its
+    fan-out variants as they arrive (see search_fanout_pages).
+    """
+    if REGION_AUTO_KM > 0:
+        cands = await search_region_query(query, REGION_AUTO_KM)
+        if cands:
+            yield cands
+            return
+
+    async for page in search_fanout_pages(query):
+        yield page
+
+
+async def search_places_tool(query: str, tool_context: ToolContext,
+                             region_wide: bool = False) -> dict:
+    """
+    Searches Google Places for outdoor NATURAL places (parks, viewpoints,
+    trails, etc). The full candidate list is saved to session state for
+    the analysis step; only a short summary is returned.
+
+    Args:
+        query: Refined search query, e.g. "ski resort in Sibiu"
+        region_wide: True for a large area (a state, province or country,
+            e.g. "hidden lakes in Bavaria"): the whole area is searched
+            tile by tile instead of with one text search
+    """
+    cands = await search_region_query(query) if region_wide else None
+    if not cands:
+        cands = await search_places_fanout(query)
+    # SEARCH_AREA lets the analysis tell the place from the intent in the
+    # user's request
+    for key, value in discovery_state(cands, place_of(query)).items():
+        tool_context.state[key] = value
+    return summarize_candidates(cands)
 
 
 # 2. Agent Configuration
@@ -68,15 +495,17 @@ discovery_agent = Agent(
     Focus on NATURAL outdoor places: parks, viewpoints, gardens, trails, beaches.
     NOT businesses like restaurants, cafes, or shops.
     **CRUCIAL** refine the query in which will result landmarks and natural places - 
-        e.g -> Find me a great ski resort in Sibiu -> Ski resort sibiu
+        e.g -> Find me a great ski resort in Sibiu -> Ski resort in Sibiu
+        Keep the location as "in <place>" so related nature spots there are searched too.
+    For a whole state, province or country (e.g. "hidden lakes in Bavaria") call the tool
+    with `region_wide=true` so the entire area is covered.
     Use the `search_places_tool` to find raw candidates.
     
-    **CRITICAL OUTPUT RULE:**
-    1. Run the tool `search_places_tool`.
-    2. The tool returns a list of objects.
-    3. You MUST output that list as a valid JSON string.
-    4. **IMPORTANT:** Ensure every object in the JSON has the `place_id` field. Do not omit it.
-    5. Do not add any conversational text. Just the JSON.
+    **OUTPUT RULE:**
+    1. Run the tool `search_places_tool` once.
+    2. The tool saves the candidates for the next agent and returns a short summary.
+    3. Reply with ONE short line, e.g. "Found 18 candidates." Do NOT list the candidates.
     """,
     tools=[search_places_tool],
+    **latency_callbacks(),
 )
@@ -0,0 +1,112 @@
+"""
+Fast Discovery Agent - Discovery + Analysis without LLM turns
+
+`Discovery_Agent` and `Analysis_Agent` are LLM agents whose only job is to
+call one tool each and repeat its JSON. That costs several Gemini round
+trips and thousands of output tokens per search. This agent does the same
+work in plain Python:
+
+HOW IT WORKS:
+1. Takes the user's search text and trims conversational filler
+   ("Find me a great ski resort in Sibiu" -> "ski resort in Sibiu")
+2. Runs the places search directly; queries with a location also search
+   related nature spots there (fan-out). Every search's result pages are
+   fed to the business filter as they arrive, deduplicated by place_id
+3. Runs the analysis directly on the candidates, ranking them against the
+   user text minus the searched area (see intent_rank.py)
+4. Emits both steps as tool-response events authored as Discovery_Agent /
+   Analysis_Agent, the same shape the LLM pipeline produces: the full
+   results go to session state (see state_keys.py) and the events carry
+   only the short summaries, so Recommendation_Agent, the stream endpoint
+   and the backend parsing work unchanged
+"""
+
+import re
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from .analysis_agent import CandidateScorer, analyze_scored
+from .discovery_agent import discovery_pages
+
+try:
+    from ..intent_rank import place_of
+    from ..latency import span
+    from ..state_keys import ANALYSIS, discovery_state, summarize_analysis, summarize_candidates
+except ImportError:
+    from intent_rank import place_of
+    from latency import span
+    from state_keys import ANALYSIS, discovery_state, summarize_analysis, summarize_candidates
+
+
+# Leading request phrases that don't belong in a Places text search
+_FILLER_PREFIX = re.compile(
+    r"^\s*(?:(?:hey|hi|please|can you|could you|would you|i(?:'m| am) looking for|"
+    r"i want(?: to (?:find|see|visit|go to))?|i'd like(?: to (?:find|see|visit))?|"
+    r"find me|find|show me|show|give me|recommend|suggest|search for|looking for)[\s,]+)+",
+    re.IGNORECASE,
+)
+# Words that only describe how much the user will like it
+_FILLER_WORDS = re.compile(
+    r"\b(?:a|an|some|great|good|nice|cool|awesome|amazing|best|beautiful|lovely|really|very)\b\s*",
+    re.IGNORECASE,
+)
+
+
+def refine_query(text: str) -> str:
+    """
+    Deterministic stand-in for Discovery_Agent's query refinement.
+
+    Example:
+        >>> refine_query("Find me a great ski resort in Sibiu")
+        'ski resort in Sibiu'
+    """
+    query = _FILLER_PREFIX.sub("", text.strip())
+    query = _FILLER_WORDS.sub("", query)
+    query = " ".join(query.strip(" ?!.").split())
+    return query or text.strip()
+
+
+class FastDiscoveryAgent(BaseAgent):
+    """Runs the places search and the analysis without asking the LLM."""
+
+    def _tool_event(self, ctx: InvocationContext, author: str, tool_name: str,
+                    summary: dict, state_delta: dict) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=author,
+            branch=ctx.branch,
+            content=types.Content(
+                role="user",
+                parts=[types.Part(function_response=types.FunctionResponse(
+                    name=tool_name, response=summary))],
+            ),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        user_text = ""
+        if ctx.user_content and ctx.user_content.parts:
+            user_text = " ".join(p.text for p in ctx.user_content.parts if p.text)
+
+        query = refine_query(user_text)
+        print(f"⚡ Fast path: searching for '{query}' (from '{user_text}')")
+
+        # Pages are filtered as they arrive (later pages wait for their token)
+        cands = []
+        scorer = CandidateScorer()
+        with span("tool", "search_places"):
+            async for page in discovery_pages(query):
+                cands.extend(page)
+                scorer.add(page)
+        area = place_of(query)
+        yield self._tool_event(ctx, "Discovery_Agent", "search_places_tool",
+                               summarize_candidates(cands), discovery_state(cands, area))
+
+        with span("tool", "analyze_candidates"):
+            analysis = await analyze_scored(scorer, intent=user_text, area=area)
+        yield self._tool_event(ctx, "Analysis_Agent", "analysis_tool",
+                               summarize_analysis(analysis), {ANALYSIS: analysis})
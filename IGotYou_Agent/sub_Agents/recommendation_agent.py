@@ -1,7 +1,17 @@
+import json
+
 from google.adk.agents import Agent
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.models.google_llm import Gemini
 from google.genai import types
 
+try:
+    from ..latency import latency_callbacks
+    from ..state_keys import ANALYSIS
+except ImportError:
+    from latency import latency_callbacks
+    from state_keys import ANALYSIS
+
 retry_config = types.HttpRetryOptions(
     attempts=3,
     exp_base=2,
@@ -9,14 +19,7 @@ retry_config = types.HttpRetryOptions(
     http_status_codes=[429, 500, 503]
 )
 
-recommendation_agent = Agent(
-    name="Recommendation_Agent",
-    model=Gemini(
-        model="gemini-2.5-flash-lite",
-        retry_options=retry_config
-    ),
-    description="Transforms analysis agent's JSON into frontend-ready JSON format with AI-generated insights.",
-    instruction="""
+RECOMMENDATION_INSTRUCTION = """
     You are the **Recommendation Agent**.
     
     INPUT: You will receive a JSON object (or string) containing hidden gems.
@@ -51,4 +54,40 @@ recommendation_agent = Agent(
     - If you cannot parse the input, output: "DEBUG: I received: [first 100 chars of input]"
     - Return ONLY valid JSON.
     """
-)
+
+
+def recommendation_instruction(context: ReadonlyContext) -> str:
+    """
+    The instruction plus the analysis result from session state, so the
+    gems reach the model without an earlier agent repeating them.
+    """
+    analysis = context.state.get(ANALYSIS)
+    if not analysis:
+        return RECOMMENDATION_INSTRUCTION
+    # Token accounting is for us, not the model
+    analysis = {k: v for k, v in analysis.items() if k != "reviewTokens"}
+    return (
+        RECOMMENDATION_INSTRUCTION
+        + "\n    **INPUT DATA (from the analysis step):**\n"
+        + json.dumps(analysis, ensure_ascii=False)
+    )
+
+
+def build_recommendation_agent() -> Agent:
+    """
+    Creates a Recommendation_Agent. An ADK agent can only belong to one
+    pipeline, so each pipeline (agent graph / fast path) gets its own.
+    """
+    return Agent(
+        name="Recommendation_Agent",
+        model=Gemini(
+            model="gemini-2.5-flash-lite",
+            retry_options=retry_config
+        ),
+        description="Transforms analysis agent's JSON into frontend-ready JSON format with AI-generated insights.",
+        instruction=recommendation_instruction,
+        **latency_callbacks(),
+    )
+
+
+recommendation_agent = build_recommendation_agent()
@@ -8,7 +8,8 @@ the Recommendation Agent and adds:
 
 HOW IT WORKS:
 1. Receives JSON with gems (each gem has coordinates)
-2. For each gem, calls the MCP weather tool to get weather data
+2. Fetches weather for all gems at once (one lookup per ~5 km area), under
+   one deadline
 3. Uses Gemini AI to generate smart clothing recommendations
 4. Returns enriched gems with weather + clothing info
 
@@ -16,12 +17,21 @@ PIPELINE POSITION:
     Discovery → Analysis → Recommendation → Weather (YOU ARE HERE)
 """
 
+import os
+import re
+from typing import Optional
+
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
 from google.genai import types
 
 # Import the weather tool from our MCP tools module
-from ..mcp_tools.weather_tool import get_weather_sync
+from ..mcp_tools.weather_tool import get_weather_batch
+
+
+# Seconds enrich_gems_with_weather waits for all gems together; gems still
+# pending then get placeholder weather (their fetches keep warming the cache)
+ENRICH_DEADLINE_SECONDS = float(os.getenv("WEATHER_ENRICH_DEADLINE", "8"))
 
 
 # ============================================================================
@@ -46,7 +56,7 @@ retry_config = types.HttpRetryOptions(
 # WEATHER ENRICHMENT TOOL
 # ============================================================================
 
-def enrich_gems_with_weather(gems_json: str) -> dict:
+async def enrich_gems_with_weather(gems_json: str) -> dict:
     """
     Enriches gem data with weather information from MCP weather server.
     
@@ -76,7 +86,8 @@ def enrich_gems_with_weather(gems_json: str) -> dict:
               }
     
     IMPORTANT: This tool handles errors gracefully - if weather can't be
-    fetched for a gem, it adds placeholder weather data instead of failing.
+    fetched for a gem (or not within WEATHER_ENRICH_DEADLINE seconds), it
+    adds placeholder weather data instead of failing.
     """
     import json
     
@@ -110,10 +121,10 @@ def enrich_gems_with_weather(gems_json: str) -> dict:
         return {"gems": []}
     
     # ========================================================================
-    # FETCH WEATHER FOR EACH GEM
+    # EXTRACT COORDINATES FOR EACH GEM
     # ========================================================================
     
-    enriched_gems = []
+    locations = []   # (gem index, lat, lng, city)
     
     for i, gem in enumerate(gems):
         print(f"   📍 Processing gem {i+1}/{len(gems)}: {gem.get('placeName', 'Unknown')}")
@@ -135,15 +146,8 @@ def enrich_gems_with_weather(gems_json: str) -> dict:
             if (not lat or not lng) and gem.get("map_url"):
                 lat, lng = _extract_coords_from_url(gem.get("map_url"))
             
-            # ================================================================
-            # CALL MCP WEATHER SERVICE
-            # ================================================================
-            
             if lat and lng:
-                # Fetch weather using our MCP tool
-                weather = get_weather_sync(float(lat), float(lng))
-                gem["weather"] = weather
-                print(f"      ✅ Weather: {weather.get('conditions', 'N/A')}")
+                locations.append((i, float(lat), float(lng), _city_from_address(gem.get("address"))))
             else:
                 # No coordinates available - use placeholder
                 print(f"      ⚠️ No coordinates - skipping weather")
@@ -160,19 +164,60 @@ def enrich_gems_with_weather(gems_json: str) -> dict:
                 
         except Exception as e:
             # Handle any errors gracefully - don't let one gem break everything
-            print(f"      ❌ Error fetching weather: {e}")
-            gem["weather"] = {
-                "temperature": None,
-                "conditions": "Weather unavailable",
-                "humidity": None,
-                "hasPrecipitation": False
-            }
-        
-        enriched_gems.append(gem)
+            print(f"      ❌ Error reading coordinates: {e}")
+            gem["weather"] = dict(_WEATHER_UNAVAILABLE)
+    
+    # ========================================================================
+    # CALL MCP WEATHER SERVICE (all gems concurrently, one deadline)
+    # ========================================================================
+    
+    try:
+        weathers = await get_weather_batch(
+            [(lat, lng, city) for _, lat, lng, city in locations],
+            deadline=ENRICH_DEADLINE_SECONDS)
+    except Exception as e:
+        print(f"   ❌ Error fetching weather: {e}")
+        weathers = [None] * len(locations)
+    
+    for (i, _, _, _), weather in zip(locations, weathers):
+        if weather is None:
+            print(f"      ⏱️ No weather for {gems[i].get('placeName', 'Unknown')} in time")
+            weather = dict(_WEATHER_UNAVAILABLE)
+        else:
+            print(f"      ✅ Weather for {gems[i].get('placeName', 'Unknown')}: "
+                  f"{weather.get('conditions', 'N/A')}")
+        gems[i]["weather"] = weather
     
-    print(f"✅ Weather enrichment complete for {len(enriched_gems)} gems\n")
+    print(f"✅ Weather enrichment complete for {len(gems)} gems\n")
     
-    return {"gems": enriched_gems}
+    return {"gems": gems}
+
+
+_WEATHER_UNAVAILABLE = {
+    "temperature": None,
+    "conditions": "Weather unavailable",
+    "humidity": None,
+    "hasPrecipitation": False
+}
+
+
+def _city_from_address(address: Optional[str]) -> Optional[str]:
+    """
+    Best-effort city from a formatted address, for city-bucketed caching.
+    
+    "Strada X 1, Brașov 500001, Romania" -> "Brașov"
+    "1 Main St, Bend, OR 97701, USA"     -> "Bend"
+    """
+    if not address:
+        return None
+    parts = [p.strip() for p in address.split(",") if p.strip()]
+    # the part before the country, without its postal code
+    for part in reversed(parts[:-1]):
+        city = re.sub(r"\b[A-Z]{0,2}[\d-]{3,}\b", "", part).strip()
+        # skip state codes ("OR")
+        if city and not re.fullmatch(r"[A-Z]{2}", city):
+            return city
+    return None
 
 
 def _extract_coords_from_url(map_url: str) -> tuple:
@@ -189,8 +234,6 @@ def _extract_coords_from_url(map_url: str) -> tuple:
     Returns:
         tuple: (latitude, longitude) or (None, None) if extraction fails
     """
-    import re
-    
     if not map_url:
         return None, None
     
@@ -9,6 +9,9 @@ Hidden Gem Criteria:
 - Rating: at least 3.5 stars
 """
 
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
 from google.genai import types
@@ -20,6 +23,59 @@ except ImportError:
     gmaps_client = None
 
 
+# Place Details fan-out: at most DETAILS_CONCURRENCY calls in flight, each
+# given DETAILS_TIMEOUT seconds before the next-ranked candidate replaces it
+DETAILS_CONCURRENCY = 3
+DETAILS_TIMEOUT = 5.0
+
+
+def fetch_ranked_details(ranked: list[dict], fetch, want: int = 3) -> list[dict]:
+    """
+    Runs `fetch(gem)` for the `want` best candidates concurrently.
+
+    A call that fails or takes longer than DETAILS_TIMEOUT is dropped and
+    the next-ranked candidate is started in its place. Returns the fetched
+    gems in ranking order.
+    """
+    gems = {}      # rank -> fetched gem
+    pending = {}   # future -> (rank, start time)
+    next_rank = 0
+    # Extra workers so abandoned slow calls don't block their replacements
+    pool = ThreadPoolExecutor(max_workers=DETAILS_CONCURRENCY * 2)
+
+    def launch():
+        nonlocal next_rank
+        while (len(pending) < DETAILS_CONCURRENCY
+               and len(gems) + len(pending) < want
+               and next_rank < len(ranked)):
+            future = pool.submit(fetch, ranked[next_rank])
+            pending[future] = (next_rank, time.monotonic())
+            next_rank += 1
+
+    try:
+        launch()
+        while pending:
+            first_deadline = min(start for _, start in pending.values()) + DETAILS_TIMEOUT
+            done, _ = wait(pending, timeout=max(0, first_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                rank, _ = pending.pop(future)
+                try:
+                    gems[rank] = future.result()
+                except Exception as e:
+                    print(f"Error fetching details for {ranked[rank].get('name')}: {e}")
+            for future, (rank, start) in list(pending.items()):
+                if time.monotonic() - start >= DETAILS_TIMEOUT:
+                    pending.pop(future)
+                    print(f"Dropping {ranked[rank].get('name')}: details took over {DETAILS_TIMEOUT}s")
+            launch()
+    finally:
+        # Don't wait for abandoned calls
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return [gems[rank] for rank in sorted(gems)]
+
+
 def analysis_tool(cands: list[dict]) -> dict:
     """
     Filter candidates and fetch details for top hidden gems.
@@ -62,34 +118,32 @@ def analysis_tool(cands: list[dict]) -> dict:
     
     print(f"Found {len(potential_gems)} potential hidden gems")
     
-    # Sort by rating and take top 3
+    # Sort by rating (best first)
     potential_gems.sort(key=lambda x: x.get("rating", 0), reverse=True)
-    top_gems = potential_gems[:3]
-    
-    # Fetch detailed info for each gem
-    result = []
-    for gem in top_gems:
-        try:
-            details = gmaps_client.place(
-                place_id=gem["place_id"],
-                fields=["name", "reviews", "url", "formatted_address"],
-                reviews_sort="most_relevant"
-            )
-            
-            place_details = details.get("result", {})
-            raw_reviews = place_details.get("reviews", [])
-            reviews_text = [f'"{r.get("text", "")}"' for r in raw_reviews]
-            
-            result.append({
-                "name": place_details.get("name", gem.get("name", "Unknown")),
-                "rating": gem.get("rating", 0),
-                "review_count": gem.get("reviews", 0),
-                "reviews_content": "\n".join(reviews_text),
-                "map_url": place_details.get("url", ""),
-                "address": place_details.get("formatted_address", "")
-            })
-        except Exception as e:
-            print(f"Error fetching details for {gem.get('name')}: {e}")
+
+    # Fetch detailed info for the best gems concurrently; a slow or failing
+    # place is replaced by the next-ranked one
+    def fetch_details(gem: dict) -> dict:
+        details = gmaps_client.place(
+            place_id=gem["place_id"],
+            fields=["name", "reviews", "url", "formatted_address"],
+            reviews_sort="most_relevant"
+        )
+        
+        place_details = details.get("result", {})
+        raw_reviews = place_details.get("reviews", [])
+        reviews_text = [f'"{r.get("text", "")}"' for r in raw_reviews]
+        
+        return {
+            "name": place_details.get("name", gem.get("name", "Unknown")),
+            "rating": gem.get("rating", 0),
+            "review_count": gem.get("reviews", 0),
+            "reviews_content": "\n".join(reviews_text),
+            "map_url": place_details.get("url", ""),
+            "address": place_details.get("formatted_address", "")
+        }
+
+    result = fetch_ranked_details(potential_gems, fetch_details, want=3)
     
     print(f"Successfully analyzed {len(result)} hidden gems")
     return {"status": "success", "gems": result}
@@ -0,0 +1,145 @@
+"""
+Admission Control for Agent Pipelines
+
+Every agent run fans out into several Gemini and Google Maps calls. Without
+a limit, a traffic spike starts all of them at once and every request
+times out together. This module bounds how many runs execute at once and
+how many may wait for a slot; everything beyond that is shed quickly.
+
+HOW IT WORKS:
+1. At most `max_concurrent` runs hold a slot at the same time
+2. Up to `max_queue` more wait (FIFO) for at most `queue_timeout` seconds
+3. A request that finds the queue full is rejected at once (HTTP 429);
+   one that waited too long is rejected with HTTP 503
+4. Rejections carry a Retry-After estimate based on how long runs take
+   and how many are queued
+5. Queue depth, active runs and wait times are exported for autoscaling
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from IGotYou_Agent.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED,
+    ADMISSION_WAIT_SECONDS,
+)
+
+
+class Overloaded(Exception):
+    """Raised when a run is not admitted."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded wait queue.
+
+    Args:
+        max_concurrent: Runs allowed at the same time
+        max_queue: Runs allowed to wait for a slot
+        queue_timeout: Seconds a run may wait before it is rejected
+        expected_run_seconds: Initial guess of a run's duration (refined
+            as runs finish) used for Retry-After
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+        expected_run_seconds: float = 15.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self._avg_run_seconds = expected_run_seconds
+
+        ADMISSION_ACTIVE.set_function(lambda: self.active)
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: self.waiting)
+
+    def is_full(self) -> bool:
+        """True if a new run would be rejected right now."""
+        return self.active + self.waiting >= self.max_concurrent + self.max_queue
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to be free for a new request."""
+        rounds = self.waiting / self.max_concurrent + 1
+        return max(1, math.ceil(rounds * self._avg_run_seconds))
+
+    def check(self) -> None:
+        """
+        Raises Overloaded (429) if a new run would be rejected right now,
+        without taking a slot (e.g. before a streaming response starts).
+        """
+        if self.is_full():
+            raise self._reject(429, "queue_full")
+
+    def _reject(self, status_code: int, reason: str) -> Overloaded:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.labels(reason=reason).inc()
+        retry_after = self.retry_after()
+        print(f"[Admission] Rejected ({reason}): {self.active} active, "
+              f"{self.waiting} waiting, retry after {retry_after}s")
+        return Overloaded(status_code, reason, retry_after)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Holds a run slot for the duration of the block.
+
+        Raises:
+            Overloaded: 429 if the wait queue is full, 503 if no slot freed
+                up within queue_timeout
+        """
+        self.check()
+
+        self.waiting += 1
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject(503, "queue_timeout") from None
+        finally:
+            self.waiting -= 1
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - wait_start)
+
+        self.active += 1
+        self.admitted += 1
+        run_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            # Moving average of run time, for Retry-After
+            elapsed = time.perf_counter() - run_start
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "queueTimeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avgRunSeconds": round(self._avg_run_seconds, 2),
+            "retryAfter": self.retry_after(),
+        }
@@ -0,0 +1,115 @@
+"""
+Discovery Stream Helpers
+
+Turns the ADK events of the Discovery -> Analysis -> Recommendation
+pipeline into Server-Sent Events for `/api/discover/stream`.
+
+STAGE EVENTS (in the order they are usually sent):
+- started         request accepted, pipeline starting
+- stage           a pipeline agent started working (discovery/analysis/recommendation)
+- candidates      search_places_tool returned raw candidates
+- analysis        analysis_tool finished filtering and fetching details
+- gem             one finalized hidden gem (sent once per gem)
+- done            pipeline finished (with processingTime)
+- error           something went wrong; the stream ends after this
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+from event_walker import RECOMMENDATION_AUTHOR, event_text, function_responses, unwrap_result
+
+
+# Pipeline agent name -> public stage name
+STAGE_BY_AUTHOR = {
+    "Discovery_Agent": "discovery",
+    "Analysis_Agent": "analysis",
+    "Recommendation_Agent": "recommendation",
+}
+
+# Tool name -> stage event emitted when that tool returns
+TOOL_EVENTS = {
+    "search_places_tool": "candidates",
+    "analysis_tool": "analysis",
+}
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _tool_result(response) -> object:
+    """Unwraps an ADK function_response payload (analysis_tool returns a JSON string)."""
+    result = unwrap_result(response)
+    if isinstance(result, str):
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+    return result
+
+
+def _summarize_tool_result(tool_name: str, result) -> dict:
+    """Builds a small, frontend-friendly payload for a tool result."""
+    if isinstance(result, dict) and "count" in result and "names" in result:
+        # The tools already return summaries (full data lives in session state)
+        summary = {"count": result["count"], "names": result["names"][:10]}
+        if tool_name != "search_places_tool":
+            summary["status"] = result.get("status", "unknown")
+        return summary
+
+    if tool_name == "search_places_tool":
+        cands = result if isinstance(result, list) else []
+        cands = [c for c in cands if isinstance(c, dict) and c.get("place_id")]
+        return {
+            "count": len(cands),
+            "names": [c.get("name") for c in cands[:10]],
+        }
+
+    if isinstance(result, dict):
+        gems = result.get("gems", [])
+        return {
+            "status": result.get("status", "unknown"),
+            "count": len(gems) if isinstance(gems, list) else 0,
+            "names": [g.get("name") for g in gems if isinstance(g, dict)],
+        }
+    return {"status": "unknown", "count": 0, "names": []}
+
+
+def stage_events(event, seen_stages: set) -> List[Tuple[str, dict]]:
+    """
+    Maps one ADK event to zero or more (event_name, payload) stage events.
+
+    Args:
+        event: An ADK Event from the pipeline runner
+        seen_stages: Stages already announced for this request (updated in place)
+
+    Returns:
+        List of (event_name, payload) tuples to send to the client
+    """
+    out = []
+
+    stage = STAGE_BY_AUTHOR.get(event.author)
+    if stage and stage not in seen_stages:
+        seen_stages.add(stage)
+        out.append(("stage", {"stage": stage, "agent": event.author}))
+
+    for function_response in function_responses(event):
+        if function_response.name in TOOL_EVENTS:
+            result = _tool_result(function_response.response)
+            out.append((
+                TOOL_EVENTS[function_response.name],
+                _summarize_tool_result(function_response.name, result),
+            ))
+
+    return out
+
+
+def final_recommendation_text(event) -> Optional[str]:
+    """
+    Returns the Recommendation_Agent's final text if this event carries it.
+    """
+    if event.author != RECOMMENDATION_AUTHOR or event.partial:
+        return None
+    return event_text(event) or None
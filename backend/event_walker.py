@@ -0,0 +1,128 @@
+"""
+Event Walker for ADK Responses
+
+Reads the agent's answer directly from the ADK `Event` objects returned by
+a turn, instead of walking them with `hasattr` checks and falling back to
+`str(response)` (which serializes every event, including all review text
+and photo URLs).
+
+WHERE THE ANSWER LIVES:
+1. Pipeline runs: the final text event authored by `Recommendation_Agent`
+2. Root-agent runs: the `function_response` of the hidden gem AgentTool
+   ({"result": "<Recommendation_Agent text>"}), or the root agent's own
+   final model text (selection advice, chat replies)
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from google.adk.events import Event
+    from google.genai import types
+
+
+RECOMMENDATION_AUTHOR = "Recommendation_Agent"
+
+# Tools whose function_response carries a sub-agent's final answer
+AGENT_TOOL_NAMES = ("IGOTYOU_Agent", "IGOTYOU_Fast_Agent", "Hidden_Gem_Finder")
+
+
+@dataclass
+class AgentOutput:
+    """The answer found in a turn's events."""
+    text: str
+    source: str                      # "author_text" | "function_response" | "model_text"
+    author: Optional[str] = None
+    payload: Any = None              # structured function_response payload, if any
+
+
+def iter_parts(event: "Event") -> Iterator["types.Part"]:
+    """Yields the content parts of an event (none if it has no content)."""
+    content = event.content
+    if content is not None and content.parts:
+        yield from content.parts
+
+
+def event_text(event: "Event") -> str:
+    """Joins the visible text parts of an event (thought parts are skipped)."""
+    return "".join(
+        part.text for part in iter_parts(event)
+        if part.text and not getattr(part, "thought", False)
+    )
+
+
+def function_responses(event: "Event") -> List["types.FunctionResponse"]:
+    """Returns the function responses carried by an event."""
+    return [part.function_response for part in iter_parts(event) if part.function_response]
+
+
+def unwrap_result(response: Any) -> Any:
+    """
+    ADK wraps non-dict tool returns (and AgentTool answers) as
+    {"result": value}; dict returns are passed through as-is.
+    """
+    if isinstance(response, dict) and set(response) == {"result"}:
+        return response["result"]
+    return response
+
+
+def _is_model_text(event: "Event") -> bool:
+    return (
+        not event.partial
+        and event.content is not None
+        and event.content.role == "model"
+    )
+
+
+def find_author_output(events: Sequence["Event"], author: str) -> Optional[AgentOutput]:
+    """Returns the last complete text produced by the named agent."""
+    for event in reversed(events):
+        if event.author == author and _is_model_text(event):
+            text = event_text(event)
+            if text:
+                return AgentOutput(text=text, source="author_text", author=author)
+    return None
+
+
+def extract_agent_output(
+    events: Sequence["Event"],
+    preferred_author: Optional[str] = RECOMMENDATION_AUTHOR,
+    agent_tools: Iterable[str] = AGENT_TOOL_NAMES,
+) -> Optional[AgentOutput]:
+    """
+    Finds the answer of a turn.
+
+    Args:
+        events: Events returned by the turn, in order
+        preferred_author: Agent whose final text wins if present
+            (None to skip straight to the latest text / tool answer)
+        agent_tools: Tool names whose function_response is a sub-agent answer
+
+    Returns:
+        AgentOutput, or None if the events carry no text at all
+    """
+    if preferred_author:
+        output = find_author_output(events, preferred_author)
+        if output:
+            return output
+
+    agent_tools = set(agent_tools)
+    for event in reversed(events):
+        if _is_model_text(event):
+            text = event_text(event)
+            if text:
+                return AgentOutput(text=text, source="model_text", author=event.author)
+
+        for function_response in function_responses(event):
+            if function_response.name not in agent_tools:
+                continue
+            result = unwrap_result(function_response.response)
+            if result:
+                text = result if isinstance(result, str) else ""
+                return AgentOutput(
+                    text=text,
+                    source="function_response",
+                    author=event.author,
+                    payload=result,
+                )
+    return None
@@ -0,0 +1,246 @@
+"""
+JSON Extraction for Agent Responses
+
+Finds the JSON object an agent produced (e.g. {"gems": [...]} or
+{"summary": ...}) inside whatever text we got back: clean JSON, JSON in a
+```json code fence, JSON surrounded by prose, Python-style dicts with
+single quotes, a truncated tail, or a `str(events)` dump where the JSON
+sits inside an escaped `text='...'` literal.
+
+HOW IT WORKS:
+The text is scanned ONCE, left to right, jumping between structural
+characters (braces, brackets, quotes, backslashes) while tracking string
+state and a stack of open braces/brackets. Every top-level object is
+parsed once when its closing brace is reached, so the total parsing work
+is bounded by the length of the text (the old approach re-ran json.loads on every prefix,
+which is O(n^2)). If the text ends while an object is still open, the
+object is cut back to its last complete inner object and closed, so a
+truncated gems list still yields the gems that were fully written.
+"""
+
+import ast
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+
+_OPENERS = {"{": "}", "[": "]"}
+
+
+def _loads(fragment: str) -> Any:
+    """
+    Parses a JSON-ish fragment: strict JSON first, then Python literal
+    syntax (single quotes, True/False/None), then the fragment as it
+    appears inside an escaped single-quoted repr string (\\n, \\').
+    """
+    try:
+        return json.loads(fragment)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(fragment)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    if "\\" in fragment:
+        try:
+            decoded = ast.literal_eval("'" + fragment + "'")
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+        if decoded != fragment:
+            return _loads(decoded)
+    return None
+
+
+def _find_keyed(value: Any, key: Optional[str]) -> Optional[dict]:
+    """
+    Returns `value` if it is a dict containing `key` (any dict if key is
+    None). Also looks one level into wrapper dicts such as ADK's
+    {"result": "<json string>"} function responses.
+    """
+    if not isinstance(value, dict):
+        return None
+    if key is None or key in value:
+        return value
+    for inner in value.values():
+        if isinstance(inner, dict) and key in inner:
+            return inner
+        if isinstance(inner, str) and key in inner:
+            found = extract_json(inner, key)
+            if found is not None:
+                return found
+    return None
+
+
+# Only these characters can change the scanner state; everything else is skipped
+_STRUCTURAL = re.compile(r"""[{}\[\]"'\\]""")
+
+
+def _scan(text: str) -> Tuple[List[Tuple[int, int]], Optional[str]]:
+    """
+    Single pass over `text`, visiting only structural characters.
+
+    Returns:
+        (objects, repaired_tail):
+        - objects: (start, end) spans of every complete top-level {...}
+        - repaired_tail: if the text ends inside an object, that object cut
+          back to its last complete inner object and closed; otherwise None
+    """
+    objects = []
+    stack: List[str] = []      # expected closing chars
+    start = -1                 # start of the current top-level object
+    quote = None               # active string delimiter, if inside a string
+    skip_to = -1               # index after an escaped character
+    # (position just after an inner close, closers still needed at that point)
+    last_safe: Optional[Tuple[int, str]] = None
+
+    for match in _STRUCTURAL.finditer(text):
+        i = match.start()
+        if i < skip_to:
+            continue
+        ch = text[i]
+
+        if quote:
+            if ch == "\\":
+                skip_to = i + 2
+            elif ch == quote:
+                quote = None
+            continue
+
+        if not stack:
+            # Outside any object only an opening brace matters
+            if ch == "{":
+                stack.append("}")
+                start = i
+                last_safe = None
+            continue
+
+        if ch == '"' or ch == "'":
+            quote = ch
+        elif ch in _OPENERS:
+            stack.append(_OPENERS[ch])
+        elif ch == "}" or ch == "]":
+            if ch != stack[-1]:
+                # Unbalanced - this was not a real object; start over
+                stack.clear()
+                continue
+            stack.pop()
+            if not stack:
+                objects.append((start, i + 1))
+            elif ch == "}":
+                last_safe = (i + 1, "".join(reversed(stack)))
+
+    repaired_tail = None
+    if stack and last_safe is not None:
+        cut, closers = last_safe
+        repaired_tail = text[start:cut] + closers
+
+    return objects, repaired_tail
+
+
+def strip_code_fence(text: str) -> str:
+    """Removes a surrounding ```json ... ``` (or ``` ... ```) fence."""
+    clean = text.strip()
+    if clean.startswith("```"):
+        newline = clean.find("\n")
+        clean = clean[newline + 1:] if newline != -1 else clean[3:]
+        if clean.rstrip().endswith("```"):
+            clean = clean.rstrip()[:-3]
+    return clean.strip()
+
+
+def extract_json(text: str, key: Optional[str] = "gems") -> Optional[dict]:
+    """
+    Finds the last JSON object in `text` that contains `key`.
+
+    Args:
+        text: Model output, tool output or a str(events) dump
+        key: Required top-level key (e.g. "gems", "summary"). None accepts
+             any object.
+
+    Returns:
+        dict: The parsed object, or None if nothing matched
+
+    Example:
+        >>> extract_json('Sure!\\n```json\\n{"gems": []}\\n```')
+        {'gems': []}
+        >>> extract_json('{"gems": [{"a": 1}, {"b": 2}, {"c"', "gems")
+        {'gems': [{'a': 1}, {'b': 2}]}
+    """
+    if not text:
+        return None
+
+    # Fast path: the whole text (minus a code fence) is the object
+    clean = strip_code_fence(text)
+    if clean.startswith("{") and clean.endswith("}"):
+        found = _find_keyed(_loads(clean), key)
+        if found is not None:
+            return found
+
+    # str(events) dumps: the final answer is usually the last text part
+    if "text=" in text:
+        literal = last_text_literal(text)
+        if literal and len(literal) < len(text):
+            found = extract_json(literal, key)
+            if found is not None:
+                return found
+
+    objects, repaired_tail = _scan(text)
+
+    # Cheap pre-filter: only parse spans that mention the key
+    for start, end in reversed(objects):
+        if key is not None and key not in text[start:end]:
+            continue
+        found = _find_keyed(_loads(text[start:end]), key)
+        if found is not None:
+            return found
+
+    if repaired_tail and (key is None or key in repaired_tail):
+        return _find_keyed(_loads(repaired_tail), key)
+
+    return None
+
+
+def last_text_literal(dump: str) -> Optional[str]:
+    """
+    Decodes the last `text='...'` / `text="..."` literal in a str(events)
+    dump. Linear replacement for the backtracking regex used before.
+    """
+    search_end = len(dump)
+    while True:
+        idx = dump.rfind("text=", 0, search_end)
+        if idx == -1:
+            return None
+        search_end = idx
+
+        open_idx = idx + len("text=")
+        if open_idx >= len(dump) or dump[open_idx] not in "'\"":
+            continue
+
+        quote = dump[open_idx]
+        end = _literal_end(dump, open_idx + 1, quote)
+        if end == -1:
+            continue
+        try:
+            value = ast.literal_eval(dump[open_idx:end + 1])
+        except (ValueError, SyntaxError):
+            continue
+        if value:
+            return value
+
+
+_QUOTE_OR_ESCAPE = re.compile(r"""["'\\]""")
+
+
+def _literal_end(text: str, pos: int, quote: str) -> int:
+    """Index of the unescaped `quote` closing a string literal, or -1."""
+    skip_to = -1
+    for match in _QUOTE_OR_ESCAPE.finditer(text, pos):
+        i = match.start()
+        if i < skip_to:
+            continue
+        ch = text[i]
+        if ch == "\\":
+            skip_to = i + 2
+        elif ch == quote:
+            return i
+    return -1
@@ -7,11 +7,13 @@ It handles CORS, request validation, and response formatting.
 
 
 import re
+import json
 import asyncio
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.responses import StreamingResponse
 import sys
 import os
 from pathlib import Path
@@ -24,7 +26,20 @@ sys.path.insert(0, str(project_root / "IGotYou_Agent"))
 
 
 # Import the agent (must be after path setup)
-from IGotYou_Agent import root_agent, runner
+from IGotYou_Agent import root_agent, runner, pipeline_runner
+from IGotYou_Agent import metrics, rate_limit
+from IGotYou_Agent.latency import recording, span
+from IGotYou_Agent.mcp_tools import session_pool, weather_cache
+from IGotYou_Agent.place_cache import place_details_cache
+from IGotYou_Agent.place_index import place_index
+from IGotYou_Agent.search_cache import places_search_cache, region_bounds_cache
+from IGotYou_Agent.single_flight import AsyncSingleFlight
+from session_manager import SessionManager
+from admission import AdmissionController, Overloaded
+from discovery_stream import format_sse, stage_events, final_recommendation_text
+from json_extract import extract_json, strip_code_fence
+from event_walker import extract_agent_output
+from response_cache import ResponseCache, normalize_query
 
 app = FastAPI(
     title="I Got You API",
@@ -41,16 +56,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
+# Per-client ADK sessions (one conversation history and turn lock per client)
+session_manager = SessionManager(
+    runner,
+    warm_sessions=int(os.getenv("SESSION_WARM_POOL", "4")),
+    idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT", "1800")),
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+)
+
+
+# Finished discovery results, keyed on the normalized search query
+discover_cache = ResponseCache(
+    ttl_seconds=float(os.getenv("DISCOVER_CACHE_TTL", str(6 * 3600))),
+    max_entries=int(os.getenv("DISCOVER_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(float(os.getenv("DISCOVER_CACHE_MAX_MB", "32")) * 1024 * 1024),
+)
+
+# Concurrent identical searches (same normalized query) share one agent run
+discover_flight = AsyncSingleFlight("Backend")
+
+# Bounded number of concurrent agent runs, with a bounded wait queue
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "8")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30")),
+)
+
+# Gauges read at scrape time
+metrics.SESSIONS.set_function(lambda: len(session_manager))
+metrics.PIPELINES_IN_FLIGHT.set_function(lambda: session_manager.active_runs)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency per endpoint (route template, e.g. /api/discover)."""
+    import time
+    start_time = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            endpoint=getattr(route, "path", "unmatched"),
+            status=status,
+        ).observe(time.perf_counter() - start_time)
+
+
+@app.on_event("startup")
+async def start_sessions():
+    await session_manager.start()
+    # Warm MCP weather sessions (started in the background, not awaited)
+    await session_pool.start_all()
+
+
+@app.on_event("shutdown")
+async def stop_sessions():
+    await session_manager.stop()
+    await session_pool.stop_all()
+
 
 # Pydantic Models
 class DiscoveryRequest(BaseModel):
     searchQuery: str = Field(..., min_length=10, max_length=200)
+    sessionId: Optional[str] = None
+    noCache: bool = False
+    includeTimings: bool = False
 
 
 class SelectionRequest(BaseModel):
     selection: str = Field(..., min_length=1)
+    sessionId: Optional[str] = None
 
 
 class Coordinates(BaseModel):
@@ -78,47 +160,33 @@ class DiscoveryResponse(BaseModel):
     gems: List[HiddenGem]
     processingTime: float
     query: str
+    sessionId: Optional[str] = None
+    cached: bool = False
+    degraded: bool = False
+    timings: Optional[dict] = None
 
 
 def parse_agent_response(raw_response: str, query: str) -> dict:
     """
-    Parse the agent's JSON response. The recommendation agent now returns clean JSON.
+    Parse the agent's JSON response. The recommendation agent now returns clean JSON,
+    but code fences, surrounding prose and truncated tails are tolerated too.
     """
-    import json
-
+    response_text = str(raw_response).strip()
     try:
-        response_text = str(raw_response).strip()
         print(
             f"[Backend] Attempting to parse JSON response (length: {len(response_text)})")
 
-        # Remove markdown code blocks if present
-        json_match = re.search(
-            r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-            print(f"[Backend] Found JSON in code block")
-        else:
-            # Look for JSON object with "gems" array
-            json_match = re.search(
-                r'\{\s*"gems"\s*:\s*\[.*?\]\s*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                print(f"[Backend] Found JSON with gems array")
-            else:
-                # Try to extract first valid JSON object
-                json_str = response_text
-                # Remove any leading/trailing text
-                start_idx = json_str.find('{')
-                if start_idx != -1:
-                    json_str = json_str[start_idx:]
-
-        # Parse the JSON
-        parsed_data = json.loads(json_str)
+        parsed_data = extract_json(response_text, "gems")
+        if parsed_data is None:
+            print(f"[Backend] No JSON object with gems found")
+            print(f"[Backend] Response preview: {response_text[:500]}...")
+            return {"gems": []}
+
         print(
             f"[Backend] Successfully parsed JSON. Keys: {list(parsed_data.keys())}")
 
         # Validate and return
-        if "gems" in parsed_data and isinstance(parsed_data["gems"], list):
+        if isinstance(parsed_data["gems"], list):
             gems_count = len(parsed_data["gems"])
             print(f"[Backend] Found {gems_count} gems in response")
             return parsed_data
@@ -126,10 +194,6 @@ def parse_agent_response(raw_response: str, query: str) -> dict:
             print(f"[Backend] No gems array found, returning empty")
             return {"gems": []}
 
-    except json.JSONDecodeError as e:
-        print(f"[Backend] JSON decode error: {e}")
-        print(f"[Backend] Response preview: {response_text[:500]}...")
-        return {"gems": []}
     except Exception as e:
         print(f"[Backend] Error parsing agent response: {e}")
         print(f"[Backend] Response preview: {response_text[:500]}...")
@@ -342,16 +406,128 @@ async def root():
     }
 
 
+def fix_gem_coordinates(gems: list) -> list:
+    """Ensures every gem has a {"lat", "lng"} coordinates dict."""
+    for gem in gems:
+        if "coordinates" not in gem or not gem["coordinates"]:
+            gem["coordinates"] = {"lat": 0, "lng": 0}
+        elif "lat" not in gem["coordinates"] or "lng" not in gem["coordinates"]:
+            gem["coordinates"] = {"lat": 0, "lng": 0}
+    return gems
+
+
+async def run_discovery(client_id: str, query: str) -> list:
+    """
+    Runs the agent for a search in the client's session and returns the
+    parsed, frontend-ready gems.
+    """
+    print(f"[Backend] Running agent with query: {query}")
+
+    # Run the agent in this client's own session (once admitted)
+    async with admission.admit():
+        response = await session_manager.run(client_id, query)
+
+    print(f"[Backend] Agent response received ({len(response)} events)")
+
+    with span("backend", "parse_response"):
+        # Read the answer straight from the events (no str(response) dump)
+        output = extract_agent_output(response)
+        if output is None:
+            print("[Backend] No text or tool answer found in the agent events")
+            return []
+
+        print(f"[Backend] Answer from {output.author} ({output.source}): {output.text[:200]}...")
+
+        # Parse JSON response from recommendation agent
+        if isinstance(output.payload, dict) and "gems" in output.payload:
+            parsed_data = output.payload
+        else:
+            parsed_data = parse_agent_response(output.text, query)
+
+        # The recommendation agent now returns data in the correct format
+        return fix_gem_coordinates(parsed_data.get("gems", []))
+
+
+def overloaded_error(error: Overloaded) -> HTTPException:
+    """429/503 response with Retry-After for a request that was not admitted."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+async def run_admitted(client_id: str, message: str) -> list:
+    """
+    Runs one agent turn once admission control lets it through; requests
+    that are shed get a 429/503 with Retry-After.
+    """
+    try:
+        async with admission.admit():
+            return await session_manager.run(client_id, message)
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+
+def resolve_client_id(request_session_id: Optional[str], header_session_id: Optional[str]) -> str:
+    """
+    Picks the client's session id: the X-Session-Id header wins, then the
+    sessionId body field. New clients get a fresh id, which is echoed back
+    so they can reuse it on /api/select and /api/chat.
+    """
+    import uuid
+    return header_session_id or request_session_id or uuid.uuid4().hex
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/load")
+async def load_stats():
+    """Admission control, Google API rate limiter and MCP session pool state."""
+    return {**admission.stats(), "rateLimits": rate_limit.stats(), "mcpSessions": session_pool.stats()}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Discovery response, request coalescing, place details, text search, region and weather cache statistics."""
+    return {
+        **discover_cache.stats(),
+        "coalescing": discover_flight.stats(),
+        "placeDetails": place_details_cache.stats(),
+        "placesSearch": places_search_cache.stats(),
+        "regionBounds": region_bounds_cache.stats(),
+        "placeIndex": place_index.stats(),
+        "weather": weather_cache.stats(),
+    }
+
+
 @app.post("/api/discover")
-async def discover_gems(request: DiscoveryRequest):
+async def discover_gems(
+    request: DiscoveryRequest,
+    http_response: Response,
+    x_session_id: Optional[str] = Header(default=None),
+    cache_control: Optional[str] = Header(default=None),
+):
     """
     Discover hidden outdoor gems based on search query.
 
+    Repeat searches are answered from the response cache; send
+    `noCache: true` or `Cache-Control: no-cache` to force a fresh run.
+    Identical searches that arrive while one is running wait for that run
+    instead of starting their own.
+
     Args:
         request: Discovery request with search query
+        x_session_id: Client session id (X-Session-Id header)
+        cache_control: Cache-Control header ("no-cache" bypasses the cache)
 
     Returns:
-        DiscoveryResponse with found hidden gems
+        DiscoveryResponse with found hidden gems (plus a per-stage `timings`
+        breakdown if `includeTimings` is set)
     """
     print(f"\n{'='*60}")
     print(f"[Backend] Received search query: {request.searchQuery}")
@@ -361,183 +537,62 @@ async def discover_gems(request: DiscoveryRequest):
         import time
         start_time = time.time()
 
-        print(f"[Backend] Running agent with query: {request.searchQuery}")
-
-        # Run the agent
-        response = await runner.run_debug(request.searchQuery)
-
-        print(
-            f"[Backend] Agent response received (type: {type(response)})")
-        
-        # Debug: Print the full response structure to understand why extraction fails
-        if isinstance(response, list):
-            for i, event in enumerate(reversed(response)):
-                if hasattr(event, 'role') and event.role == 'model':
-                    print(f"[Backend] Event {i} content: {event.content}")
-                    if hasattr(event, 'content') and hasattr(event.content, 'parts'):
-                        for part in event.content.parts:
-                            if hasattr(part, 'text'):
-                                print(f"[Backend] Part text: {part.text[:200]}...")
-                    break
-        response_text = ""
-        try:
-            # Check if response is a string (simple case)
-            if isinstance(response, str):
-                response_text = response
-            # Check if response is a list of events (from debug or complex run)
-            elif isinstance(response, list):
-                for event in reversed(response):
-                    # Check for text in model response
-                    if hasattr(event, 'role') and event.role == 'model':
-                        if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                            parts = event.content.parts
-                            text_parts = []
-                            for part in parts:
-                                if hasattr(part, 'text') and part.text:
-                                    text_parts.append(part.text)
-                            if text_parts:
-                                response_text = "".join(text_parts)
-                                break
-                    
-                    # Check for function_response (if root agent delegated to sub-agent)
-                    if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                        for part in event.content.parts:
-                            if hasattr(part, 'function_response') and part.function_response:
-                                try:
-                                    # Extract result from function response
-                                    res = part.function_response.response
-                                    if 'result' in res:
-                                        response_text = str(res['result'])
-                                        print(f"[Backend] Extracted text from function_response: {response_text[:100]}...")
-                                        break
-                                except Exception as e:
-                                    print(f"[Backend] Error extracting function response: {e}")
-                        if response_text:
-                            break
-
-            # Check if response is a single Event object
-            elif hasattr(response, 'content') and hasattr(response.content, 'parts') and response.content.parts:
-                 parts = response.content.parts
-                 text_parts = []
-                 for part in parts:
-                    if hasattr(part, 'text') and part.text:
-                        text_parts.append(part.text)
-                    # Also check function_response in single event
-                    if hasattr(part, 'function_response') and part.function_response:
-                         try:
-                            res = part.function_response.response
-                            if 'result' in res:
-                                text_parts.append(str(res['result']))
-                         except:
-                             pass
-                 if text_parts:
-                    response_text = "".join(text_parts)
-
-            # Fallback: String conversion and robust regex
-            if not response_text:
-                print("[Backend] No structured text found in discovery response, trying regex...")
-                response_str = str(response)
-                print(f"[Backend] RAW RESPONSE DUMP: {response_str[:3000]}")
-                
-                # Strategy 1: Look for the specific JSON structure we expect
-                # The discovery agent returns {"gems": ...}
-                import json
-                start_marker = '{"gems":'
-                start_idx = response_str.find(start_marker)
-                
-                if start_idx != -1:
-                    print("[Backend] Found JSON start marker in discovery response")
-                    candidate = response_str[start_idx:]
-                    json_found = False
-                    for i in range(len(candidate), 10, -1):
-                        sub = candidate[:i]
-                        try:
-                            data = json.loads(sub)
-                            if "gems" in data:
-                                response_text = sub # Use the valid JSON string
-                                json_found = True
-                                print("[Backend] Successfully extracted JSON via brute force")
-                                break
-                        except:
-                            pass
-                
-                # Strategy 2: Regex for text='...' or text="..." (Backup)
-                if not response_text:
-                    import re
-                    # Use re.DOTALL to match newlines
-                    matches = re.findall(r"text=(['\"])((?:(?!\1).|\\.)*)\1", response_str, re.DOTALL)
-                    if matches:
-                        response_text = matches[-1][1]
-                        response_text = response_text.replace("\\'", "'").replace('\\"', '"').replace('\\n', '\n')
-                
-                # Strategy 3: Brute force JSON find (if regex failed or returned non-JSON)
-                if not response_text or "gems" not in response_text:
-                     print("[Backend] Regex failed or no gems, trying brute force JSON search...")
-                     # Find the last occurrence of "gems": [
-                     json_start = response_str.rfind('{"gems":')
-                     if json_start == -1:
-                         json_start = response_str.rfind("{'gems':")
-                     
-                     if json_start != -1:
-                         # Try to find the matching closing brace
-                         brace_count = 0
-                         for i in range(json_start, len(response_str)):
-                             char = response_str[i]
-                             if char == '{':
-                                 brace_count += 1
-                             elif char == '}':
-                                 brace_count -= 1
-                                 if brace_count == 0:
-                                     response_text = response_str[json_start:i+1]
-                                     print(f"[Backend] Brute force found JSON: {response_text[:50]}...")
-                                     break
-
-                if not response_text:
-                     # CRITICAL: Do NOT return the raw event dump.
-                     response_text = "I couldn't find any hidden gems matching your criteria. Please try a different query."
-
-            # Final safety check
-            if "Event(" in response_text or "model_version=" in response_text:
-                 # One last try to extract JSON if we have a raw dump
-                 if '{"gems":' in response_text:
-                     # It's ugly but maybe valid JSON is inside
-                     pass 
-                 else:
-                     response_text = "I couldn't find any hidden gems matching your criteria. Please try a different query."
+        client_id = resolve_client_id(request.sessionId, x_session_id)
+        http_response.headers["X-Session-Id"] = client_id
 
-        except Exception as e:
-            print(f"[Backend] Error extracting text from response: {e}")
-            response_text = "Error processing response."
+        cache_key = normalize_query(request.searchQuery)
+        use_cache = not (request.noCache or "no-cache" in (cache_control or "").lower())
 
-        print(f"[Backend] Extracted response text preview: {response_text[:200]}...")
+        with recording() as recorder:
+            with span("backend", "cache_lookup"):
+                cached_gems = discover_cache.get(cache_key) if use_cache else None
 
-        # Parse JSON response from recommendation agent
-        parsed_data = parse_agent_response(response_text, request.searchQuery)
+            degraded = False
+            if cached_gems is None:
+                try:
+                    gems, shared = await discover_flight.do(
+                        cache_key, lambda: run_discovery(client_id, request.searchQuery))
+                except Overloaded as e:
+                    # Shed load: answer from an expired cache entry if there is one
+                    cached_gems = discover_cache.get_stale(cache_key)
+                    if cached_gems is None:
+                        raise overloaded_error(e)
+                    print(f"[Backend] Overloaded, serving stale cache for '{cache_key}'")
+                    degraded = True
+
+            if cached_gems is not None:
+                if not degraded:
+                    print(f"[Backend] Cache hit for '{cache_key}'")
+                gems = cached_gems
+                # Keep the conversation aware of the gems, as if the agent had found them
+                await session_manager.append_turn(
+                    client_id, request.searchQuery, json.dumps({"gems": gems}), author=root_agent.name)
+            elif shared:
+                # Another client's run answered this one; record it in our session
+                await session_manager.append_turn(
+                    client_id, request.searchQuery, json.dumps({"gems": gems}), author=root_agent.name)
+            elif gems:
+                discover_cache.put(cache_key, gems)
 
         # Calculate actual processing time
         processing_time = time.time() - start_time
-
-        gems_count = len(parsed_data.get("gems", []))
-        print(f"[Backend] Successfully parsed {gems_count} gems")
+        print(f"[Backend] Returning {len(gems)} gems")
         print(f"[Backend] Processing time: {processing_time:.2f}s")
-
-        # The recommendation agent now returns data in the correct format
-        gems = parsed_data.get("gems", [])
-
-        # Validate and fix coordinates
-        for gem in gems:
-            if "coordinates" not in gem or not gem["coordinates"]:
-                gem["coordinates"] = {"lat": 0, "lng": 0}
-            elif "lat" not in gem["coordinates"] or "lng" not in gem["coordinates"]:
-                 gem["coordinates"] = {"lat": 0, "lng": 0}
+        recorder.log()
 
         # Return the response with processing time and query
         return {
             "gems": gems,
             "processingTime": processing_time,
-            "query": request.searchQuery
+            "query": request.searchQuery,
+            "sessionId": client_id,
+            "cached": cached_gems is not None,
+            "degraded": degraded,
+            "timings": recorder.breakdown() if request.includeTimings else None
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Backend] ERROR in discover_gems endpoint: {e}")
         import traceback
@@ -548,13 +603,133 @@ async def discover_gems(request: DiscoveryRequest):
         )
 
 
+@app.post("/api/discover/stream")
+async def discover_gems_stream(
+    request: DiscoveryRequest,
+    x_session_id: Optional[str] = Header(default=None),
+    cache_control: Optional[str] = Header(default=None),
+):
+    """
+    Streaming version of /api/discover (Server-Sent Events).
+
+    Runs the Discovery -> Analysis -> Recommendation pipeline directly and
+    pushes stage events as the ADK events arrive, instead of waiting for the
+    whole pipeline. See discovery_stream.py for the event names. Cached
+    searches skip the stage events and go straight to the gems.
+
+    Args:
+        request: Discovery request with search query
+        x_session_id: Client session id (X-Session-Id header)
+        cache_control: Cache-Control header ("no-cache" bypasses the cache)
+    """
+    import time
+
+    client_id = resolve_client_id(request.sessionId, x_session_id)
+    cache_key = normalize_query(request.searchQuery)
+    use_cache = not (request.noCache or "no-cache" in (cache_control or "").lower())
+    print(f"[Backend] Streaming search query: {request.searchQuery}")
+
+    # Shed load before the stream starts, while a status code can still be sent
+    if discover_cache.get_stale(cache_key) is None:
+        try:
+            admission.check()
+        except Overloaded as e:
+            raise overloaded_error(e)
+
+    async def event_source():
+        start_time = time.time()
+        yield format_sse("started", {"query": request.searchQuery, "sessionId": client_id})
+
+        seen_stages = set()
+        final_text = None
+        degraded = False
+        try:
+            with recording() as recorder:
+                cached_gems = discover_cache.get(cache_key) if use_cache else None
+                if cached_gems is None:
+                    try:
+                        async with admission.admit():
+                            async for event in session_manager.stream(
+                                    client_id, request.searchQuery, runner=pipeline_runner):
+                                for name, payload in stage_events(event, seen_stages):
+                                    payload["elapsed"] = round(time.time() - start_time, 3)
+                                    yield format_sse(name, payload)
+
+                                text = final_recommendation_text(event)
+                                if text:
+                                    final_text = text
+                    except Overloaded as e:
+                        cached_gems = discover_cache.get_stale(cache_key)
+                        if cached_gems is None:
+                            yield format_sse("error", {
+                                "detail": str(e),
+                                "status": e.status_code,
+                                "retryAfter": e.retry_after,
+                            })
+                            return
+                        print(f"[Backend] Overloaded, serving stale cache for '{cache_key}'")
+                        degraded = True
+
+                if cached_gems is not None:
+                    if not degraded:
+                        print(f"[Backend] Cache hit for '{cache_key}'")
+                    gems = cached_gems
+                    await session_manager.append_turn(
+                        client_id, request.searchQuery, json.dumps({"gems": gems}), author=root_agent.name)
+                else:
+                    gems = []
+                    if final_text:
+                        with span("backend", "parse_response"):
+                            parsed_data = parse_agent_response(final_text, request.searchQuery)
+                            gems = fix_gem_coordinates(parsed_data.get("gems", []))
+                    if gems:
+                        discover_cache.put(cache_key, gems)
+
+            for index, gem in enumerate(gems):
+                yield format_sse("gem", {"index": index, "gem": gem})
+
+            processing_time = time.time() - start_time
+            print(f"[Backend] Stream finished: {len(gems)} gems in {processing_time:.2f}s")
+            recorder.log()
+            yield format_sse("done", {
+                "count": len(gems),
+                "processingTime": processing_time,
+                "query": request.searchQuery,
+                "sessionId": client_id,
+                "cached": cached_gems is not None,
+                "degraded": degraded,
+                "timings": recorder.breakdown() if request.includeTimings else None,
+            })
+
+        except Exception as e:
+            print(f"[Backend] ERROR in discover_gems_stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield format_sse("error", {"detail": f"Error processing request: {str(e)}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # disable proxy buffering (nginx)
+            "X-Session-Id": client_id,
+        },
+    )
+
+
 @app.post("/api/select")
-async def select_gem(request: SelectionRequest):
+async def select_gem(
+    request: SelectionRequest,
+    http_response: Response,
+    x_session_id: Optional[str] = Header(default=None),
+):
     """
     Handle user selection of a hidden gem.
     
     Args:
         request: Selection request with the selected gem name
+        x_session_id: Client session id (X-Session-Id header)
         
     Returns:
         The agent's advice based on the selection and weather.
@@ -564,6 +739,9 @@ async def select_gem(request: SelectionRequest):
     print(f"{'='*60}")
     
     try:
+        client_id = resolve_client_id(request.sessionId, x_session_id)
+        http_response.headers["X-Session-Id"] = client_id
+
         # Construct the user input for the agent
         user_input = f"I choose {request.selection}"
         
@@ -571,68 +749,32 @@ async def select_gem(request: SelectionRequest):
         
         # Run the agent with the selection
         # The agent should be in the state waiting for selection (Step 2 -> Step 3)
-        response = await runner.run_debug(user_input)
+        response = await run_admitted(client_id, user_input)
         
         # Extract text from response
-        response_text = str(response)
-        try:
-            if isinstance(response, list):
-                for event in reversed(response):
-                    # Check for text in model response
-                    if hasattr(event, 'role') and event.role == 'model':
-                        if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                            parts = event.content.parts
-                            text_parts = []
-                            for part in parts:
-                                if hasattr(part, 'text') and part.text:
-                                    text_parts.append(part.text)
-                            if text_parts:
-                                response_text = "".join(text_parts)
-                                break
-                    
-                    # Check for function_response (if root agent delegated to sub-agent)
-                    if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                        for part in event.content.parts:
-                            if hasattr(part, 'function_response') and part.function_response:
-                                try:
-                                    # Extract result from function response
-                                    res = part.function_response.response
-                                    if 'result' in res:
-                                        response_text = str(res['result'])
-                                        break
-                                except Exception as e:
-                                    print(f"[Backend] Error extracting function response: {e}")
-                        if response_text:
-                            break
-        except Exception as e:
-            print(f"[Backend] Error extracting text from response: {e}")
+        output = extract_agent_output(response, preferred_author=None)
+        response_text = output.text if output else ""
 
         print(f"[Backend] Agent response received: {response_text[:200]}...")
         
-        # Try to parse response_text as JSON
-        advice_data = response_text
-        try:
-            # Clean up potential markdown code blocks
-            clean_text = response_text.strip()
-            if clean_text.startswith("```json"):
-                clean_text = clean_text[7:]
-            if clean_text.startswith("```"):
-                clean_text = clean_text[3:]
-            if clean_text.endswith("```"):
-                clean_text = clean_text[:-3]
-            clean_text = clean_text.strip()
-            
-            import json
-            advice_data = json.loads(clean_text)
-        except Exception as e:
-            print(f"[Backend] Could not parse advice as JSON, returning raw text: {e}")
+        # Try to parse response_text as JSON (code fences are tolerated)
+        if output and isinstance(output.payload, dict):
+            advice_data = output.payload
+        else:
+            advice_data = extract_json(response_text, key=None)
+        if advice_data is None:
+            print(f"[Backend] Could not parse advice as JSON, returning raw text")
             # If parsing fails, we return the raw text. 
             # The frontend should handle both string and object.
+            advice_data = response_text
         return {
             "advice": advice_data,
-            "selection": request.selection
+            "selection": request.selection,
+            "sessionId": client_id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Backend] ERROR in select_gem endpoint: {e}")
         import traceback
@@ -645,161 +787,65 @@ async def select_gem(request: SelectionRequest):
 
 class ChatRequest(BaseModel):
     message: str
+    sessionId: Optional[str] = None
+
+
+def format_chat_reply(data: dict) -> str:
+    """Turns the agent's {"summary", "outfit"} / {"response"} JSON into chat text."""
+    if "summary" in data:
+        reply = str(data["summary"])
+        if "outfit" in data:
+            reply += f"\n\nOutfit Tip: {data['outfit']}"
+        return reply
+    if "response" in data:
+        return str(data["response"])
+    return ""
 
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    http_response: Response,
+    x_session_id: Optional[str] = Header(default=None),
+):
     """
     Handle chat messages from the user about the selected gem.
     """
     print(f"[Backend] Received chat message: {request.message}")
     try:
-        # Revert to run_debug as run() caused issues. 
-        # run_debug returns a list of events.
-        response = await runner.run_debug(request.message)
+        client_id = resolve_client_id(request.sessionId, x_session_id)
+        http_response.headers["X-Session-Id"] = client_id
+
+        # Returns a list of events, like run_debug, but in the client's session
+        response = await run_admitted(client_id, request.message)
         
         # Extract text from response
         response_text = ""
         try:
-            # Check if response is a list of events
-            if isinstance(response, list):
-                for event in reversed(response):
-                    # Check for text in model response
-                    if hasattr(event, 'role') and event.role == 'model':
-                        if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                            parts = event.content.parts
-                            text_parts = []
-                            for part in parts:
-                                if hasattr(part, 'text') and part.text:
-                                    text_parts.append(part.text)
-                            if text_parts:
-                                response_text = "".join(text_parts)
-                                break
-                    
-                    # Check for function_response (if root agent delegated to sub-agent)
-                    if hasattr(event, 'content') and hasattr(event.content, 'parts') and event.content.parts:
-                        for part in event.content.parts:
-                            if hasattr(part, 'function_response') and part.function_response:
-                                try:
-                                    # Extract result from function response
-                                    res = part.function_response.response
-                                    if 'result' in res:
-                                        response_text = str(res['result'])
-                                        break
-                                except Exception as e:
-                                    print(f"[Backend] Error extracting function response: {e}")
-                        if response_text:
-                            break
-            
-            # Fallback: String conversion and robust regex
+            output = extract_agent_output(response, preferred_author=None)
+            if output and output.text:
+                response_text = output.text
+            elif output and isinstance(output.payload, dict):
+                response_text = format_chat_reply(output.payload)
+
             if not response_text:
-                response_text = ""
-                response_str = str(response)
-                # Removed raw dump for production
-
-                # Strategy 1: Try to find JSON directly in the string representation if it's clean
-                # The agent returns {"summary": ...}
-                # We search for this pattern and try to extract the valid JSON object
-                import json
-                start_marker = '{"summary":'
-                start_idx = response_str.find(start_marker)
-                
-                if start_idx != -1:
-                    print("[Backend] Found JSON start marker")
-                    # Try to parse increasingly shorter substrings from the end
-                    # This handles the trailing characters like ')}], ...'
-                    candidate = response_str[start_idx:]
-                    json_found = False
-                    for i in range(len(candidate), 10, -1):
-                        sub = candidate[:i]
-                        # We need to handle escaped quotes inside the string representation if they exist
-                        # But json.loads expects valid JSON. 
-                        # If the string is from repr(), it might have escaped quotes like \'
-                        # Let's try to unescape first if it looks like a python string dump
-                        try:
-                            # Try parsing as is
-                            data = json.loads(sub)
-                            if "summary" in data:
-                                response_text = data["summary"]
-                                if "outfit" in data:
-                                    response_text += f"\n\nOutfit Tip: {data['outfit']}"
-                                json_found = True
-                                print("[Backend] Successfully extracted JSON via brute force")
-                                break
-                        except:
-                            # Try unescaping \' to '
-                            try:
-                                unescaped = sub.replace("\\'", "'").replace('\\"', '"')
-                                # This might break valid JSON quotes, so it's risky.
-                                # Better to rely on the regex for the text content first.
-                                pass
-                            except:
-                                pass
-                    
-                    if not json_found:
-                         print("[Backend] Brute force JSON parse failed")
-
-                # Strategy 2: Regex for text='...' or text="..." (Backup)
-                if not response_text:
-                    import re
-                    # Regex to capture text content, handling escaped quotes
-                    # Matches text='...' or text="..."
-                    matches = re.findall(r"text=(['\"])((?:(?!\1).|\\.)*)\1", response_str)
-                    if matches:
-                        # matches[0] is the quote type, matches[1] is the content
-                        response_text = matches[-1][1]
-                        # Unescape the string
-                        response_text = response_text.replace("\\'", "'").replace('\\"', '"').replace('\\n', '\n')
-                        print(f"[Backend] Regex extracted text: {response_text[:50]}...")
-                    else:
-                        if "Event(" in response_str:
-                             print(f"[Backend] Failed to parse Event: {response_str[:200]}...")
-                             # Don't give up yet, try to find ANY text
-                             simple_text = re.findall(r"text=(['\"])((?:(?!\1).|\\.)*)\1", response_str)
-                             if simple_text:
-                                 response_text = simple_text[-1][1]
-                             else:
-                                 # CRITICAL: Do NOT return the raw event dump.
-                                 response_text = "I'm checking the details for you. Please ask me specifically about the weather or outfit advice if I missed it!"
-                        else:
-                            response_text = response_str
-
-            # Final safety check: If response_text still looks like an Event dump, replace it.
-            if "Event(" in response_text or "model_version=" in response_text:
-                response_text = "I successfully processed your request but couldn't generate a text summary. How can I help you further?"
-
-            # Clean up JSON if present
-
-            # Clean up JSON if present
-            clean_text = response_text.strip()
-            # Handle markdown code blocks
-            if "```" in clean_text:
-                code_block_match = re.search(r"```(?:json)?\s*(.*?)\s*```", clean_text, re.DOTALL)
-                if code_block_match:
-                    clean_text = code_block_match.group(1)
-            
-            # Attempt to parse as JSON if it looks like JSON
+                response_text = "I'm checking the details for you. Please ask me specifically about the weather or outfit advice if I missed it!"
+
+            # Clean up JSON if present (whole reply is JSON, possibly in a code fence)
+            clean_text = strip_code_fence(response_text)
             if clean_text.startswith("{") and clean_text.endswith("}"):
-                try:
-                    import json
-                    data = json.loads(clean_text)
-                    if "summary" in data:
-                        response_text = data["summary"]
-                        if "outfit" in data:
-                            response_text += f"\n\nOutfit Tip: {data['outfit']}"
-                    elif "response" in data:
-                         response_text = data["response"]
-                except json.JSONDecodeError:
-                    pass # Not valid JSON, treat as plain text
-                except Exception as e:
-                    print(f"[Backend] JSON parse error: {e}")
+                data = extract_json(clean_text, key=None)
+                if data is not None:
+                    response_text = format_chat_reply(data) or response_text
 
         except Exception as e:
             print(f"[Backend] Error extracting text from response: {e}")
             response_text = "Error processing response."
 
         print(f"[Backend] Agent response: {response_text[:200]}...")
-        return {"response": response_text}
+        return {"response": response_text, "sessionId": client_id}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Backend] Error processing chat request: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {e}")
@@ -0,0 +1,186 @@
+"""
+Response Cache for /api/discover
+
+Identical or near-identical searches ("hidden gem in Brasov",
+"Hidden gems in brasov!") used to re-run the whole agent pipeline. This
+module caches finished discovery results in memory:
+
+- Keys are NORMALIZED queries: lowercase, accents and punctuation removed,
+  stopwords dropped, simple plurals folded, city aliases resolved, words sorted
+- Entries expire after a TTL; expired entries stay until LRU eviction so
+  they can still be served as a degraded answer when the server is overloaded
+- The cache is bounded by entry count AND approximate memory (LRU eviction)
+- Hit/miss/eviction counters are kept for monitoring
+"""
+
+import json
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional
+
+
+# Words that don't change what the user is searching for
+STOPWORDS = frozenset({
+    "a", "an", "the", "in", "at", "on", "of", "for", "to", "and", "or", "with",
+    "near", "around", "by", "from", "into", "some", "any", "me", "my", "i",
+    "we", "us", "our", "please", "find", "show", "give", "looking", "look",
+    "want", "need", "recommend", "suggest", "is", "are", "there", "what",
+    "where", "can", "you", "could", "would", "like", "good", "great", "best",
+    "nice", "cool", "spot", "spots", "place", "places",
+})
+
+# Alternative city names -> canonical name (matched after normalization)
+CITY_ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "sf": "san francisco",
+    "muenchen": "munich",
+    "munchen": "munich",
+    "wien": "vienna",
+    "koln": "cologne",
+    "roma": "rome",
+    "firenze": "florence",
+    "lisboa": "lisbon",
+    "praha": "prague",
+    "bucuresti": "bucharest",
+    "kronstadt": "brasov",
+}
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _singular(word: str) -> str:
+    """Very small plural folding: lakes -> lake, beaches -> beach, cities -> city."""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query: str, aliases: Optional[Dict[str, str]] = None) -> str:
+    """
+    Builds the cache key for a search query.
+
+    Example:
+        >>> normalize_query("Hidden gems in Brașov!")
+        'brasov gem hidden'
+        >>> normalize_query("hidden gem in Brasov")
+        'brasov gem hidden'
+    """
+    aliases = CITY_ALIASES if aliases is None else aliases
+
+    text = _strip_accents(query.lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = " ".join(text.split())
+
+    # Multi-word aliases first (e.g. "new york city"), longest match wins
+    for alias in sorted(aliases, key=len, reverse=True):
+        text = re.sub(rf"\b{re.escape(alias)}\b", aliases[alias], text)
+
+    words = {_singular(w) for w in text.split() if w not in STOPWORDS}
+    return " ".join(sorted(words))
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache with a TTL and a memory bound.
+
+    Args:
+        ttl_seconds: How long an entry stays valid
+        max_entries: Maximum number of entries
+        max_bytes: Approximate memory bound (size of the JSON-encoded values)
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_entries: int = 256,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # key -> (value, expires_at, size_bytes)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if time.time() >= expires_at:
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + self.ttl_seconds, size)
+            self._bytes += size
+
+            while self._entries and (
+                    len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Returns an entry even if it has expired (for degraded answers)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttlSeconds": self.ttl_seconds,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,281 @@
+"""
+Session Manager for the FastAPI Backend
+
+Gives every client its own ADK session instead of sharing the single
+debug session that `runner.run_debug(...)` uses.
+
+HOW IT WORKS:
+1. Each client is identified by a client id (the `X-Session-Id` header)
+2. The first request from a client binds it to a pre-created warm session
+3. Every session has its own asyncio.Lock, so turns are serialized only
+   within that session - different users run concurrently
+4. Idle sessions are evicted so memory stays bounded; a session is in use
+   (and never evicted) from acquire() until the matching done(), which
+   covers the gap before its turn takes the session lock
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from google.adk.events import Event
+from google.genai import types
+
+
+@dataclass
+class SessionHandle:
+    """A client's binding to one ADK session."""
+    client_id: str
+    session_id: str
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    in_use: int = 0  # acquire() calls not yet matched by done()
+
+
+class SessionManager:
+    """
+    Maps client ids to ADK sessions on a shared runner.
+
+    The runner itself is stateless apart from its session service, so one
+    runner can serve every session; what must not be shared is the session
+    (the conversation history) and the turn lock.
+
+    Args:
+        runner: The ADK runner (e.g. InMemoryRunner) that owns the session service
+        user_id: ADK user id used for every session created by this manager
+        warm_sessions: Number of sessions to keep pre-created for new clients
+        idle_timeout: Seconds of inactivity before a session is evicted
+        max_sessions: Upper bound on live sessions; the least recently used
+            idle sessions are evicted first when it is exceeded
+    """
+
+    def __init__(
+        self,
+        runner,
+        user_id: str = "web_user",
+        warm_sessions: int = 4,
+        idle_timeout: float = 1800,
+        max_sessions: int = 1000,
+    ):
+        self._runner = runner
+        self.app_name = runner.app_name
+        self.user_id = user_id
+        self.warm_sessions = warm_sessions
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+
+        self._sessions: Dict[str, SessionHandle] = {}
+        self._warm_pool: List[str] = []
+        self._registry_lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self.active_runs = 0  # agent turns currently running
+
+    @property
+    def session_service(self):
+        return self._runner.session_service
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Pre-create the warm session pool (call at app startup)."""
+        await self._refill_warm_pool()
+        self._sweeper_task = asyncio.create_task(self._sweep_periodically())
+        print(f"[Sessions] Warm pool ready ({len(self._warm_pool)} sessions)")
+
+    async def stop(self) -> None:
+        """Stops the background idle sweeper (call at app shutdown)."""
+        for task in (self._sweeper_task, self._refill_task):
+            if task and not task.done():
+                task.cancel()
+
+    async def _sweep_periodically(self) -> None:
+        interval = max(self.idle_timeout / 4, 30)
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    async def _create_session(self) -> str:
+        session = await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=uuid.uuid4().hex,
+        )
+        return session.id
+
+    async def _refill_warm_pool(self) -> None:
+        while len(self._warm_pool) < self.warm_sessions:
+            self._warm_pool.append(await self._create_session())
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill_warm_pool())
+
+    # ------------------------------------------------------------------
+    # Client <-> session binding
+    # ------------------------------------------------------------------
+
+    async def acquire(self, client_id: Optional[str] = None) -> SessionHandle:
+        """
+        Returns the session handle for a client, binding a warm session
+        to it on first use. The handle is marked in use, so it is not
+        evicted until the caller passes it to done().
+
+        Args:
+            client_id: Opaque client identifier. If None, a new id is generated.
+
+        Returns:
+            SessionHandle: The client's session handle
+        """
+        client_id = client_id or uuid.uuid4().hex
+
+        async with self._registry_lock:
+            handle = self._sessions.get(client_id)
+            if handle is None:
+                if self._warm_pool:
+                    session_id = self._warm_pool.pop()
+                    self._schedule_refill()
+                else:
+                    session_id = await self._create_session()
+
+                handle = SessionHandle(client_id=client_id, session_id=session_id)
+                self._sessions[client_id] = handle
+                print(f"[Sessions] New session for client {client_id[:8]}... "
+                      f"({len(self._sessions)} active)")
+
+            handle.in_use += 1
+            handle.last_used = time.time()
+            if len(self._sessions) > self.max_sessions:
+                await self._evict(self._eviction_candidates())
+            return handle
+
+    def done(self, handle: SessionHandle) -> None:
+        """Ends a use of a handle returned by acquire(); it can be evicted once idle."""
+        handle.in_use = max(handle.in_use - 1, 0)
+        handle.last_used = time.time()
+
+    async def release(self, client_id: str) -> None:
+        """Drops a client's session and its history."""
+        async with self._registry_lock:
+            handle = self._sessions.get(client_id)
+            if handle:
+                await self._evict([handle])
+
+    def _eviction_candidates(self) -> List[SessionHandle]:
+        """Idle-expired sessions, plus the LRU idle ones if over max_sessions."""
+        now = time.time()
+        idle = [h for h in self._sessions.values() if not h.in_use]
+        expired = [h for h in idle if now - h.last_used > self.idle_timeout]
+
+        overflow = len(self._sessions) - len(expired) - self.max_sessions
+        if overflow > 0:
+            rest = sorted(
+                (h for h in idle if h not in expired), key=lambda h: h.last_used)
+            expired.extend(rest[:overflow])
+        return expired
+
+    async def _evict(self, handles: List[SessionHandle]) -> None:
+        for handle in handles:
+            self._sessions.pop(handle.client_id, None)
+            try:
+                await self.session_service.delete_session(
+                    app_name=self.app_name,
+                    user_id=self.user_id,
+                    session_id=handle.session_id,
+                )
+            except Exception as e:
+                print(f"[Sessions] Error deleting session {handle.session_id}: {e}")
+        if handles:
+            print(f"[Sessions] Evicted {len(handles)} sessions "
+                  f"({len(self._sessions)} active)")
+
+    async def evict_idle(self) -> None:
+        """Evicts sessions idle for longer than idle_timeout."""
+        async with self._registry_lock:
+            await self._evict(self._eviction_candidates())
+
+    # ------------------------------------------------------------------
+    # Running turns
+    # ------------------------------------------------------------------
+
+    async def stream(
+        self, client_id: Optional[str], message: str, runner=None
+    ) -> AsyncIterator:
+        """
+        Runs one turn in the client's session and yields ADK events as they
+        are produced. The session lock is held for the whole turn.
+
+        Args:
+            client_id: The client identifier
+            message: The user message for this turn
+            runner: Optional runner to use instead of the default one. It must
+                share this manager's session service (e.g. a runner for a
+                sub-pipeline that writes into the same conversation).
+        """
+        handle = await self.acquire(client_id)
+        runner = runner or self._runner
+        new_message = types.Content(role="user", parts=[types.Part(text=message)])
+
+        try:
+            async with handle.lock:
+                self.active_runs += 1
+                try:
+                    async for event in runner.run_async(
+                        user_id=self.user_id,
+                        session_id=handle.session_id,
+                        new_message=new_message,
+                    ):
+                        yield event
+                finally:
+                    self.active_runs -= 1
+        finally:
+            self.done(handle)
+
+    async def run(self, client_id: Optional[str], message: str, runner=None) -> list:
+        """
+        Runs one turn and returns the full list of events, like
+        `runner.run_debug(...)` does for the shared debug session.
+        """
+        return [event async for event in self.stream(client_id, message, runner)]
+
+    async def append_turn(
+        self, client_id: Optional[str], message: str, reply: str, author: str
+    ) -> None:
+        """
+        Records a user message and a reply in the client's session without
+        running the agent (e.g. when the reply came from a cache), so later
+        turns still see it in the conversation history.
+
+        Args:
+            client_id: The client identifier
+            message: The user message
+            reply: The reply text to record
+            author: Agent name to record the reply under
+        """
+        handle = await self.acquire(client_id)
+        invocation_id = f"e-{uuid.uuid4().hex}"
+
+        try:
+            async with handle.lock:
+                session = await self.session_service.get_session(
+                    app_name=self.app_name,
+                    user_id=self.user_id,
+                    session_id=handle.session_id,
+                )
+                for event in (
+                    Event(invocation_id=invocation_id, author="user",
+                          content=types.Content(role="user", parts=[types.Part(text=message)])),
+                    Event(invocation_id=invocation_id, author=author,
+                          content=types.Content(role="model", parts=[types.Part(text=reply)])),
+                ):
+                    await self.session_service.append_event(session, event)
+        finally:
+            self.done(handle)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
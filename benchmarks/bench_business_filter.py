@@ -0,0 +1,83 @@
+"""
+Benchmark: business exclusion, substring loops vs compiled classifier
+
+Classifies batches of random candidate names/types with the old per-keyword
+substring checks and with BusinessClassifier (IGotYou_Agent/business_filter.py),
+prints the timings and the names the two disagree on (the substring false
+positives such as "Barnes Falls"). No API keys needed.
+
+Usage (from the project root):
+    python benchmarks/bench_business_filter.py
+    python benchmarks/bench_business_filter.py --batch 20 --batches 5000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "IGotYou_Agent"))
+
+from business_filter import DEFAULT_KEYWORDS, DEFAULT_TYPES, BusinessClassifier  # noqa: E402
+
+
+WORDS = ["Lake", "Falls", "Canyon", "Peak", "Trail", "Viewpoint", "Forest", "Cave",
+         "Barnes", "Inner", "Spanish", "Market", "Café", "Shops", "Hotel", "Pub",
+         "Clubhouse", "Gorge", "Meadow", "Summit", "Old", "Mill", "Creek", "Center"]
+TYPES = [["natural_feature"], ["park", "tourist_attraction"], ["point_of_interest"],
+         ["restaurant", "food"], ["lodging"], ["store"], ["campground"]]
+
+
+def substring_classify(cands: list) -> list:
+    """The old checks: every keyword as a substring of the lowercased name."""
+    flags = []
+    for p in cands:
+        name_lower = p.get('name', '').lower()
+        place_types = p.get('types', [])
+        is_business_name = any(kw in name_lower for kw in DEFAULT_KEYWORDS)
+        is_business_type = any(bt in place_types for bt in DEFAULT_TYPES)
+        flags.append(is_business_name or is_business_type)
+    return flags
+
+
+def random_candidates(n: int) -> list:
+    return [{"name": " ".join(random.sample(WORDS, random.randint(1, 3))),
+             "types": random.choice(TYPES)} for _ in range(n)]
+
+
+def _time_us(fn, batches: list) -> float:
+    timings = []
+    for batch in batches:
+        t0 = time.perf_counter()
+        fn(batch)
+        timings.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--batch", type=int, default=60, help="Candidates per batch")
+    parser.add_argument("--batches", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    batches = [random_candidates(args.batch) for _ in range(args.batches)]
+    classifier = BusinessClassifier()
+
+    old_us = _time_us(substring_classify, batches)
+    new_us = _time_us(classifier.classify, batches)
+    print(f"{args.batch} candidates per batch")
+    print(f"substring loops:      {old_us:.1f} µs median")
+    print(f"compiled classifier:  {new_us:.1f} µs median ({old_us / new_us:.1f}x)")
+
+    differ = {c["name"] for batch in batches[:50]
+              for c, old, new in zip(batch, substring_classify(batch), classifier.classify(batch))
+              if old != new}
+    print(f"names classified differently: {sorted(differ)[:10]}")
+
+
+if __name__ == "__main__":
+    main()
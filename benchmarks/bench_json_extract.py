@@ -0,0 +1,181 @@
+"""
+Benchmark: JSON extraction from agent responses
+
+Compares the single-pass extractor in backend/json_extract.py with the
+strategies backend/main.py used before (prefix brute force + text= regex)
+on `str(response)` dumps of ADK event lists.
+
+Usage (from the project root):
+    python benchmarks/bench_json_extract.py
+    python benchmarks/bench_json_extract.py --dump-dir path/to/dumps
+
+With --dump-dir, every *.txt file in the directory is treated as one
+recorded `str(response)` dump. Without it, dumps with the same shape
+(Event/Content/Part reprs around tool responses and the final JSON) are
+generated at several sizes.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from json_extract import extract_json  # noqa: E402
+
+
+# ============================================================================
+# PREVIOUS STRATEGIES (copied from backend/main.py before the extractor)
+# ============================================================================
+
+def legacy_extract(response_str: str):
+    # Strategy 1: find '{"gems":' and try json.loads on every shorter prefix
+    start_idx = response_str.find('{"gems":')
+    if start_idx != -1:
+        candidate = response_str[start_idx:]
+        for i in range(len(candidate), 10, -1):
+            try:
+                data = json.loads(candidate[:i])
+                if "gems" in data:
+                    return data
+            except Exception:
+                pass
+
+    # Strategy 2: regex for text='...' / text="..."
+    matches = re.findall(r"text=(['\"])((?:(?!\1).|\\.)*)\1", response_str, re.DOTALL)
+    if matches:
+        text = matches[-1][1]
+        text = text.replace("\\'", "'").replace('\\"', '"').replace('\\n', '\n')
+        try:
+            return json.loads(text)
+        except Exception:
+            pass
+    return None
+
+
+# ============================================================================
+# DUMP GENERATION
+# ============================================================================
+
+def _review(i: int) -> str:
+    return (f"\"Beautiful quiet spot, we went there on day {i}. It's a short walk "
+            f"from the parking and the view at sunset is amazing. Bring water!\"")
+
+
+def _analysis_payload(n_reviews: int) -> str:
+    return json.dumps({"status": "success", "gems": [
+        {
+            "name": f"Hidden Lake {g}",
+            "rating": 4.7,
+            "review_count": 42,
+            "reviews_content": "\n".join(_review(i) for i in range(n_reviews)),
+            "map_url": f"https://maps.google.com/?cid={g}",
+            "address": "Somewhere 1, Brasov, Romania",
+            "photo_url": "https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photo_reference=" + "x" * 200,
+            "coordinates": {"lat": 45.6 + g, "lng": 25.5},
+        } for g in range(3)
+    ]})
+
+
+def _final_payload(indent=None) -> str:
+    return json.dumps({"gems": [
+        {
+            "placeName": f"Hidden Lake {g}",
+            "address": "Somewhere 1, Brasov, Romania",
+            "coordinates": {"lat": 45.6 + g, "lng": 25.5},
+            "rating": 4.7,
+            "reviewCount": 42,
+            "photos": ["https://example.com/p.jpg"],
+            "analysis": {"whySpecial": "Quiet.", "bestTime": "Sunset", "insiderTip": "Bring water"},
+        } for g in range(3)
+    ]}, indent=indent)
+
+
+def make_pipeline_dump(n_reviews: int) -> str:
+    """
+    Pipeline events: the analysis tool response (with all review text)
+    followed by the final, indented gems JSON as a text part.
+    """
+    analysis = _analysis_payload(n_reviews)
+    final = _final_payload(indent=2)
+    events = [
+        "Event(content=Content(parts=[Part(function_call=FunctionCall(args={'cands': '...'}, "
+        "name='analysis_tool'))], role='model'), author='Analysis_Agent', actions=EventActions(state_delta={}))",
+        f"Event(content=Content(parts=[Part(function_response=FunctionResponse(name='analysis_tool', "
+        f"response={{'result': {analysis!r}}}))], role='user'), author='Analysis_Agent')",
+        f"Event(content=Content(parts=[Part(text={final!r})], role='model'), author='Recommendation_Agent', "
+        f"model_version='gemini-2.5-flash-lite', usage_metadata=GenerateContentResponseUsageMetadata(total_token_count=9000))",
+    ]
+    return "[" + ", ".join(events) + "]"
+
+
+def make_delegated_dump(n_reviews: int) -> str:
+    """
+    Root-agent events: the compact gems JSON returned by the AgentTool
+    early in the dump, followed by more events (here a second tool round
+    carrying review text). The old prefix brute force is quadratic in the
+    length of everything after '{"gems":'.
+    """
+    final = _final_payload()
+    analysis = _analysis_payload(n_reviews)
+    events = [
+        f"Event(content=Content(parts=[Part(function_response=FunctionResponse(name='IGOTYOU_Agent', "
+        f"response={{'result': {final!r}}}))], role='user'), author='IGOTYOU_Concierge')",
+        f"Event(content=Content(parts=[Part(function_response=FunctionResponse(name='IGOTYOU_Agent', "
+        f"response={{'result': {analysis!r}}}))], role='user'), author='IGOTYOU_Concierge')",
+        "Event(content=Content(parts=[Part(text='Here you go!')], role='model'), author='IGOTYOU_Concierge')",
+    ]
+    return "[" + ", ".join(events) + "]"
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+def _time(fn, dump: str, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(dump)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--dump-dir", type=Path, help="Directory of recorded *.txt dumps")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=400_000,
+                        help="Skip the O(n^2) strategy for dumps larger than this (bytes)")
+    args = parser.parse_args()
+
+    if args.dump_dir:
+        dumps = [(p.name, p.read_text(encoding="utf-8")) for p in sorted(args.dump_dir.glob("*.txt"))]
+    else:
+        dumps = [(f"pipeline/{n} reviews", make_pipeline_dump(n)) for n in (5, 50, 200, 800)]
+        dumps += [(f"delegated/{n} reviews", make_delegated_dump(n)) for n in (5, 20, 50, 100)]
+
+    print(f"{'dump':<28}{'size':>10}{'extractor':>14}{'legacy':>14}{'speedup':>10}  gems")
+    for name, dump in dumps:
+        new_t, new_res = _time(lambda d: extract_json(d, "gems"), dump, args.repeat)
+        gems = len(new_res["gems"]) if new_res else 0
+
+        if len(dump) > args.skip_legacy_above:
+            legacy_col, speedup_col = "skipped", "-"
+        else:
+            old_t, old_res = _time(legacy_extract, dump, 1)
+            old_gems = len(old_res["gems"]) if old_res else 0
+            legacy_col = f"{old_t * 1000:.1f}ms"
+            speedup_col = f"{old_t / new_t:.0f}x"
+            gems = f"{gems} (legacy: {old_gems})"
+
+        print(f"{name:<28}{len(dump):>10}{new_t * 1000:>12.2f}ms{legacy_col:>14}{speedup_col:>10}  {gems}")
+
+
+if __name__ == "__main__":
+    main()
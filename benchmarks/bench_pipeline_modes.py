@@ -0,0 +1,119 @@
+"""
+Benchmark: fast pipeline vs. full agent pipeline
+
+Runs the same searches through both hidden gem pipelines and compares
+wall-clock time, Gemini calls and tokens:
+
+- agents: Discovery_Agent -> Analysis_Agent -> Recommendation_Agent
+          (every stage is an LLM agent that calls its tool and repeats the JSON)
+- fast:   Fast_Discovery_Agent (search + analysis in Python) -> Recommendation_Agent
+
+This calls the real Gemini and Google Maps APIs, so it needs GOOGLE_API_KEY
+and GOOGLE_MAPS_API in .env and costs quota.
+
+Usage (from the project root):
+    python benchmarks/bench_pipeline_modes.py
+    python benchmarks/bench_pipeline_modes.py --repeat 3 "waterfalls near Brasov" "quiet beach in Crete"
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "IGotYou_Agent"))
+sys.path.insert(0, str(project_root / "backend"))
+
+from google.adk.runners import InMemoryRunner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from IGotYou_Agent import agent_pipeline, fast_pipeline  # noqa: E402
+from json_extract import extract_json  # noqa: E402
+from event_walker import extract_agent_output  # noqa: E402
+
+
+DEFAULT_QUERIES = [
+    "hidden waterfalls near Brasov",
+    "quiet surf spot in Bali for beginners",
+    "Find me a great ski resort in Sibiu",
+]
+
+
+async def run_once(runner: InMemoryRunner, query: str) -> dict:
+    """Runs one search in a fresh session and collects timing and token usage."""
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="bench")
+    message = types.Content(role="user", parts=[types.Part(text=query)])
+
+    llm_calls = prompt_tokens = output_tokens = 0
+    events = []
+    t0 = time.perf_counter()
+    async for event in runner.run_async(user_id="bench", session_id=session.id, new_message=message):
+        events.append(event)
+        usage = event.usage_metadata
+        if usage is not None and not event.partial:
+            llm_calls += 1
+            prompt_tokens += usage.prompt_token_count or 0
+            output_tokens += usage.candidates_token_count or 0
+    elapsed = time.perf_counter() - t0
+
+    output = extract_agent_output(events)
+    data = extract_json(output.text, "gems") if output else None
+    return {
+        "seconds": elapsed,
+        "llm_calls": llm_calls,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "gems": len(data["gems"]) if data else 0,
+    }
+
+
+def _summary(runs: list) -> dict:
+    return {
+        "seconds": statistics.median(r["seconds"] for r in runs),
+        "llm_calls": statistics.mean(r["llm_calls"] for r in runs),
+        "prompt_tokens": statistics.mean(r["prompt_tokens"] for r in runs),
+        "output_tokens": statistics.mean(r["output_tokens"] for r in runs),
+        "gems": statistics.mean(r["gems"] for r in runs),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per query and mode")
+    args = parser.parse_args()
+
+    runners = {
+        "agents": InMemoryRunner(agent=agent_pipeline),
+        "fast": InMemoryRunner(agent=fast_pipeline),
+    }
+
+    print(f"{'query':<40}{'mode':<8}{'median s':>10}{'LLM calls':>11}"
+          f"{'prompt tok':>12}{'output tok':>12}{'gems':>6}")
+    totals = {mode: [] for mode in runners}
+    for query in args.queries:
+        runs = {mode: [] for mode in runners}
+        for _ in range(args.repeat):
+            # Alternate modes so API warm-up and rate limits hit both equally
+            for mode, runner in runners.items():
+                runs[mode].append(await run_once(runner, query))
+
+        for mode, mode_runs in runs.items():
+            totals[mode].extend(mode_runs)
+            s = _summary(mode_runs)
+            print(f"{query[:38]:<40}{mode:<8}{s['seconds']:>10.2f}{s['llm_calls']:>11.1f}"
+                  f"{s['prompt_tokens']:>12.0f}{s['output_tokens']:>12.0f}{s['gems']:>6.1f}")
+
+    agents, fast = _summary(totals["agents"]), _summary(totals["fast"])
+    print(f"\nOverall: fast is {agents['seconds'] / fast['seconds']:.1f}x faster "
+          f"(median {fast['seconds']:.1f}s vs {agents['seconds']:.1f}s), "
+          f"{agents['llm_calls'] - fast['llm_calls']:.1f} fewer Gemini calls and "
+          f"{agents['output_tokens'] - fast['output_tokens']:.0f} fewer output tokens per search")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
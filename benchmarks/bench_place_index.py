@@ -0,0 +1,87 @@
+"""
+Benchmark: place index radius / bounding-box queries
+
+Fills the in-process place index (IGotYou_Agent/place_index.py) with random
+places around a few cities and times radius and bounding-box lookups
+against a linear scan over the same places. No API keys needed.
+
+Usage (from the project root):
+    python benchmarks/bench_place_index.py
+    python benchmarks/bench_place_index.py --places 200000 --queries 2000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "IGotYou_Agent"))
+
+from place_index import PlaceIndex, haversine_m  # noqa: E402
+
+
+CITIES = [(45.65, 25.60), (45.79, 24.15), (48.14, 11.58), (-8.65, 115.22), (35.24, 24.81)]
+
+
+def random_places(n: int) -> list:
+    places = []
+    for i in range(n):
+        lat, lng = random.choice(CITIES)
+        places.append({
+            "name": f"place {i}",
+            "place_id": f"p{i}",
+            "rating": 4.0,
+            "reviews": 10,
+            "loc": {"lat": lat + random.uniform(-1, 1), "lng": lng + random.uniform(-1, 1)},
+            "types": ["park"],
+        })
+    return places
+
+
+def _time_us(fn, args_list) -> float:
+    timings = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--places", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", type=float, default=5000, help="Radius query size in meters")
+    args = parser.parse_args()
+
+    random.seed(7)
+    places = random_places(args.places)
+    index = PlaceIndex(max_places=args.places)
+    t0 = time.perf_counter()
+    index.add(places)
+    build_s = time.perf_counter() - t0
+
+    centers = [(lat + random.uniform(-1, 1), lng + random.uniform(-1, 1))
+               for lat, lng in random.choices(CITIES, k=args.queries)]
+    radius_args = [(lat, lng, args.radius) for lat, lng in centers]
+    box_args = [((lat - 0.05, lng - 0.05, lat + 0.05, lng + 0.05),) for lat, lng in centers]
+
+    def linear(lat, lng, radius_m):
+        return [p for p in places
+                if haversine_m(lat, lng, p["loc"]["lat"], p["loc"]["lng"]) <= radius_m]
+
+    hits = statistics.mean(len(index.within_radius(*a)) for a in radius_args[:100])
+    assert all(len(index.within_radius(*a)) == len(linear(*a)) for a in radius_args[:5])
+
+    print(f"{args.places} places indexed in {build_s:.2f}s")
+    print(f"within_radius ({args.radius:.0f} m, ~{hits:.0f} hits): "
+          f"{_time_us(index.within_radius, radius_args):.0f} µs median")
+    print(f"within_bounds (~11 km box): {_time_us(index.within_bounds, box_args):.0f} µs median")
+    print(f"linear scan:  {_time_us(linear, radius_args[:20]):.0f} µs median")
+
+
+if __name__ == "__main__":
+    main()
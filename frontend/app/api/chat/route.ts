@@ -12,6 +12,7 @@ export async function POST(request: Request) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'X-Session-Id': request.headers.get('x-session-id') ?? '',
             },
             body: JSON.stringify(body),
         });
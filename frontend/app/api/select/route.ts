@@ -26,6 +26,7 @@ export async function POST(request: NextRequest) {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-Id': request.headers.get('x-session-id') ?? '',
         },
         body: JSON.stringify({ selection }),
       });
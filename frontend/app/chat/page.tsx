@@ -5,6 +5,7 @@ import { Send, Loader2, Sparkles } from 'lucide-react';
 import { BackendStatusBanner } from '@/components/BackendStatusBanner';
 import Link from 'next/link';
 import { ArrowLeft } from 'lucide-react';
+import { getSessionId } from '@/lib/session';
 
 interface GemPhoto {
   name: string;
@@ -65,6 +66,7 @@ export default function ChatPage() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-Id': getSessionId(),
         },
         body: JSON.stringify({
           message: userMessage.content,
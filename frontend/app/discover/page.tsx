@@ -7,6 +7,7 @@ import { BackendStatusBanner } from '@/components/BackendStatusBanner';
 import { ArrowLeft } from 'lucide-react';
 import Link from 'next/link';
 import type { HiddenGem } from '@/types';
+import { getSessionId } from '@/lib/session';
 
 export default function DiscoverPage() {
   const [results, setResults] = useState<HiddenGem[] | null>(null);
@@ -25,6 +26,7 @@ export default function DiscoverPage() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-Id': getSessionId(),
         },
         body: JSON.stringify({ searchQuery: query }),
       });
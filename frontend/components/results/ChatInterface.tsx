@@ -3,6 +3,7 @@
 import { useState, useRef, useEffect } from 'react';
 import { Send, User, Bot, Loader2 } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
+import { getSessionId } from '@/lib/session';
 
 interface Message {
     role: 'user' | 'assistant';
@@ -42,7 +43,7 @@ export function ChatInterface({ initialAdvice, placeName }: ChatInterfaceProps)
         try {
             const response = await fetch('/api/chat', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'X-Session-Id': getSessionId() },
                 body: JSON.stringify({ message: userMessage }),
             });
 
@@ -7,6 +7,7 @@ import type { HiddenGem } from '@/types';
 import { PhotoGallery } from './PhotoGallery';
 import { MapView } from './MapView';
 import { ChatInterface } from './ChatInterface';
+import { getSessionId } from '@/lib/session';
 
 interface ResultCardProps {
   gem: HiddenGem;
@@ -25,6 +26,7 @@ export function ResultCard({ gem, index }: ResultCardProps) {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-Id': getSessionId(),
         },
         body: JSON.stringify({ selection: gem.placeName }),
       });
@@ -0,0 +1,18 @@
+const SESSION_STORAGE_KEY = 'igotyou-session-id';
+
+/**
+ * Returns this browser tab's backend session id, creating it on first use.
+ *
+ * The backend keeps one agent conversation per session id, so discover,
+ * select and chat must all send the same id (as the X-Session-Id header).
+ */
+export function getSessionId(): string {
+  if (typeof window === 'undefined') return '';
+
+  let sessionId = window.sessionStorage.getItem(SESSION_STORAGE_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    window.sessionStorage.setItem(SESSION_STORAGE_KEY, sessionId);
+  }
+  return sessionId;
+}
@@ -181,4 +181,7 @@ export interface DiscoveryResponse {
   
   /** The original search query */
   query: string;
+
+  /** Backend session id this search ran in (reuse it for select/chat) */
+  sessionId?: string;
 }